@@ -0,0 +1,38 @@
+"""Add daily net worth rollup table
+
+Revision ID: 1da961a1eb9c
+Revises: 8bba7ed81d86
+Create Date: 2026-10-17 11:02:31.774590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1da961a1eb9c'
+down_revision = '8bba7ed81d86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create daily_net_worth table; the (user_id, date) key keeps each
+    # user's history contiguous for range reads
+    op.create_table('daily_net_worth',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('by_account_type', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+    # Populate it from existing snapshots with:
+    #   python -m app.services.net_worth
+
+
+def downgrade() -> None:
+    op.drop_table('daily_net_worth')
@@ -0,0 +1,41 @@
+"""Add monthly category totals rollup table
+
+Revision ID: 3f7a0c5e9b12
+Revises: 9e4b2d7c1a06
+Create Date: 2026-10-17 18:05:51.630274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a0c5e9b12'
+down_revision = '9e4b2d7c1a06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create monthly_category_totals table; the (user_id, month, category)
+    # key keeps each user's months contiguous for dashboard reads
+    op.create_table('monthly_category_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('income', sa.Float(), nullable=False),
+        sa.Column('spending', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'month', 'category')
+    )
+
+    # Populate it from existing transactions with:
+    #   python -m app.services.category_totals
+
+
+def downgrade() -> None:
+    op.drop_table('monthly_category_totals')
@@ -0,0 +1,35 @@
+"""Add portfolio daily value history
+
+Revision ID: 5c1e7a9d3f20
+Revises: bf38880d1aa5
+Create Date: 2026-10-17 15:12:44.902318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9d3f20'
+down_revision = 'bf38880d1aa5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create portfolio_daily_values table; the (portfolio_id, date) key keeps
+    # each portfolio's history contiguous for return calculations
+    op.create_table('portfolio_daily_values',
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('market_value', sa.Float(), nullable=False),
+        sa.Column('cost_basis', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+        sa.PrimaryKeyConstraint('portfolio_id', 'date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('portfolio_daily_values')
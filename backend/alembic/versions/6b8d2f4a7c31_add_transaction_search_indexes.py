@@ -0,0 +1,55 @@
+"""Add trigram indexes for transaction search
+
+Revision ID: 6b8d2f4a7c31
+Revises: 3f7a0c5e9b12
+Create Date: 2026-10-17 19:22:07.148930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b8d2f4a7c31'
+down_revision = '3f7a0c5e9b12'
+branch_labels = None
+depends_on = None
+
+
+# (index name, column) - GIN trigram indexes serving ILIKE '%q%' searches
+INDEXES = [
+    ('ix_transactions_description_trgm', 'description'),
+    ('ix_transactions_merchant_name_trgm', 'merchant_name'),
+]
+
+
+def upgrade() -> None:
+    # init.sql enables pg_trgm for new containers; existing databases may not
+    # have it yet
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Build concurrently, outside the migration transaction, so transactions
+    # stay writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES:
+            op.create_index(
+                name,
+                'transactions',
+                [column],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name='transactions',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
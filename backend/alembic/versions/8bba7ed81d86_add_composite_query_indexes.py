@@ -0,0 +1,54 @@
+"""Add composite indexes matching the API query shapes
+
+Revision ID: 8bba7ed81d86
+Revises: 7926fac4a89c
+Create Date: 2026-10-17 09:12:44.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8bba7ed81d86'
+down_revision = '7926fac4a89c'
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) - columns are raw SQL so sort order is preserved
+INDEXES = [
+    ('ix_accounts_user_id_is_archived', 'accounts', ['user_id', 'is_archived']),
+    ('ix_transactions_account_id_date_id', 'transactions', ['account_id', sa.text('date DESC'), sa.text('id DESC')]),
+    ('ix_balance_snapshots_account_id_date', 'balance_snapshots', ['account_id', 'date']),
+    ('ix_portfolios_user_id_is_active', 'portfolios', ['user_id', 'is_active']),
+    ('ix_portfolio_items_portfolio_id', 'portfolio_items', ['portfolio_id']),
+    ('ix_plaid_connections_user_id', 'plaid_connections', ['user_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so step
+    # outside the migration transaction. This keeps the tables writable while
+    # the indexes build on a live database.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,52 @@
+"""Add partitioned portfolio item snapshots
+
+Revision ID: 9e4b2d7c1a06
+Revises: 5c1e7a9d3f20
+Create Date: 2026-10-17 16:40:18.214507
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b2d7c1a06'
+down_revision = '5c1e7a9d3f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create portfolio_item_snapshots table, range partitioned by year on
+    # PostgreSQL so retention and history scans only touch the years involved.
+    # The snapshot job creates the partitions for later years.
+    op.create_table('portfolio_item_snapshots',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('investment_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Float(), nullable=False),
+        sa.Column('cost_basis', sa.Float(), nullable=False),
+        sa.Column('market_value', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['investment_id'], ['investments.id'], ),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+        sa.PrimaryKeyConstraint('date', 'portfolio_id', 'investment_id'),
+        postgresql_partition_by='RANGE (date)'
+    )
+    op.create_index('ix_portfolio_item_snapshots_portfolio_id_date', 'portfolio_item_snapshots', ['portfolio_id', 'date'], unique=False)
+
+    # Rows for years without a partition of their own, such as imported
+    # history, go to the default partition, so the schema does not depend on
+    # when this migration runs
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            'CREATE TABLE IF NOT EXISTS portfolio_item_snapshots_default '
+            'PARTITION OF portfolio_item_snapshots DEFAULT'
+        )
+
+
+def downgrade() -> None:
+    # Dropping the parent drops its partitions
+    op.drop_index('ix_portfolio_item_snapshots_portfolio_id_date', table_name='portfolio_item_snapshots')
+    op.drop_table('portfolio_item_snapshots')
@@ -0,0 +1,50 @@
+"""Add categorization rules table
+
+Revision ID: a4c6e8f0b2d5
+Revises: 6b8d2f4a7c31
+Create Date: 2026-10-17 20:12:40.418233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c6e8f0b2d5'
+down_revision = '6b8d2f4a7c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The transactioncategory type already exists for transactions
+    transaction_category = postgresql.ENUM('food_and_drink', 'shopping', 'transportation', 'travel', 'entertainment', 'health_and_fitness', 'home_improvement', 'personal_care', 'education', 'business_services', 'government_services', 'transfer', 'payment', 'income', 'investment', 'other', name='transactioncategory', create_type=False)
+
+    # Create categorization_rules table
+    op.create_table('categorization_rules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category', transaction_category, nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('merchant_equals', sa.String(length=255), nullable=True),
+        sa.Column('description_contains', sa.String(length=255), nullable=True),
+        sa.Column('description_regex', sa.String(length=500), nullable=True),
+        sa.Column('min_amount', sa.Float(), nullable=True),
+        sa.Column('max_amount', sa.Float(), nullable=True),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_categorization_rules_id'), 'categorization_rules', ['id'], unique=False)
+    op.create_index('ix_categorization_rules_user_id', 'categorization_rules', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categorization_rules_user_id', table_name='categorization_rules')
+    op.drop_index(op.f('ix_categorization_rules_id'), table_name='categorization_rules')
+    op.drop_table('categorization_rules')
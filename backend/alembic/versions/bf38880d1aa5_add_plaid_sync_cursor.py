@@ -0,0 +1,25 @@
+"""Add Plaid transactions sync cursor to plaid connections
+
+Revision ID: bf38880d1aa5
+Revises: 1da961a1eb9c
+Create Date: 2026-10-17 13:41:08.306127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bf38880d1aa5'
+down_revision = '1da961a1eb9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL means the next sync starts from the beginning of the item's history
+    op.add_column('plaid_connections', sa.Column('sync_cursor', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('plaid_connections', 'sync_cursor')
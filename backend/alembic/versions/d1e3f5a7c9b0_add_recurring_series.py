@@ -0,0 +1,64 @@
+"""Add recurring series and detection state tables
+
+Revision ID: d1e3f5a7c9b0
+Revises: a4c6e8f0b2d5
+Create Date: 2026-10-17 21:03:18.552904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1e3f5a7c9b0'
+down_revision = 'a4c6e8f0b2d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create enum type
+    recurring_cadence = postgresql.ENUM('weekly', 'biweekly', 'monthly', 'annual', name='recurringcadence')
+    recurring_cadence.create(op.get_bind())
+
+    # Create recurring_series table
+    op.create_table('recurring_series',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('merchant', sa.String(length=255), nullable=False),
+        sa.Column('cadence', postgresql.ENUM(name='recurringcadence', create_type=False), nullable=False),
+        sa.Column('average_amount', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('first_date', sa.Date(), nullable=False),
+        sa.Column('last_date', sa.Date(), nullable=False),
+        sa.Column('next_expected_date', sa.Date(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_recurring_series_id'), 'recurring_series', ['id'], unique=False)
+    op.create_index('ix_recurring_series_user_id_merchant', 'recurring_series', ['user_id', 'merchant'], unique=False)
+
+    # Create recurring_detection_state table
+    op.create_table('recurring_detection_state',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # The first run for each user examines all of their transactions:
+    #   python -m app.services.recurring
+
+
+def downgrade() -> None:
+    op.drop_table('recurring_detection_state')
+    op.drop_index('ix_recurring_series_user_id_merchant', table_name='recurring_series')
+    op.drop_index(op.f('ix_recurring_series_id'), table_name='recurring_series')
+    op.drop_table('recurring_series')
+    op.execute('DROP TYPE recurringcadence')
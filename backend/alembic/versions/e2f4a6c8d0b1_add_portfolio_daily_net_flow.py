@@ -0,0 +1,27 @@
+"""Record each portfolio's daily net cash flow
+
+Revision ID: e2f4a6c8d0b1
+Revises: d1e3f5a7c9b0
+Create Date: 2026-10-17 23:41:09.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2f4a6c8d0b1'
+down_revision = 'd1e3f5a7c9b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Flows were never recorded before, so existing days start at zero; the
+    # server default only fills those rows
+    op.add_column('portfolio_daily_values', sa.Column('net_flow', sa.Float(), server_default=sa.text('0'), nullable=False))
+    op.alter_column('portfolio_daily_values', 'net_flow', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('portfolio_daily_values', 'net_flow')
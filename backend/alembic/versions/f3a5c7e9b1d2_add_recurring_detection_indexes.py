@@ -0,0 +1,52 @@
+"""Add indexes for incremental recurring detection
+
+Revision ID: f3a5c7e9b1d2
+Revises: e2f4a6c8d0b1
+Create Date: 2026-10-18 09:27:51.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a5c7e9b1d2'
+down_revision = 'e2f4a6c8d0b1'
+branch_labels = None
+depends_on = None
+
+
+# (index name, columns) - the rows written since the detector's last run,
+# then the rows of the merchants they touched; the expressions match
+# app.services.recurring.merchant_transactions_query
+INDEXES = [
+    ('ix_transactions_account_id_updated_at', ['account_id', 'updated_at']),
+    ('ix_transactions_account_id_merchant_key', ['account_id', sa.text('lower(trim(merchant_name))')]),
+    ('ix_transactions_account_id_description_prefix', ['account_id', sa.text('lower(description) text_pattern_ops')]),
+]
+
+
+def upgrade() -> None:
+    # Build concurrently, outside the migration transaction, so transactions
+    # stay writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(
+                name,
+                'transactions',
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name='transactions',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
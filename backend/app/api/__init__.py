@@ -1,6 +1,8 @@
 from .accounts import router as accounts_router
 from .auth import router as auth_router
 from .balances import router as balances_router
+from .categorization_rules import router as categorization_rules_router
+from .investments import router as investments_router
 from .portfolios import router as portfolios_router
 from .transactions import router as transactions_router
 from .users import router as users_router
@@ -12,4 +14,6 @@ __all__ = [
     "transactions_router",
     "portfolios_router",
     "balances_router",
+    "investments_router",
+    "categorization_rules_router",
 ]
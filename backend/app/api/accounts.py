@@ -1,11 +1,13 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth.jwt import get_current_active_user
+from ..cache import ACCOUNTS, BALANCES, response_cache
 from ..database import get_db
+from ..metrics import query_budget
 from ..models.account import Account
 from ..models.user import User
 from ..schemas.account import AccountCreate, AccountResponse, AccountUpdate
@@ -13,22 +15,33 @@ from ..schemas.account import AccountCreate, AccountResponse, AccountUpdate
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
 
+def active_accounts_query(user: User) -> Select:
+    """Select the user's accounts that are not archived"""
+    return select(Account).where(
+        Account.user_id == user.id, Account.is_archived.is_(False)
+    )
+
+
 @router.get("/", response_model=List[AccountResponse])
+@query_budget(2)
 async def get_accounts(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get all accounts for the current user"""
-    result = await db.execute(
-        select(Account).where(
-            Account.user_id == current_user.id, Account.is_archived.is_(False)
-        )
+
+    async def load_accounts():
+        result = await db.execute(active_accounts_query(current_user))
+        return result.scalars().all()
+
+    return await response_cache.get_or_set(
+        request, current_user.id, ACCOUNTS, List[AccountResponse], load_accounts
     )
-    accounts = result.scalars().all()
-    return accounts
 
 
 @router.get("/{account_id}", response_model=AccountResponse)
+@query_budget(2)
 async def get_account(
     account_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -71,6 +84,7 @@ async def create_account(
 
     db.add(db_account)
     await db.commit()
+    await response_cache.invalidate(current_user.id, ACCOUNTS, BALANCES)
     await db.refresh(db_account)
 
     return db_account
@@ -102,6 +116,7 @@ async def update_account(
         setattr(account, field, value)
 
     await db.commit()
+    await response_cache.invalidate(current_user.id, ACCOUNTS, BALANCES)
     await db.refresh(account)
 
     return account
@@ -128,5 +143,6 @@ async def delete_account(
 
     setattr(account, "is_archived", True)
     await db.commit()
+    await response_cache.invalidate(current_user.id, ACCOUNTS, BALANCES)
 
     return None
@@ -5,9 +5,10 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth import create_access_token, get_password_hash, verify_password
+from ..auth import create_access_token, password_hasher, user_cache
 from ..auth.jwt import get_current_active_user
 from ..database import get_db
+from ..metrics import query_budget
 from ..models.user import User
 from ..schemas.user import Token, UserCreate, UserResponse
 
@@ -33,7 +34,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -52,6 +53,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
+@query_budget(2)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)
 ):
@@ -60,7 +62,14 @@ async def login(
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(form_data.password, str(user.hashed_password)):
+    if user:
+        verified, new_hash = await password_hasher.verify_and_update(
+            form_data.password, str(user.hashed_password)
+        )
+    else:
+        verified, new_hash = False, None
+
+    if user is None or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -72,6 +81,12 @@ async def login(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user"
         )
 
+    # Rehash passwords stored with an outdated bcrypt cost
+    if new_hash:
+        setattr(user, "hashed_password", new_hash)
+        await db.commit()
+        user_cache.invalidate(user.email)  # type: ignore
+
     # Create access token
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -86,6 +101,7 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
+@query_budget(1)
 async def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
     return current_user
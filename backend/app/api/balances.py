@@ -1,12 +1,16 @@
+import asyncio
+import json
 from datetime import date, datetime, timedelta
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import Select, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth.jwt import get_current_active_user
-from ..database import get_db
+from ..cache import BALANCES, response_cache
+from ..database import get_db, parallel_session
+from ..metrics import query_budget
 from ..models.account import Account
 from ..models.balance_snapshot import BalanceSnapshot
 from ..models.user import User
@@ -14,88 +18,156 @@ from ..schemas.balance import (
     AccountBalance,
     BalanceOverviewResponse,
     BalanceSnapshotResponse,
+    NetWorthHistoryPoint,
+    NetWorthPoint,
+    NetWorthRange,
 )
+from ..services.net_worth import get_net_worth_history
 
 router = APIRouter(prefix="/balances", tags=["balances"])
 
+# Days covered by each net worth range; None means the whole history
+NET_WORTH_RANGE_DAYS = {
+    NetWorthRange.ONE_MONTH: 30,
+    NetWorthRange.THREE_MONTHS: 91,
+    NetWorthRange.SIX_MONTHS: 182,
+    NetWorthRange.ONE_YEAR: 365,
+    NetWorthRange.FIVE_YEARS: 5 * 365,
+    NetWorthRange.ALL: None,
+}
+
 
 @router.get("/overview", response_model=BalanceOverviewResponse)
+@query_budget(4)
 async def get_balance_overview(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get balance overview for all accounts"""
-    # Get all active accounts for the user
-    result = await db.execute(
-        select(Account).where(
-            Account.user_id == current_user.id, Account.is_archived.is_(False)
-        )
+    return await response_cache.get_or_set(
+        request,
+        current_user.id,
+        BALANCES,
+        BalanceOverviewResponse,
+        lambda: _load_balance_overview(current_user, db),
     )
-    accounts = result.scalars().all()
 
-    # Calculate totals
-    total_balance = sum(account.current_balance for account in accounts)
-    total_available_balance = sum(
-        account.available_balance or account.current_balance for account in accounts
+
+async def _load_balance_overview(
+    current_user: User, db: AsyncSession
+) -> BalanceOverviewResponse:
+    """Build the balance overview from the database"""
+    active_accounts = (
+        Account.user_id == current_user.id,
+        Account.is_archived.is_(False),
     )
 
-    # Convert accounts to AccountBalance format
-    account_balances = []
-    for account in accounts:
-        account_balance = AccountBalance(
-            account_id=account.id,  # type: ignore
-            account_name=account.name,  # type: ignore
-            account_type=account.type.value,
-            institution_name=account.institution_name,  # type: ignore
-            current_balance=account.current_balance,  # type: ignore
-            available_balance=account.available_balance,  # type: ignore
-            currency=account.currency,  # type: ignore
-            last_updated=account.updated_at,  # type: ignore
-        )
-        account_balances.append(account_balance)
-
-    # Get net worth trend (last 30 days)
-    thirty_days_ago = date.today() - timedelta(days=30)
-    trend_result = await db.execute(
-        select(
-            BalanceSnapshot.date,
-            func.sum(BalanceSnapshot.balance).label("total_balance"),
+    async def load_accounts():
+        # Totals in one aggregate; a zero available balance falls back to the
+        # current balance, as it always has
+        totals_result = await db.execute(
+            select(
+                func.coalesce(func.sum(Account.current_balance), 0.0),
+                func.coalesce(
+                    func.sum(
+                        func.coalesce(
+                            func.nullif(Account.available_balance, 0),
+                            Account.current_balance,
+                        )
+                    ),
+                    0.0,
+                ),
+            ).where(*active_accounts)
         )
-        .join(Account)
-        .where(
-            Account.user_id == current_user.id, BalanceSnapshot.date >= thirty_days_ago
+
+        # Only the columns the overview needs, without building ORM entities
+        rows_result = await db.execute(
+            select(
+                Account.id,
+                Account.name,
+                Account.type,
+                Account.institution_name,
+                Account.current_balance,
+                Account.available_balance,
+                Account.currency,
+                Account.updated_at,
+            ).where(*active_accounts)
         )
-        .group_by(BalanceSnapshot.date)
-        .order_by(BalanceSnapshot.date)
+        return totals_result.one(), rows_result.all()
+
+    async def load_trend():
+        # Net worth trend (last 30 days) on its own connection so it overlaps
+        # with the account queries
+        thirty_days_ago = date.today() - timedelta(days=30)
+        async with parallel_session(db) as trend_db:
+            return await get_net_worth_history(
+                trend_db, current_user.id, thirty_days_ago
+            )
+
+    (totals, account_rows), trend_rows = await asyncio.gather(
+        load_accounts(), load_trend()
     )
+    total_balance, total_available_balance = totals
+
+    account_balances = [
+        AccountBalance(
+            account_id=row.id,
+            account_name=row.name,
+            account_type=row.type.value,
+            institution_name=row.institution_name,
+            current_balance=row.current_balance,
+            available_balance=row.available_balance,
+            currency=row.currency,
+            last_updated=row.updated_at,
+        )
+        for row in account_rows
+    ]
 
     net_worth_trend = [
-        {"date": str(row.date), "balance": float(row.total_balance)}
-        for row in trend_result.all()
+        NetWorthPoint(date=row.date, balance=row.total) for row in trend_rows
     ]
 
     return BalanceOverviewResponse(
-        total_balance=total_balance,  # type: ignore
-        total_available_balance=total_available_balance,  # type: ignore
+        total_balance=total_balance,
+        total_available_balance=total_available_balance,
         currency="USD",  # Assuming USD for now
         accounts=account_balances,
-        net_worth_trend=net_worth_trend,  # type: ignore
+        net_worth_trend=net_worth_trend,
         last_updated=datetime.utcnow(),
     )
 
 
-@router.get("/snapshots", response_model=List[BalanceSnapshotResponse])
-async def get_balance_snapshots(
-    account_id: Optional[int] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
+@router.get("/net-worth", response_model=List[NetWorthHistoryPoint])
+@query_budget(2)
+async def get_net_worth(
+    period: NetWorthRange = Query(NetWorthRange.ONE_YEAR, description="History range"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get balance snapshots for accounts"""
-    query = (
-        select(BalanceSnapshot).join(Account).where(Account.user_id == current_user.id)
-    )
+    """Get daily net worth history from the precomputed rollup"""
+    days = NET_WORTH_RANGE_DAYS[period]
+    start_date = date.today() - timedelta(days=days) if days else None
+
+    history = await get_net_worth_history(db, current_user.id, start_date)
+    return [
+        NetWorthHistoryPoint(
+            date=row.date,
+            balance=row.total,
+            by_account_type=json.loads(row.by_account_type),
+        )
+        for row in history
+    ]
+
+
+def snapshots_query(
+    user: User,
+    account_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Select:
+    """Select the user's balance snapshots, newest first"""
+    query = select(BalanceSnapshot).join(Account).where(Account.user_id == user.id)
 
     if account_id:
         query = query.where(Account.id == account_id)
@@ -106,15 +178,29 @@ async def get_balance_snapshots(
     if end_date:
         query = query.where(BalanceSnapshot.date <= end_date)
 
-    query = query.order_by(BalanceSnapshot.date.desc())
+    return query.order_by(BalanceSnapshot.date.desc())
 
-    result = await db.execute(query)
+
+@router.get("/snapshots", response_model=List[BalanceSnapshotResponse])
+@query_budget(2)
+async def get_balance_snapshots(
+    account_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get balance snapshots for accounts"""
+    result = await db.execute(
+        snapshots_query(current_user, account_id, start_date, end_date)
+    )
     snapshots = result.scalars().all()
 
     return snapshots
 
 
 @router.get("/snapshots/{account_id}", response_model=List[BalanceSnapshotResponse])
+@query_budget(2)
 async def get_account_balance_snapshots(
     account_id: int,
     current_user: User = Depends(get_current_active_user),
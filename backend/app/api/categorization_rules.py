@@ -0,0 +1,156 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from ..auth.jwt import get_current_active_user
+from ..database import get_db
+from ..metrics import query_budget
+from ..models.account import Account
+from ..models.categorization_rule import CategorizationRule
+from ..models.user import User
+from ..schemas.categorization_rule import (
+    CategorizationRuleCreate,
+    CategorizationRuleResponse,
+    CategorizationRuleUpdate,
+    RecategorizeResponse,
+)
+from ..services.categorization import matcher_cache
+from ..worker import recategorize_transactions
+
+router = APIRouter(prefix="/categorization-rules", tags=["categorization-rules"])
+
+
+async def _check_account(db: AsyncSession, user_id: int, account_id: Optional[int]):
+    if account_id is None:
+        return
+    result = await db.execute(
+        select(Account.id).where(Account.id == account_id, Account.user_id == user_id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Account not found"
+        )
+
+
+async def _get_rule(db: AsyncSession, user_id: int, rule_id: int) -> CategorizationRule:
+    result = await db.execute(
+        select(CategorizationRule).where(
+            CategorizationRule.id == rule_id, CategorizationRule.user_id == user_id
+        )
+    )
+    rule = result.scalar_one_or_none()
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found"
+        )
+    return rule
+
+
+@router.get("/", response_model=List[CategorizationRuleResponse])
+@query_budget(2)
+async def get_rules(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the current user's categorization rules in the order they are applied"""
+    result = await db.execute(
+        select(CategorizationRule)
+        .where(CategorizationRule.user_id == current_user.id)
+        .order_by(CategorizationRule.priority, CategorizationRule.id)
+    )
+    return result.scalars().all()
+
+
+@router.post(
+    "/",
+    response_model=CategorizationRuleResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_rule(
+    rule_data: CategorizationRuleCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create a categorization rule
+
+    New transactions without a category get the category of the first
+    matching rule. Existing transactions change only when the rules are
+    applied with ``POST /categorization-rules/apply``.
+    """
+    await _check_account(db, current_user.id, rule_data.account_id)
+
+    rule = CategorizationRule(user_id=current_user.id, **rule_data.dict())
+    db.add(rule)
+    await db.commit()
+    matcher_cache.invalidate(current_user.id)
+    await db.refresh(rule)
+
+    return rule
+
+
+@router.put("/{rule_id}", response_model=CategorizationRuleResponse)
+async def update_rule(
+    rule_id: int,
+    rule_data: CategorizationRuleUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Update a categorization rule"""
+    rule = await _get_rule(db, current_user.id, rule_id)
+
+    update_data = rule_data.dict(exclude_unset=True)
+    if "account_id" in update_data:
+        await _check_account(db, current_user.id, update_data["account_id"])
+
+    # Validate the rule as it will be stored, not just the changed fields
+    merged = {
+        field: getattr(rule, field) for field in CategorizationRuleCreate.model_fields
+    }
+    try:
+        CategorizationRuleCreate(**(merged | update_data))
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
+
+    for field, value in update_data.items():
+        setattr(rule, field, value)
+
+    await db.commit()
+    matcher_cache.invalidate(current_user.id)
+    await db.refresh(rule)
+
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_rule(
+    rule_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Delete a categorization rule"""
+    rule = await _get_rule(db, current_user.id, rule_id)
+
+    await db.delete(rule)
+    await db.commit()
+    matcher_cache.invalidate(current_user.id)
+
+
+@router.post(
+    "/apply",
+    response_model=RecategorizeResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def apply_rules(current_user: User = Depends(get_current_active_user)):
+    """Queue a re-categorization of all of the current user's transactions
+
+    Transactions that no rule matches keep their category. The work runs in
+    the Celery worker, which invalidates the cached transactions when done.
+    """
+    # Publishing talks to the broker synchronously, so keep it off the loop
+    task = await run_in_threadpool(recategorize_transactions.delay, [current_user.id])
+    return RecategorizeResponse(task_id=task.id)
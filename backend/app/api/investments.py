@@ -0,0 +1,59 @@
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import PORTFOLIOS, response_cache
+from ..database import get_db
+from ..schemas.investment import InvestmentPriceBulkResponse, InvestmentPriceBulkUpdate
+from ..services.prices import apply_prices
+
+# Prices are shared by every user, so only internal services holding this
+# token may push them; the route is disabled while it is unset
+PRICE_UPDATE_TOKEN = os.getenv("PRICE_UPDATE_TOKEN", "")
+
+router = APIRouter(prefix="/investments", tags=["investments"])
+
+
+def require_price_update_token(
+    x_price_update_token: Optional[str] = Header(None),
+) -> None:
+    """Reject callers without the internal price update token"""
+    if not (
+        PRICE_UPDATE_TOKEN
+        and x_price_update_token
+        and secrets.compare_digest(x_price_update_token, PRICE_UPDATE_TOKEN)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to update investment prices",
+        )
+
+
+@router.post(
+    "/prices/bulk",
+    response_model=InvestmentPriceBulkResponse,
+    dependencies=[Depends(require_price_update_token)],
+)
+async def bulk_update_prices(
+    price_data: InvestmentPriceBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    """Update many investment prices and revalue the portfolios holding them
+
+    Quotes are matched to investments by symbol. Unknown symbols are
+    reported rather than rejected.
+    """
+    result = await apply_prices(db, price_data.prices)
+    await db.commit()
+    for user_id in result.user_ids:
+        await response_cache.invalidate(user_id, PORTFOLIOS)
+
+    return InvestmentPriceBulkResponse(
+        updated=result.updated,
+        unchanged=result.unchanged,
+        unknown_symbols=result.unknown_symbols,
+        revalued_portfolios=len(result.portfolio_ids),
+    )
@@ -1,42 +1,85 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, update
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import Select, delete, func, insert, literal, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth.jwt import get_current_active_user
+from ..cache import PORTFOLIOS, response_cache
 from ..database import get_db
+from ..metrics import query_budget
 from ..models.investment import Investment
 from ..models.portfolio import Portfolio, PortfolioItem
 from ..models.user import User
 from ..schemas.portfolio import (
+    PerformancePeriod,
     PortfolioCreate,
     PortfolioItemCreate,
     PortfolioItemResponse,
+    PortfolioItemSnapshotResponse,
     PortfolioItemUpdate,
+    PortfolioPerformanceResponse,
     PortfolioResponse,
     PortfolioUpdate,
+    PortfolioValuationResponse,
+)
+from ..services.holdings_history import get_holdings_history
+from ..services.performance import get_portfolio_performance
+from ..services.valuation import (
+    group_valuations,
+    record_holding_change,
+    revalue_portfolios,
 )
 
 router = APIRouter(prefix="/portfolios", tags=["portfolios"])
 
+# Client-supplied portfolio item columns, besides the portfolio and investment
+ITEM_CREATE_COLUMNS = (
+    "quantity",
+    "average_cost",
+    "current_value",
+    "unrealized_gain_loss",
+    "unrealized_gain_loss_percent",
+    "target_allocation",
+    "meta_data",
+)
+
 
 @router.get("/", response_model=List[PortfolioResponse])
+@query_budget(2)
 async def get_portfolios(
+    request: Request,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get all portfolios for the current user"""
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.user_id == current_user.id, Portfolio.is_active.is_(True)
-        )
+
+    async def load_portfolios():
+        result = await db.execute(active_portfolios_query(current_user))
+        return result.scalars().all()
+
+    return await response_cache.get_or_set(
+        request, current_user.id, PORTFOLIOS, List[PortfolioResponse], load_portfolios
     )
-    portfolios = result.scalars().all()
-    return portfolios
+
+
+@router.post("/valuation", response_model=List[PortfolioValuationResponse])
+async def value_portfolios(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Revalue all of the current user's portfolios from investment prices"""
+    valuations = await revalue_portfolios(db, user_id=current_user.id)
+
+    await db.commit()
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
+
+    return group_valuations(valuations)
 
 
 @router.get("/{portfolio_id}", response_model=PortfolioResponse)
+@query_budget(2)
 async def get_portfolio(
     portfolio_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -84,6 +127,7 @@ async def create_portfolio(
 
     db.add(db_portfolio)
     await db.commit()
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
     await db.refresh(db_portfolio)
 
     return db_portfolio
@@ -127,6 +171,7 @@ async def update_portfolio(
         setattr(portfolio, field, value)
 
     await db.commit()
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
     await db.refresh(portfolio)
 
     return portfolio
@@ -153,37 +198,184 @@ async def delete_portfolio(
 
     setattr(portfolio, "is_active", False)
     await db.commit()
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
 
     return None
 
 
-# Portfolio Items endpoints
-@router.get("/{portfolio_id}/items", response_model=List[PortfolioItemResponse])
-async def get_portfolio_items(
+@router.post("/{portfolio_id}/valuation", response_model=PortfolioValuationResponse)
+async def value_portfolio(
     portfolio_id: int,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get all items in a portfolio"""
-    # Verify portfolio belongs to user
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id, Portfolio.user_id == current_user.id
-        )
+    """Revalue a portfolio's items from investment prices
+
+    Stores each item's current value and unrealized gain/loss and the
+    portfolio total, and returns weights and drift from target allocation.
+    """
+    valuations = await revalue_portfolios(
+        db, user_id=current_user.id, portfolio_ids=[portfolio_id]
     )
-    portfolio = result.scalar_one_or_none()
 
-    if not portfolio:
+    if not valuations.portfolio_totals:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
         )
 
-    result = await db.execute(
-        select(PortfolioItem).where(PortfolioItem.portfolio_id == portfolio_id)
+    await db.commit()
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
+
+    return group_valuations(valuations)[0]
+
+
+@router.get("/{portfolio_id}/performance", response_model=PortfolioPerformanceResponse)
+@query_budget(2)
+async def get_performance(
+    portfolio_id: int,
+    request: Request,
+    period: PerformancePeriod = Query(
+        PerformancePeriod.ONE_YEAR, description="Return period"
+    ),
+    as_of: Optional[date] = Query(None, description="Last day, defaults to today"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get time-weighted and money-weighted returns from the value history"""
+    end_date = as_of or date.today()
+
+    async def load_performance():
+        performance = await get_portfolio_performance(
+            db, portfolio_id, current_user.id, period, end_date
+        )
+        if performance is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
+            )
+        return performance
+
+    # Memoized per (portfolio, period, as-of date) until the next portfolio write
+    return await response_cache.get_or_set(
+        request,
+        current_user.id,
+        PORTFOLIOS,
+        PortfolioPerformanceResponse,
+        load_performance,
+        key=f"{request.url.path}?period={period.value}&as_of={end_date}",
+    )
+
+
+@router.get(
+    "/{portfolio_id}/holdings/history",
+    response_model=List[PortfolioItemSnapshotResponse],
+)
+@query_budget(2)
+async def get_portfolio_holdings_history(
+    portfolio_id: int,
+    request: Request,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the portfolio's daily (weekly for older dates) holdings snapshots"""
+
+    async def load_history():
+        history = await get_holdings_history(
+            db, portfolio_id, current_user.id, start_date, end_date
+        )
+        if history is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
+            )
+        return history
+
+    return await response_cache.get_or_set(
+        request,
+        current_user.id,
+        PORTFOLIOS,
+        List[PortfolioItemSnapshotResponse],
+        load_history,
+    )
+
+
+# Portfolio Items endpoints
+def active_portfolios_query(user: User) -> Select:
+    """Select the user's active portfolios"""
+    return select(Portfolio).where(
+        Portfolio.user_id == user.id, Portfolio.is_active.is_(True)
+    )
+
+
+def portfolio_items_query(portfolio_id: int, user: User) -> Select:
+    """Select (portfolio id, item) rows of a portfolio the user owns"""
+    return (
+        select(Portfolio.id, PortfolioItem)
+        .outerjoin(PortfolioItem, PortfolioItem.portfolio_id == Portfolio.id)
+        .where(Portfolio.id == portfolio_id, Portfolio.user_id == user.id)
+    )
+
+
+def _owned_portfolio(portfolio_id: int, user: User):
+    """Select the portfolio's ID only if it belongs to the user"""
+    return select(Portfolio.id).where(
+        Portfolio.id == portfolio_id, Portfolio.user_id == user.id
     )
-    items = result.scalars().all()
 
-    return items
+
+def _owned_item_filter(portfolio_id: int, item_id: int, user: User):
+    """Conditions matching one item of a portfolio the user owns"""
+    return (
+        PortfolioItem.id == item_id,
+        PortfolioItem.portfolio_id == portfolio_id,
+        PortfolioItem.portfolio_id.in_(_owned_portfolio(portfolio_id, user)),
+    )
+
+
+def _value_per_unit(current_value: float, quantity: float) -> float:
+    """A holding's own value per unit, for investments without a price"""
+    return current_value / quantity if quantity else 0.0
+
+
+async def _item_not_found(
+    db: AsyncSession, portfolio_id: int, user: User, missing: str
+) -> HTTPException:
+    """Explain why a scoped item statement matched no rows
+
+    Only runs on the failure path, so successful requests stay at one
+    statement.
+    """
+    portfolio_exists = await db.scalar(_owned_portfolio(portfolio_id, user))
+    detail = f"{missing} not found" if portfolio_exists else "Portfolio not found"
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+@router.get("/{portfolio_id}/items", response_model=List[PortfolioItemResponse])
+@query_budget(2)
+async def get_portfolio_items(
+    portfolio_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get all items in a portfolio"""
+
+    async def load_items():
+        # The ownership check and the item fetch in one statement: a missing
+        # portfolio gives no rows, an empty one gives a single NULL item
+        result = await db.execute(portfolio_items_query(portfolio_id, current_user))
+        rows = result.all()
+
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
+            )
+
+        return [item for _, item in rows if item is not None]
+
+    return await response_cache.get_or_set(
+        request, current_user.id, PORTFOLIOS, List[PortfolioItemResponse], load_items
+    )
 
 
 @router.post(
@@ -198,45 +390,42 @@ async def create_portfolio_item(
     db: AsyncSession = Depends(get_db),
 ):
     """Add an item to a portfolio"""
-    # Verify portfolio belongs to user
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id, Portfolio.user_id == current_user.id
+    values = item_data.model_dump(include=set(ITEM_CREATE_COLUMNS))
+    columns = PortfolioItem.__table__.c
+
+    # INSERT ... SELECT only produces a row when the portfolio belongs to the
+    # user and the investment exists
+    source = (
+        select(
+            Portfolio.id,
+            Investment.id,
+            *(
+                literal(values[name], columns[name].type)
+                for name in ITEM_CREATE_COLUMNS
+            ),
         )
+        .join_from(Portfolio, Investment, Investment.id == item_data.investment_id)
+        .where(Portfolio.id == portfolio_id, Portfolio.user_id == current_user.id)
     )
-    portfolio = result.scalar_one_or_none()
-
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
-        )
-
-    # Verify investment exists
     result = await db.execute(
-        select(Investment).where(Investment.id == item_data.investment_id)
+        insert(PortfolioItem)
+        .from_select(["portfolio_id", "investment_id", *ITEM_CREATE_COLUMNS], source)
+        .returning(PortfolioItem)
     )
-    investment = result.scalar_one_or_none()
+    db_item = result.scalar_one_or_none()
 
-    if not investment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Investment not found"
-        )
+    if not db_item:
+        raise await _item_not_found(db, portfolio_id, current_user, "Investment")
 
-    db_item = PortfolioItem(
-        portfolio_id=portfolio_id,
-        investment_id=item_data.investment_id,
-        quantity=item_data.quantity,
-        average_cost=item_data.average_cost,
-        current_value=item_data.current_value,
-        unrealized_gain_loss=item_data.unrealized_gain_loss,
-        unrealized_gain_loss_percent=item_data.unrealized_gain_loss_percent,
-        target_allocation=item_data.target_allocation,
-        meta_data=item_data.meta_data,
+    await record_holding_change(
+        db,
+        portfolio_id,
+        item_data.investment_id,
+        item_data.quantity,
+        _value_per_unit(item_data.current_value, item_data.quantity),
     )
-
-    db.add(db_item)
     await db.commit()
-    await db.refresh(db_item)
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
 
     return db_item
 
@@ -250,39 +439,42 @@ async def update_portfolio_item(
     db: AsyncSession = Depends(get_db),
 ):
     """Update a portfolio item"""
-    # Verify portfolio belongs to user
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id, Portfolio.user_id == current_user.id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
+    # Update only provided fields
+    update_data = item_data.dict(exclude_unset=True)
 
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
+    # A quantity change is a purchase or sale, so the holding before the
+    # update is needed to value it; cost and value edits are not flows
+    before = None
+    if "quantity" in update_data:
+        result = await db.execute(
+            select(PortfolioItem.quantity, PortfolioItem.current_value)
+            .where(*_owned_item_filter(portfolio_id, item_id, current_user))
+            .with_for_update()
         )
+        before = result.one_or_none()
 
-    # Get the portfolio item
     result = await db.execute(
-        select(PortfolioItem).where(
-            PortfolioItem.id == item_id, PortfolioItem.portfolio_id == portfolio_id
-        )
+        update(PortfolioItem)
+        .where(*_owned_item_filter(portfolio_id, item_id, current_user))
+        .values(**update_data, updated_at=func.now())
+        .returning(PortfolioItem)
+        .execution_options(populate_existing=True)
     )
     item = result.scalar_one_or_none()
 
     if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio item not found"
+        raise await _item_not_found(db, portfolio_id, current_user, "Portfolio item")
+
+    if before is not None and item.quantity != before.quantity:
+        await record_holding_change(
+            db,
+            portfolio_id,
+            item.investment_id,
+            item.quantity - before.quantity,
+            _value_per_unit(before.current_value, before.quantity),
         )
-
-    # Update only provided fields
-    update_data = item_data.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(item, field, value)
-
     await db.commit()
-    await db.refresh(item)
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
 
     return item
 
@@ -297,33 +489,28 @@ async def delete_portfolio_item(
     db: AsyncSession = Depends(get_db),
 ):
     """Remove an item from a portfolio"""
-    # Verify portfolio belongs to user
     result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id, Portfolio.user_id == current_user.id
+        delete(PortfolioItem)
+        .where(*_owned_item_filter(portfolio_id, item_id, current_user))
+        .returning(
+            PortfolioItem.investment_id,
+            PortfolioItem.quantity,
+            PortfolioItem.current_value,
         )
     )
-    portfolio = result.scalar_one_or_none()
+    deleted = result.one_or_none()
 
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio not found"
-        )
+    if deleted is None:
+        raise await _item_not_found(db, portfolio_id, current_user, "Portfolio item")
 
-    # Get the portfolio item
-    result = await db.execute(
-        select(PortfolioItem).where(
-            PortfolioItem.id == item_id, PortfolioItem.portfolio_id == portfolio_id
-        )
+    await record_holding_change(
+        db,
+        portfolio_id,
+        deleted.investment_id,
+        -deleted.quantity,
+        _value_per_unit(deleted.current_value, deleted.quantity),
     )
-    item = result.scalar_one_or_none()
-
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Portfolio item not found"
-        )
-
-    await db.delete(item)
     await db.commit()
+    await response_cache.invalidate(current_user.id, PORTFOLIOS)
 
     return None
@@ -1,73 +1,437 @@
-from datetime import date
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+import base64
+import binascii
+import csv
+import io
+import json
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Column, Select, case, func, literal, or_, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth.jwt import get_current_active_user
-from ..database import get_db
+from ..cache import TRANSACTIONS, response_cache
+from ..database import get_db, month_start, parallel_session
+from ..metrics import query_budget
 from ..models.account import Account
-from ..models.transaction import Transaction
+from ..models.transaction import Transaction, TransactionCategory
 from ..models.user import User
 from ..schemas.transaction import (
+    RecurringSeriesResponse,
+    TransactionBulkCreate,
+    TransactionBulkResponse,
+    TransactionBulkStatus,
     TransactionCreate,
+    TransactionExportFormat,
     TransactionResponse,
+    TransactionSummaryGroupBy,
+    TransactionSummaryResponse,
     TransactionUpdate,
 )
+from ..services.categorization import matcher_cache
+from ..services.category_totals import UNCATEGORIZED, summarize_category_totals
+from ..services.recurring import get_recurring_series
+from ..services.transaction_ingest import upsert_transactions
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Rows fetched from the server-side cursor per chunk of an export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS: List[Column[Any]] = [
+    Transaction.id,
+    Transaction.account_id,
+    Transaction.date,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.description,
+    Transaction.merchant_name,
+    Transaction.category,
+    Transaction.subcategory,
+    Transaction.is_pending,
+    Transaction.is_recurring,
+    Transaction.payment_channel,
+    Transaction.plaid_transaction_id,
+]
+
+# Summary groupings that can be read from the monthly category rollup
+ROLLUP_GROUPINGS = {TransactionSummaryGroupBy.CATEGORY, TransactionSummaryGroupBy.MONTH}
+
+EXPORT_MEDIA_TYPES = {
+    TransactionExportFormat.CSV: "text/csv",
+    TransactionExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+class TransactionFilters:
+    """Query filters shared by the transaction list and export endpoints"""
+
+    def __init__(
+        self,
+        account_id: Optional[int] = Query(None, description="Filter by account ID"),
+        start_date: Optional[date] = Query(None, description="Filter by start date"),
+        end_date: Optional[date] = Query(None, description="Filter by end date"),
+        category: Optional[TransactionCategory] = Query(
+            None, description="Filter by transaction category"
+        ),
+        q: Optional[str] = Query(
+            None,
+            min_length=1,
+            max_length=200,
+            description="Search text in the description or merchant name",
+        ),
+    ):
+        self.account_id = account_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.category = category
+        self.q = q
+
+    def apply(self, query: Select, user: User) -> Select:
+        """Restrict a query joined to Account to the user's matching transactions"""
+        query = query.where(Account.user_id == user.id)
+
+        if self.account_id:
+            query = query.where(Account.id == self.account_id)
+
+        if self.start_date:
+            query = query.where(Transaction.date >= self.start_date)
+
+        if self.end_date:
+            query = query.where(Transaction.date <= self.end_date)
+
+        if self.category:
+            query = query.where(Transaction.category == self.category)
+
+        if self.q:
+            # ILIKE '%q%' is served by the trigram indexes on PostgreSQL
+            query = query.where(
+                or_(
+                    Transaction.description.icontains(self.q, autoescape=True),
+                    Transaction.merchant_name.icontains(self.q, autoescape=True),
+                )
+            )
+
+        return query
+
+
+def search_rank(q: str):
+    """Trigram similarity of the best matching field to ``q`` (PostgreSQL only)"""
+    return func.greatest(
+        func.similarity(Transaction.description, q),
+        func.similarity(func.coalesce(Transaction.merchant_name, ""), q),
+    )
+
+
+def transactions_query(
+    filters: TransactionFilters,
+    user: User,
+    limit: int,
+    offset: int = 0,
+    position: Optional[Tuple[date, int]] = None,
+    ranked: bool = False,
+) -> Select:
+    """Select a page of the user's matching transactions, newest first
+
+    ``position`` is the (date, id) of the last row of the previous page;
+    ``ranked`` orders search results by ``search_rank`` first.
+    """
+    query = filters.apply(select(Transaction).join(Account), user)
+    if ranked and filters.q:
+        query = query.order_by(search_rank(filters.q).desc())
+
+    # id breaks ties between same-day rows
+    if position:
+        query = query.where(
+            tuple_(Transaction.date, Transaction.id)
+            < tuple_(literal(position[0]), literal(position[1]))
+        )
+    elif offset:
+        query = query.offset(offset)
+
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit)
+
+
+def export_query(filters: TransactionFilters, user: User) -> Select:
+    """Select the export columns of every matching transaction, newest first"""
+    query = filters.apply(select(*EXPORT_COLUMNS).join(Account), user)
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+def summary_query(filters: TransactionFilters, user: User, group) -> Select:
+    """Select (key, count, total, income, spending) of matching transactions by group"""
+    key = group.label("key")
+    query = filters.apply(
+        select(
+            key,
+            func.count(Transaction.id),
+            func.sum(Transaction.amount),
+            func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0)),
+            func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0)),
+        ).join(Account),
+        user,
+    )
+    return query.group_by(key).order_by(key)
+
+
+def transaction_query(transaction_id: int, user: User) -> Select:
+    """Select one transaction if it belongs to one of the user's accounts"""
+    return (
+        select(Transaction)
+        .join(Account)
+        .where(Transaction.id == transaction_id, Account.user_id == user.id)
+    )
+
+
+def encode_cursor(transaction_date: date, transaction_id: int) -> str:
+    """Encode a (date, id) position as an opaque pagination cursor"""
+    raw = f"{transaction_date.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Decode a pagination cursor back into its (date, id) position"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_date, raw_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return date.fromisoformat(raw_date), int(raw_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
 
 @router.get("/", response_model=List[TransactionResponse])
+@query_budget(2)
 async def get_transactions(
-    account_id: Optional[int] = Query(None, description="Filter by account ID"),
-    start_date: Optional[date] = Query(None, description="Filter by start date"),
-    end_date: Optional[date] = Query(None, description="Filter by end date"),
-    category: Optional[str] = Query(None, description="Filter by transaction category"),
+    response: Response,
+    filters: TransactionFilters = Depends(),
     limit: int = Query(100, le=1000, description="Number of transactions to return"),
     offset: int = Query(0, ge=0, description="Number of transactions to skip"),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor from a previous page's X-Next-Cursor header"
+    ),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get transactions for the current user with optional filters"""
-    # Build query to get transactions for user's accounts
-    query = select(Transaction).join(Account).where(Account.user_id == current_user.id)
+    """Get transactions for the current user with optional filters
+
+    Pages are ordered newest first by (date, id). Passing ``cursor`` seeks
+    directly past the last row of the previous page instead of skipping
+    ``offset`` rows, so every page costs the same regardless of depth.
+    Search results (``q``) are ranked by trigram similarity on PostgreSQL and
+    are paged with ``offset``.
+    """
+    if cursor and filters.q:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="cursor cannot be combined with q",
+        )
 
-    # Apply filters
-    if account_id:
-        query = query.where(Account.id == account_id)
+    query = transactions_query(
+        filters,
+        current_user,
+        limit,
+        offset,
+        position=decode_cursor(cursor) if cursor else None,
+        ranked=db.bind.dialect.name == "postgresql",
+    )
+    result = await db.execute(query)
+    transactions = result.scalars().all()
 
-    if start_date:
-        query = query.where(Transaction.date >= start_date)
+    # A full page means there may be more rows after it
+    if transactions and len(transactions) == limit and not filters.q:
+        last = transactions[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.date, last.id)  # type: ignore
 
-    if end_date:
-        query = query.where(Transaction.date <= end_date)
+    return transactions
 
-    if category:
-        query = query.where(Transaction.category.is_(category))
 
-    # Apply pagination and ordering
-    query = query.order_by(Transaction.date.desc()).offset(offset).limit(limit)
+def _export_row(row) -> dict:
+    data = row._asdict()
+    data["date"] = data["date"].isoformat()
+    if data["category"] is not None:
+        data["category"] = data["category"].value
+    return data
+
+
+async def _stream_export(
+    db: AsyncSession, query: Select, export_format: TransactionExportFormat
+) -> AsyncIterator[str]:
+    """Yield an export chunk per batch of rows read from a server-side cursor"""
+    field_names = [column.key for column in EXPORT_COLUMNS]
+    if export_format == TransactionExportFormat.CSV:
+        # Send the header straight away, before the query has run
+        yield ",".join(field_names) + "\r\n"
+
+    # The request's session may be closed before the body has been sent, so
+    # the export reads through its own session
+    async with parallel_session(db) as export_db:
+        result = await export_db.stream(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for partition in result.partitions():
+            rows = [_export_row(row) for row in partition]
+            if export_format == TransactionExportFormat.CSV:
+                buffer = io.StringIO()
+                csv.DictWriter(buffer, fieldnames=field_names).writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+
+
+@router.get("/export")
+@query_budget(2)
+async def export_transactions(
+    export_format: TransactionExportFormat = Query(
+        TransactionExportFormat.CSV, alias="format", description="Export format"
+    ),
+    filters: TransactionFilters = Depends(),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream every matching transaction as CSV or newline-delimited JSON
+
+    Rows are read in batches from a server-side cursor and written out as
+    they arrive, so memory use stays flat regardless of the export size.
+    """
+    return StreamingResponse(
+        _stream_export(db, export_query(filters, current_user), export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="transactions.{export_format.value}"'
+            )
+        },
+    )
 
-    result = await db.execute(query)
-    transactions = result.scalars().all()
 
-    return transactions
+def _summary_key(group_by: TransactionSummaryGroupBy, key) -> Optional[str]:
+    if group_by == TransactionSummaryGroupBy.CATEGORY:
+        # Rollup rows store the category value, with a placeholder for None
+        key = getattr(key, "value", key)
+        return None if key == UNCATEGORIZED else key
+    if key is None:
+        return None
+    if group_by == TransactionSummaryGroupBy.MONTH:
+        return key.strftime("%Y-%m")
+    return str(key)
+
+
+def _whole_months(filters: TransactionFilters) -> bool:
+    """Whether the filters select whole months of all accounts"""
+    return (
+        filters.account_id is None
+        and filters.q is None
+        and (filters.start_date is None or filters.start_date.day == 1)
+        and (
+            filters.end_date is None or (filters.end_date + timedelta(days=1)).day == 1
+        )
+    )
+
+
+@router.get("/summary", response_model=TransactionSummaryResponse)
+@query_budget(2)
+async def get_transaction_summary(
+    request: Request,
+    group_by: TransactionSummaryGroupBy = Query(
+        TransactionSummaryGroupBy.CATEGORY, description="Grouping of the totals"
+    ),
+    filters: TransactionFilters = Depends(),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get transaction counts and totals grouped by category, merchant, month or account
+
+    The aggregation runs in the database over the user's accounts and the
+    date range, so only one row per group is returned to the API. Category
+    and month totals over whole months are read from the monthly category
+    rollup instead of the transactions.
+    """
+    group_columns = {
+        TransactionSummaryGroupBy.CATEGORY: Transaction.category,
+        TransactionSummaryGroupBy.MERCHANT: Transaction.merchant_name,
+        TransactionSummaryGroupBy.MONTH: month_start(db, Transaction.date),
+        TransactionSummaryGroupBy.ACCOUNT: Transaction.account_id,
+    }
+
+    async def load_summary():
+        if group_by in ROLLUP_GROUPINGS and _whole_months(filters):
+            rows = await summarize_category_totals(
+                db,
+                current_user.id,
+                by_month=group_by == TransactionSummaryGroupBy.MONTH,
+                start_month=filters.start_date,
+                end_month=filters.end_date,
+                category=filters.category and filters.category.value,
+            )
+        else:
+            query = summary_query(filters, current_user, group_columns[group_by])
+            result = await db.execute(query)
+            rows = [tuple(row) for row in result.all()]
+
+        groups = [
+            {
+                "key": _summary_key(group_by, key),
+                "transaction_count": count,
+                "total_amount": total,
+                "income": income,
+                "spending": spending,
+            }
+            for key, count, total, income, spending in rows
+        ]
+        # Databases order NULLs and enums differently, so sort those here
+        if group_by == TransactionSummaryGroupBy.CATEGORY:
+            groups.sort(key=lambda group: (group["key"] is None, group["key"] or ""))
+        else:
+            groups.sort(key=lambda group: group["key"] is None)
+
+        return {
+            "group_by": group_by,
+            "start_date": filters.start_date,
+            "end_date": filters.end_date,
+            "groups": groups,
+        }
+
+    return await response_cache.get_or_set(
+        request,
+        current_user.id,
+        TRANSACTIONS,
+        TransactionSummaryResponse,
+        load_summary,
+    )
+
+
+@router.get("/recurring", response_model=List[RecurringSeriesResponse])
+@query_budget(2)
+async def get_recurring_transactions(
+    include_inactive: bool = Query(
+        False, description="Include series whose next transaction is overdue"
+    ),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get the user's recurring transaction series, soonest expected first
+
+    Series are found by the recurring detector, which runs in the
+    background, so new transactions show up after its next run.
+    """
+    return await get_recurring_series(db, current_user.id, include_inactive)
 
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
+@query_budget(2)
 async def get_transaction(
     transaction_id: int,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get a specific transaction by ID"""
-    result = await db.execute(
-        select(Transaction)
-        .join(Account)
-        .where(Transaction.id == transaction_id, Account.user_id == current_user.id)
-    )
+    result = await db.execute(transaction_query(transaction_id, current_user))
     transaction = result.scalar_one_or_none()
 
     if not transaction:
@@ -101,6 +465,16 @@ async def create_transaction(
             status_code=status.HTTP_404_NOT_FOUND, detail="Account not found"
         )
 
+    category = transaction_data.category
+    if category is None:
+        matcher = await matcher_cache.get(db, current_user.id)
+        category = matcher.categorize(
+            transaction_data.account_id,
+            transaction_data.amount,
+            transaction_data.description,
+            transaction_data.merchant_name,
+        )
+
     db_transaction = Transaction(
         account_id=transaction_data.account_id,
         amount=transaction_data.amount,
@@ -108,7 +482,7 @@ async def create_transaction(
         date=transaction_data.date,
         description=transaction_data.description,
         merchant_name=transaction_data.merchant_name,
-        category=transaction_data.category,
+        category=category,
         subcategory=transaction_data.subcategory,
         is_pending=transaction_data.is_pending,
         is_recurring=transaction_data.is_recurring,
@@ -121,10 +495,39 @@ async def create_transaction(
     db.add(db_transaction)
     await db.commit()
     await db.refresh(db_transaction)
+    await response_cache.invalidate(current_user.id, TRANSACTIONS)
 
     return db_transaction
 
 
+@router.post("/bulk", response_model=TransactionBulkResponse)
+async def bulk_create_transactions(
+    bulk_data: TransactionBulkCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create or update many transactions in one database transaction
+
+    Rows with a ``plaid_transaction_id`` that already exists update that
+    transaction. Rows that fail validation are reported individually and
+    do not prevent the others from being written.
+    """
+    results = await upsert_transactions(db, current_user.id, bulk_data.transactions)
+    await db.commit()
+    await response_cache.invalidate(current_user.id, TRANSACTIONS)
+
+    counts = {bulk_status: 0 for bulk_status in TransactionBulkStatus}
+    for result in results:
+        counts[result.status] += 1
+
+    return TransactionBulkResponse(
+        created=counts[TransactionBulkStatus.CREATED],
+        updated=counts[TransactionBulkStatus.UPDATED],
+        failed=counts[TransactionBulkStatus.FAILED],
+        results=results,
+    )
+
+
 @router.put("/{transaction_id}", response_model=TransactionResponse)
 async def update_transaction(
     transaction_id: int,
@@ -133,11 +536,7 @@ async def update_transaction(
     db: AsyncSession = Depends(get_db),
 ):
     """Update an existing transaction"""
-    result = await db.execute(
-        select(Transaction)
-        .join(Account)
-        .where(Transaction.id == transaction_id, Account.user_id == current_user.id)
-    )
+    result = await db.execute(transaction_query(transaction_id, current_user))
     transaction = result.scalar_one_or_none()
 
     if not transaction:
@@ -152,6 +551,7 @@ async def update_transaction(
 
     await db.commit()
     await db.refresh(transaction)
+    await response_cache.invalidate(current_user.id, TRANSACTIONS)
 
     return transaction
 
@@ -163,11 +563,7 @@ async def delete_transaction(
     db: AsyncSession = Depends(get_db),
 ):
     """Delete a transaction"""
-    result = await db.execute(
-        select(Transaction)
-        .join(Account)
-        .where(Transaction.id == transaction_id, Account.user_id == current_user.id)
-    )
+    result = await db.execute(transaction_query(transaction_id, current_user))
     transaction = result.scalar_one_or_none()
 
     if not transaction:
@@ -177,5 +573,6 @@ async def delete_transaction(
 
     await db.delete(transaction)
     await db.commit()
+    await response_cache.invalidate(current_user.id, TRANSACTIONS)
 
     return None
@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..auth.cache import user_cache
 from ..auth.jwt import get_current_active_user
 from ..database import get_db
+from ..metrics import query_budget
 from ..models.user import User
 from ..schemas.user import UserResponse, UserUpdate
 
@@ -10,6 +12,7 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=UserResponse)
+@query_budget(1)
 async def get_current_user_profile(
     current_user: User = Depends(get_current_active_user),
 ):
@@ -24,12 +27,16 @@ async def update_current_user_profile(
     db: AsyncSession = Depends(get_db),
 ):
     """Update current user profile"""
+    previous_email = current_user.email
+
     # Update only provided fields
     update_data = user_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(current_user, field, value)
 
     await db.commit()
+    # Tokens are keyed by email, so drop both the old and the new subject
+    user_cache.invalidate(previous_email, current_user.email)  # type: ignore
     await db.refresh(current_user)
 
     return current_user
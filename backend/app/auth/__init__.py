@@ -1,5 +1,6 @@
+from .cache import user_cache
 from .jwt import create_access_token, get_current_user, verify_token
-from .password import get_password_hash, verify_password
+from .password import get_password_hash, password_hasher, verify_password
 
 __all__ = [
     "create_access_token",
@@ -7,4 +8,6 @@ __all__ = [
     "get_current_user",
     "get_password_hash",
     "verify_password",
+    "password_hasher",
+    "user_cache",
 ]
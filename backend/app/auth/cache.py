@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Cache configuration
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+
+
+class UserCache:
+    """Bounded TTL cache of authenticated user rows keyed by token subject
+
+    Entries hold plain column values rather than ORM instances, because an
+    instance can only belong to one session at a time. The least recently
+    used entry is evicted once ``max_size`` is reached.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[Dict[str, Any]]:
+        """Return cached column values for a subject, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, subject: str, values: Dict[str, Any]) -> None:
+        """Cache column values for a subject"""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *subjects: Optional[str]) -> None:
+        """Drop the entries for the given subjects"""
+        with self._lock:
+            for subject in subjects:
+                if subject is not None and subject in self._entries:
+                    del self._entries[subject]
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+
+user_cache = UserCache(max_size=USER_CACHE_MAX_SIZE, ttl_seconds=USER_CACHE_TTL_SECONDS)
@@ -6,16 +6,33 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from ..database import get_db
 from ..models.user import User
 from ..schemas.user import TokenData
+from .cache import user_cache
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Columns kept in the user cache; credentials are deliberately left out so
+# they never outlive the request that loaded them
+CACHED_USER_COLUMNS = (
+    "id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_verified",
+    "preferences",
+    "created_at",
+    "updated_at",
+)
+
 # Security scheme
 security = HTTPBearer()
 
@@ -60,17 +77,31 @@ async def get_current_user(
     try:
         token = credentials.credentials
         token_data = verify_token(token)
-        if token_data is None:
+        if token_data is None or token_data.email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    # Get user from database
-    result = await db.execute(select(User).where(User.email == token_data.email))
-    user = result.scalar_one_or_none()
+    # Get user from the cache, falling back to the database
+    user: Optional[User]
+    cached = user_cache.get(token_data.email)
+    if cached is not None:
+        # Attach a rebuilt instance without a SELECT so handlers can still
+        # modify and commit it through this session
+        user = User(**cached)
+        make_transient_to_detached(user)
+        user = await db.merge(user, load=False)
+    else:
+        result = await db.execute(select(User).where(User.email == token_data.email))
+        user = result.scalar_one_or_none()
 
-    if user is None:
-        raise credentials_exception
+        if user is None:
+            raise credentials_exception
+
+        user_cache.set(
+            token_data.email,
+            {column: getattr(user, column) for column in CACHED_USER_COLUMNS},
+        )
 
     if not user.is_active:
         raise HTTPException(
@@ -1,7 +1,24 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
 from passlib.context import CryptContext
 
+# Password hashing configuration. Changing BCRYPT_ROUNDS marks hashes made
+# with any other cost as needing an update, so they are rehashed on login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_CONCURRENCY = int(
+    os.getenv("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 2))
+)
+
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
+
+T = TypeVar("T")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -12,3 +29,78 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     """Generate password hash"""
     return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread pool so it never blocks the event loop
+
+    bcrypt releases the GIL while hashing, so a thread pool gives real
+    parallelism. At most ``max_workers`` hashes run at once; further calls
+    wait in the pool's queue and are counted by ``queue_depth``.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int):
+        self.context = context
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of hash operations waiting for a free worker"""
+        return max(0, self._pending - self.max_workers)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the pool size, in-flight operations and queue depth"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "pending": self._pending,
+                "queue_depth": self.queue_depth,
+            }
+
+    async def hash(self, password: str) -> str:
+        """Generate password hash"""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash"""
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return a new hash if the stored one is outdated"""
+        return await self._run(
+            self.context.verify_and_update, plain_password, hashed_password
+        )
+
+    def shutdown(self) -> None:
+        """Stop the worker threads; a new pool is created on next use"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        executor = self._get_executor()
+        with self._lock:
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+password_hasher = PasswordHasher(pwd_context, max_workers=PASSWORD_HASH_CONCURRENCY)
@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from .metrics import RESPONSE_CACHE_INVALIDATIONS, RESPONSE_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration; RESPONSE_CACHE_BACKEND is memory, redis or none
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "4096"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+# Cached views, named after the router whose writes invalidate them
+ACCOUNTS = "accounts"
+BALANCES = "balances"
+PORTFOLIOS = "portfolios"
+TRANSACTIONS = "transactions"
+
+
+class MemoryCacheBackend:
+    """In-process LRU for single-worker deployments and tests
+
+    Entries are grouped by (user, namespace) so a namespace can be dropped
+    without scanning the whole cache. Each group also has a version that
+    invalidation bumps.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, str, str], Tuple[float, bytes]]" = (
+            OrderedDict()
+        )
+        self._groups: Dict[Tuple[int, str], Set[str]] = {}
+        self._versions: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+
+    async def version(self, user_id: int, namespace: str) -> int:
+        return self._versions.get((user_id, namespace), 0)
+
+    async def get(self, user_id: int, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry_key = (user_id, namespace, key)
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(entry_key)
+                return None
+            self._entries.move_to_end(entry_key)
+            return entry[1]
+
+    async def set(
+        self, user_id: int, namespace: str, key: str, value: bytes, ttl: int
+    ) -> None:
+        with self._lock:
+            entry_key = (user_id, namespace, key)
+            self._entries[entry_key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(entry_key)
+            self._groups.setdefault((user_id, namespace), set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    async def invalidate(self, user_id: int, namespace: str) -> None:
+        with self._lock:
+            group = (user_id, namespace)
+            self._versions[group] = self._versions.get(group, 0) + 1
+            for key in self._groups.pop(group, ()):
+                self._entries.pop((user_id, namespace, key), None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def _remove(self, entry_key: Tuple[int, str, str]) -> None:
+        user_id, namespace, key = entry_key
+        self._entries.pop(entry_key, None)
+        group = self._groups.get((user_id, namespace))
+        if group is not None:
+            group.discard(key)
+            if not group:
+                del self._groups[(user_id, namespace)]
+
+
+class RedisCacheBackend:
+    """Redis cache shared by every API worker
+
+    Each (user, namespace) is one hash, so invalidation is a single DEL
+    together with an INCR of the namespace's version key.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+
+    @staticmethod
+    def _hash_key(user_id: int, namespace: str) -> str:
+        return f"response-cache:{user_id}:{namespace}"
+
+    @staticmethod
+    def _version_key(user_id: int, namespace: str) -> str:
+        return f"response-cache-version:{user_id}:{namespace}"
+
+    async def version(self, user_id: int, namespace: str) -> int:
+        return int(await self.redis.get(self._version_key(user_id, namespace)) or 0)
+
+    async def get(self, user_id: int, namespace: str, key: str) -> Optional[bytes]:
+        value = await self.redis.hget(self._hash_key(user_id, namespace), key)
+        # Only a client created with decode_responses returns str
+        return value.encode() if isinstance(value, str) else value
+
+    async def set(
+        self, user_id: int, namespace: str, key: str, value: bytes, ttl: int
+    ) -> None:
+        hash_key = self._hash_key(user_id, namespace)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(hash_key, key, value)
+            pipe.expire(hash_key, ttl)
+            await pipe.execute()
+
+    async def invalidate(self, user_id: int, namespace: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.incr(self._version_key(user_id, namespace))
+            pipe.delete(self._hash_key(user_id, namespace))
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        # Versions are kept, so fills still in flight stay unreachable
+        async for hash_key in self.redis.scan_iter("response-cache:*"):
+            await self.redis.delete(hash_key)
+
+
+class ResponseCache:
+    """Caches serialized GET responses per user and namespace
+
+    Keys include the namespace's version, which is read before loading and
+    bumped by every invalidation. A response loaded before a write commits
+    but stored after the invalidation therefore lands under an old version
+    that is never read again, instead of serving stale data until the TTL.
+
+    A cache error never fails a request: reads fall back to the database
+    and failed writes are only logged.
+    """
+
+    def __init__(self, backend: Optional[Any], ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    async def get_or_set(
+        self,
+        request: Request,
+        user_id: int,
+        namespace: str,
+        response_model: Any,
+        loader: Callable[[], Awaitable[Any]],
+        key: Optional[str] = None,
+    ) -> Response:
+        """Return the cached response for this request or build and cache it
+
+        Entries are keyed by the request path and query unless ``key`` is
+        given, e.g. to include defaults that depend on the current date.
+        """
+        if key is None:
+            key = str(request.url.path)
+            if request.url.query:
+                key = f"{key}?{request.url.query}"
+
+        version: Optional[int] = None
+        if self.backend is not None:
+            try:
+                version = await self.backend.version(user_id, namespace)
+                key = f"{version}:{key}"
+                body = await self.backend.get(user_id, namespace, key)
+            except Exception:
+                logger.exception("Response cache read failed")
+                body = None
+            hit = body is not None
+            RESPONSE_CACHE_REQUESTS.labels(namespace, "hit" if hit else "miss").inc()
+            if hit:
+                return Response(body, media_type="application/json")
+
+        adapter = self._adapter(response_model)
+        body = adapter.dump_json(
+            adapter.validate_python(await loader(), from_attributes=True)
+        )
+        if self.backend is not None and version is not None:
+            try:
+                await self.backend.set(user_id, namespace, key, body, self.ttl_seconds)
+            except Exception:
+                logger.exception("Response cache write failed")
+        return Response(body, media_type="application/json")
+
+    async def invalidate(self, user_id: int, *namespaces: str) -> None:
+        """Drop a user's cached responses; call after the write commits"""
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            try:
+                await self.backend.invalidate(user_id, namespace)
+            except Exception:
+                logger.exception("Response cache invalidation failed")
+            RESPONSE_CACHE_INVALIDATIONS.labels(namespace).inc()
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+
+    def _adapter(self, response_model: Any) -> TypeAdapter:
+        adapter = self._adapters.get(response_model)
+        if adapter is None:
+            adapter = self._adapters[response_model] = TypeAdapter(response_model)
+        return adapter
+
+
+def _create_backend(name: str):
+    if name == "redis":
+        return RedisCacheBackend(REDIS_URL)
+    if name == "memory":
+        return MemoryCacheBackend(RESPONSE_CACHE_MAX_SIZE)
+    return None
+
+
+response_cache = ResponseCache(
+    _create_backend(RESPONSE_CACHE_BACKEND), ttl_seconds=RESPONSE_CACHE_TTL_SECONDS
+)
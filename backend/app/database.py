@@ -1,8 +1,13 @@
 import os
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Union
 
+from sqlalchemy import Connection, Date, func, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from .metrics import TimedQueuePool
+
 # Database URL from environment variable
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -13,6 +18,7 @@ DATABASE_URL = os.getenv(
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,  # Set to True for SQL query logging
+    poolclass=TimedQueuePool,  # Queue pool that also records checkout waits
     pool_pre_ping=True,
     pool_recycle=300,
     pool_size=10,
@@ -36,6 +42,41 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+@asynccontextmanager
+async def parallel_session(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Open a second session on the same engine as ``db``
+
+    A session can only run one statement at a time, so a query that should
+    overlap with work on ``db`` needs its own session and connection.
+    """
+    async with AsyncSession(db.bind, expire_on_commit=False) as session:
+        yield session
+
+
+def _dialect_name(db: Union[AsyncSession, Connection]) -> str:
+    if isinstance(db, Connection):
+        return db.dialect.name
+    return db.bind.dialect.name
+
+
+def dialect_insert(db: Union[AsyncSession, Connection], model):
+    """Build an INSERT for ``model`` that supports ON CONFLICT upserts
+
+    PostgreSQL and SQLite (used by the tests) share the same
+    ``on_conflict_do_update`` API but need their own insert construct.
+    """
+    if _dialect_name(db) == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def month_start(db: Union[AsyncSession, Connection], column):
+    """SQL expression for the first day of the month of a date ``column``"""
+    if _dialect_name(db) == "sqlite":
+        return type_coerce(func.date(column, "start of month"), Date)
+    return func.date_trunc("month", column).cast(Date)
+
+
 async def init_db():
     """Initialize database tables"""
     from .models import Base
@@ -1,18 +1,32 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 
 from .api import (
     accounts_router,
     auth_router,
     balances_router,
+    categorization_rules_router,
+    investments_router,
     portfolios_router,
     transactions_router,
     users_router,
 )
-from .database import close_db, init_db
+from .auth.cache import user_cache
+from .auth.password import password_hasher
+from .database import AsyncSessionLocal, close_db, engine, init_db
+from .metrics import (
+    MetricsMiddleware,
+    PasswordHasherCollector,
+    PoolCollector,
+    UserCacheCollector,
+    monitor_event_loop_lag,
+    run_business_metrics_refresh,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,10 +38,18 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Personal Finance Dashboard API")
     await init_db()
+    background_tasks = [
+        asyncio.create_task(monitor_event_loop_lag()),
+        asyncio.create_task(run_business_metrics_refresh(AsyncSessionLocal)),
+    ]
     yield
     # Shutdown
     logger.info("Shutting down Personal Finance Dashboard API")
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
     await close_db()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -44,7 +66,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Pool gauges and cache counters are read from their sources on each scrape
+REGISTRY.register(PoolCollector(engine))
+REGISTRY.register(UserCacheCollector(user_cache.stats))
+REGISTRY.register(PasswordHasherCollector(password_hasher.stats))
 
 # Include API routers
 app.include_router(auth_router)
@@ -53,6 +82,8 @@ app.include_router(accounts_router)
 app.include_router(transactions_router)
 app.include_router(portfolios_router)
 app.include_router(balances_router)
+app.include_router(investments_router)
+app.include_router(categorization_rules_router)
 
 
 @app.get("/")
@@ -67,8 +98,8 @@ async def health_check():
 
 @app.get("/metrics")
 async def metrics():
-    # TODO: Implement business metrics endpoint
-    return {"total_accounts": 0, "total_portfolio_value": 0, "last_sync": None}
+    # Only reads in-process values; business gauges are refreshed in the background
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
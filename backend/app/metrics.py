@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from datetime import timezone
+from typing import Callable, Dict, Iterator, Optional, TypeVar, Union
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Metrics configuration
+METRICS_REFRESH_INTERVAL_SECONDS = float(
+    os.getenv("METRICS_REFRESH_INTERVAL_SECONDS", "60")
+)
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(
+    os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.5")
+)
+
+# Requests slower than this, or issuing more queries, are logged
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))
+SLOW_REQUEST_QUERY_THRESHOLD = int(os.getenv("SLOW_REQUEST_QUERY_THRESHOLD", "50"))
+
+# What to do when a route exceeds its declared query budget: "off", "log" or
+# "raise" (the tests raise, so N+1 regressions fail the suite)
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries issued per HTTP request",
+    ["method", "route"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per HTTP request",
+    ["method", "route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Duration of individual database queries",
+    buckets=FAST_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=FAST_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop runs a scheduled callback",
+    buckets=FAST_BUCKETS,
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Cacheable GET requests by namespace and result (hit or miss)",
+    ["namespace", "result"],
+)
+RESPONSE_CACHE_INVALIDATIONS = Counter(
+    "response_cache_invalidations_total",
+    "Per-user cache invalidations by namespace",
+    ["namespace"],
+)
+
+# Business gauges are refreshed in the background, never during a scrape
+ACCOUNTS = Gauge("finance_accounts", "Active, unarchived accounts")
+PORTFOLIO_VALUE = Gauge(
+    "finance_portfolio_value", "Total value of all active portfolios"
+)
+LAST_SYNC = Gauge(
+    "finance_last_sync_timestamp_seconds", "Unix time of the latest Plaid sync"
+)
+
+
+class RequestStats:
+    """Database work done while handling one request"""
+
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+Endpoint = TypeVar("Endpoint", bound=Callable)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a route issues more queries than its declared budget"""
+
+
+def query_budget(queries: int) -> Callable[[Endpoint], Endpoint]:
+    """Declare the most database queries a route may issue per request
+
+    Apply it below the router decorator. The count includes loading the
+    current user when it is not cached, and is checked by MetricsMiddleware
+    according to ``QUERY_BUDGET_MODE``.
+    """
+
+    def decorate(endpoint: Endpoint) -> Endpoint:
+        endpoint.query_budget = queries  # type: ignore[attr-defined]
+        return endpoint
+
+    return decorate
+
+
+# Savepoints are transaction control rather than queries, like the BEGIN and
+# COMMIT the drivers issue without a cursor, so they are not counted
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+    if statement.startswith(SAVEPOINT_STATEMENTS):
+        return
+    DB_QUERY_DURATION.observe(elapsed)
+
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute
+    if context.cursor is not None and context.connection is not None:
+        started = context.connection.info.get("query_started_at")
+        if started:
+            started.pop()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool that records how long each checkout waits"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+class PoolCollector:
+    """Reports the current state of an engine's pool on each scrape"""
+
+    GAUGES = (
+        ("db_pool_size", "Connections the pool keeps open", "size"),
+        ("db_pool_checked_out", "Connections currently in use", "checkedout"),
+        ("db_pool_checked_in", "Idle connections in the pool", "checkedin"),
+        ("db_pool_overflow", "Connections open beyond the pool size", "overflow"),
+    )
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        pool = self.engine.sync_engine.pool
+        for name, documentation, method in self.GAUGES:
+            # Pools without a fixed size (e.g. NullPool) lack some of these
+            value = getattr(pool, method, None)
+            if callable(value):
+                yield GaugeMetricFamily(name, documentation, value=value())
+
+
+class UserCacheCollector:
+    """Reports the authenticated user cache counters on each scrape"""
+
+    COUNTERS = (
+        ("user_cache_hits", "Token lookups served from the cache", "hits"),
+        ("user_cache_misses", "Token lookups that queried the database", "misses"),
+        ("user_cache_evictions", "Entries dropped to stay under the size", "evictions"),
+        ("user_cache_invalidations", "Entries dropped after a change", "invalidations"),
+    )
+
+    def __init__(self, stats: Callable[[], Dict[str, int]]):
+        self.stats = stats
+
+    def collect(self) -> Iterator[Union[CounterMetricFamily, GaugeMetricFamily]]:
+        stats = self.stats()
+        for name, documentation, key in self.COUNTERS:
+            yield CounterMetricFamily(name, documentation, value=stats[key])
+        yield GaugeMetricFamily(
+            "user_cache_size", "Users currently cached", value=stats["size"]
+        )
+
+
+class PasswordHasherCollector:
+    """Reports the password hashing pool's load on each scrape"""
+
+    GAUGES = (
+        ("password_hash_workers", "Threads available for hashing", "max_workers"),
+        ("password_hash_pending", "Hash operations running or queued", "pending"),
+        (
+            "password_hash_queue_depth",
+            "Hash operations waiting for a free thread",
+            "queue_depth",
+        ),
+    )
+
+    def __init__(self, stats: Callable[[], Dict[str, int]]):
+        self.stats = stats
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        stats = self.stats()
+        for name, documentation, key in self.GAUGES:
+            yield GaugeMetricFamily(name, documentation, value=stats[key])
+
+
+class MetricsMiddleware:
+    """Records latency and database work per route
+
+    Routes are labelled with their path template, e.g. ``/accounts/{id}``,
+    so the label set stays bounded. Responses carry a ``Server-Timing``
+    header with the queries issued before the response started, and slow
+    requests and routes over their query budget are logged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", server_timing(stats, started).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(method, route_path, status_code).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(method, route_path).observe(stats.queries)
+            REQUEST_DB_DURATION.labels(method, route_path).observe(stats.query_seconds)
+            if (
+                elapsed * 1000 > SLOW_REQUEST_THRESHOLD_MS
+                or stats.queries > SLOW_REQUEST_QUERY_THRESHOLD
+            ):
+                logger.warning(
+                    "Slow request %s %s (%s): %.1f ms, %d queries taking %.1f ms",
+                    method,
+                    route_path,
+                    status_code,
+                    elapsed * 1000,
+                    stats.queries,
+                    stats.query_seconds * 1000,
+                )
+
+        budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+        if budget is not None and stats.queries > budget:
+            check_query_budget(method, route_path, stats.queries, budget)
+
+
+def server_timing(stats: RequestStats, started: float) -> str:
+    """``Server-Timing`` value with database time, query count and total time"""
+    return (
+        f"db;dur={stats.query_seconds * 1000:.3f};count={stats.queries}, "
+        f"total;dur={(time.perf_counter() - started) * 1000:.3f}"
+    )
+
+
+def check_query_budget(method: str, route: str, queries: int, budget: int) -> None:
+    """Report a route that issued ``queries`` against a ``budget``"""
+    if QUERY_BUDGET_MODE == "off":
+        return
+    message = f"{method} {route} issued {queries} queries; its budget is {budget}"
+    if QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+async def refresh_business_metrics(db: AsyncSession) -> None:
+    """Recompute the business gauges with one aggregate query each"""
+    from .models import Account, PlaidConnection, Portfolio
+
+    ACCOUNTS.set(
+        await db.scalar(
+            select(func.count(Account.id)).where(
+                Account.is_active.is_(True), Account.is_archived.is_(False)
+            )
+        )
+        or 0
+    )
+    PORTFOLIO_VALUE.set(
+        await db.scalar(
+            select(func.coalesce(func.sum(Portfolio.total_value), 0.0)).where(
+                Portfolio.is_active.is_(True)
+            )
+        )
+        or 0.0
+    )
+    last_sync = await db.scalar(select(func.max(PlaidConnection.last_sync_at)))
+    if last_sync is not None and last_sync.tzinfo is None:
+        last_sync = last_sync.replace(tzinfo=timezone.utc)  # stored as naive UTC
+    LAST_SYNC.set(last_sync.timestamp() if last_sync else 0)
+
+
+async def run_business_metrics_refresh(
+    session_factory: Callable[[], AsyncSession],
+    interval: float = METRICS_REFRESH_INTERVAL_SECONDS,
+) -> None:
+    """Keep the business gauges fresh until cancelled"""
+    while True:
+        try:
+            async with session_factory() as db:
+                await refresh_business_metrics(db)
+        except Exception:
+            logger.exception("Failed to refresh business metrics")
+        await asyncio.sleep(interval)
+
+
+async def monitor_event_loop_lag(
+    interval: float = EVENT_LOOP_LAG_INTERVAL_SECONDS,
+) -> None:
+    """Measure how late the loop wakes from a sleep, until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - expected))
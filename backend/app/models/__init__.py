@@ -1,9 +1,19 @@
 from .account import Account, AccountType
 from .balance_snapshot import BalanceSnapshot
 from .base import Base
+from .categorization_rule import CategorizationRule
+from .daily_net_worth import DailyNetWorth
 from .investment import Investment, InvestmentType
+from .monthly_category_total import MonthlyCategoryTotal
 from .plaid_connection import PlaidConnection
 from .portfolio import Portfolio, PortfolioItem
+from .portfolio_daily_value import PortfolioDailyValue
+from .portfolio_item_snapshot import PortfolioItemSnapshot
+from .recurring_series import (
+    RecurringCadence,
+    RecurringDetectionState,
+    RecurringSeries,
+)
 from .transaction import Transaction, TransactionCategory
 from .user import User
 
@@ -14,10 +24,18 @@ __all__ = [
     "AccountType",
     "Transaction",
     "TransactionCategory",
+    "CategorizationRule",
+    "RecurringSeries",
+    "RecurringCadence",
+    "RecurringDetectionState",
     "Portfolio",
     "PortfolioItem",
+    "PortfolioDailyValue",
+    "PortfolioItemSnapshot",
     "Investment",
     "InvestmentType",
     "BalanceSnapshot",
+    "DailyNetWorth",
+    "MonthlyCategoryTotal",
     "PlaidConnection",
 ]
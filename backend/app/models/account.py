@@ -1,6 +1,16 @@
 import enum
 
-from sqlalchemy import Boolean, Column, Enum, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -40,6 +50,11 @@ class Account(Base):
     is_archived = Column(Boolean, default=False, nullable=False)
     meta_data = Column(Text, nullable=True)  # JSON string for additional account data
 
+    __table_args__ = (
+        # Every per-user listing filters on user_id and excludes archived accounts
+        Index("ix_accounts_user_id_is_archived", user_id, is_archived),
+    )
+
     # Relationships
     user = relationship("User", back_populates="accounts")
     transactions = relationship(
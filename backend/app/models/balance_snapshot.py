@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -17,6 +17,8 @@ class BalanceSnapshot(Base):
     currency = Column(String(3), default="USD", nullable=False)
     meta_data = Column(Text, nullable=True)  # JSON string for additional snapshot data
 
+    __table_args__ = (Index("ix_balance_snapshots_account_id_date", account_id, date),)
+
     # Relationships
     account = relationship("Account", back_populates="balance_snapshots")
 
@@ -0,0 +1,36 @@
+from sqlalchemy import Boolean, Column, Enum, Float, ForeignKey, Index, Integer, String
+
+from .base import Base
+from .transaction import TransactionCategory
+
+
+class CategorizationRule(Base):
+    """CategorizationRule model for a user's automatic transaction categories
+
+    A rule matches a transaction when every condition that is set holds.
+    Text conditions are case-insensitive. The matching rule with the lowest
+    ``priority`` (then ``id``) sets the category.
+    """
+
+    __tablename__ = "categorization_rules"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category: "Column[TransactionCategory]" = Column(
+        Enum(TransactionCategory), nullable=False
+    )
+    priority = Column(Integer, default=100, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+
+    # Conditions
+    merchant_equals = Column(String(255), nullable=True)
+    description_contains = Column(String(255), nullable=True)
+    description_regex = Column(String(500), nullable=True)
+    min_amount = Column(Float, nullable=True)
+    max_amount = Column(Float, nullable=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
+
+    __table_args__ = (Index("ix_categorization_rules_user_id", user_id),)
+
+    def __repr__(self):
+        return f"<CategorizationRule(id={self.id}, user_id={self.user_id}, category={self.category})>"
@@ -0,0 +1,28 @@
+import datetime
+
+from sqlalchemy import Date, Float, ForeignKey, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class DailyNetWorth(Base):
+    """DailyNetWorth model for the per-user daily net worth rollup
+
+    Each row is the sum of a user's balance snapshots for one day, kept in
+    step with ``balance_snapshots`` by ``app.services.net_worth``.
+    """
+
+    __tablename__ = "daily_net_worth"
+
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), primary_key=True
+    )
+    date: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    total: Mapped[float] = mapped_column(Float, nullable=False)
+    by_account_type: Mapped[str] = mapped_column(
+        Text, nullable=False
+    )  # JSON string mapping account type to balance
+
+    def __repr__(self):
+        return f"<DailyNetWorth(user_id={self.user_id}, date={self.date}, total={self.total})>"
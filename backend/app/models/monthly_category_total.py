@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer, String
+
+from .base import Base
+
+
+class MonthlyCategoryTotal(Base):
+    """MonthlyCategoryTotal model for the per-user monthly category rollup
+
+    Each row sums a user's transactions in one category for one month, kept
+    in step with ``transactions`` by ``app.services.category_totals``.
+    Uncategorized transactions are counted under ``"uncategorized"``.
+    """
+
+    __tablename__ = "monthly_category_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # First day of the month
+    category = Column(String(50), primary_key=True)
+    total = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    income = Column(Float, nullable=False)  # Sum of positive amounts
+    spending = Column(Float, nullable=False)  # Sum of negative amounts, as positive
+
+    def __repr__(self):
+        return (
+            f"<MonthlyCategoryTotal(user_id={self.user_id}, month={self.month}, "
+            f"category={self.category}, total={self.total})>"
+        )
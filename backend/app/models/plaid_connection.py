@@ -1,5 +1,17 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import relationship
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
 
@@ -9,22 +21,33 @@ class PlaidConnection(Base):
 
     __tablename__ = "plaid_connections"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # The columns the sync worker reads and writes are typed so it can pass
+    # them on as plain values
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
     plaid_item_id = Column(String(255), unique=True, nullable=False)  # Plaid's item ID
-    access_token = Column(Text, nullable=False)  # Encrypted access token
+    access_token: Mapped[str] = mapped_column(
+        Text, nullable=False
+    )  # Encrypted access token
     institution_id = Column(String(255), nullable=False)
     institution_name = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
-    last_sync_at = Column(DateTime, nullable=True)
-    sync_status = Column(
+    last_sync_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    sync_status: Mapped[str] = mapped_column(
         String(50), default="pending", nullable=False
     )  # pending, success, error
-    error_message = Column(Text, nullable=True)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    sync_cursor: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True
+    )  # Plaid /transactions/sync cursor
     meta_data = Column(
         Text, nullable=True
     )  # JSON string for additional connection data
 
+    __table_args__ = (Index("ix_plaid_connections_user_id", "user_id"),)
+
     # Relationships
     user = relationship("User", back_populates="plaid_connections")
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -22,6 +22,8 @@ class Portfolio(Base):
     )  # JSON string for target asset allocation
     meta_data = Column(Text, nullable=True)  # JSON string for additional portfolio data
 
+    __table_args__ = (Index("ix_portfolios_user_id_is_active", user_id, is_active),)
+
     # Relationships
     user = relationship("User", back_populates="portfolios")
     items = relationship(
@@ -48,6 +50,8 @@ class PortfolioItem(Base):
     target_allocation = Column(Float, nullable=True)  # Target percentage in portfolio
     meta_data = Column(Text, nullable=True)  # JSON string for additional item data
 
+    __table_args__ = (Index("ix_portfolio_items_portfolio_id", portfolio_id),)
+
     # Relationships
     portfolio = relationship("Portfolio", back_populates="items")
     investment = relationship("Investment", back_populates="portfolio_items")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer
+
+from .base import Base
+
+
+class PortfolioDailyValue(Base):
+    """PortfolioDailyValue model for each portfolio's value history
+
+    One row per portfolio per day, written by the valuation service.
+    ``net_flow`` is the money moved in (or, when negative, out) that day by
+    buying or selling holdings, valued at the day's price; price moves and
+    cost basis edits are not flows.
+    """
+
+    __tablename__ = "portfolio_daily_values"
+
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    market_value = Column(Float, nullable=False)
+    cost_basis = Column(Float, nullable=False)
+    net_flow = Column(Float, default=0.0, nullable=False)
+
+    def __repr__(self):
+        return f"<PortfolioDailyValue(portfolio_id={self.portfolio_id}, date={self.date}, market_value={self.market_value})>"
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Date, Float, ForeignKey, Index, Integer
+
+from .base import Base
+
+
+class PortfolioItemSnapshot(Base):
+    """PortfolioItemSnapshot model for a portfolio's holdings on one day
+
+    Items of the same investment are combined. The table is range-partitioned
+    by date on PostgreSQL (yearly partitions are created by
+    ``app.services.holdings_history``, and the migration adds a default
+    partition for any other date), so a date range reads whole pages.
+    """
+
+    __tablename__ = "portfolio_item_snapshots"
+
+    date = Column(Date, primary_key=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id"), primary_key=True)
+    investment_id = Column(Integer, ForeignKey("investments.id"), primary_key=True)
+    quantity = Column(Float, nullable=False)
+    cost_basis = Column(Float, nullable=False)
+    market_value = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_portfolio_item_snapshots_portfolio_id_date", portfolio_id, date),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+    def __repr__(self):
+        return (
+            f"<PortfolioItemSnapshot(date={self.date}, portfolio_id={self.portfolio_id}, "
+            f"investment_id={self.investment_id})>"
+        )
@@ -0,0 +1,65 @@
+import enum
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+
+from .base import Base
+
+
+class RecurringCadence(enum.Enum):
+    """Enumeration for recurring transaction cadences"""
+
+    WEEKLY = "weekly"
+    BIWEEKLY = "biweekly"
+    MONTHLY = "monthly"
+    ANNUAL = "annual"
+
+
+class RecurringSeries(Base):
+    """RecurringSeries model for detected recurring transactions
+
+    One row per merchant and amount band whose transactions repeat at a
+    regular cadence. Rows are replaced by the recurring detector whenever
+    the merchant's transactions change.
+    """
+
+    __tablename__ = "recurring_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    merchant = Column(String(255), nullable=False)  # Normalized merchant key
+    cadence: "Column[RecurringCadence]" = Column(Enum(RecurringCadence), nullable=False)
+    average_amount = Column(Float, nullable=False)
+    transaction_count = Column(Integer, nullable=False)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    next_expected_date = Column(Date, nullable=False)
+    is_active = Column(Boolean, default=True, nullable=False)
+
+    __table_args__ = (Index("ix_recurring_series_user_id_merchant", user_id, merchant),)
+
+    def __repr__(self):
+        return f"<RecurringSeries(id={self.id}, merchant='{self.merchant}', cadence={self.cadence})>"
+
+
+class RecurringDetectionState(Base):
+    """RecurringDetectionState model for each user's last detector run"""
+
+    __tablename__ = "recurring_detection_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # Database time the last run started; later changes are examined next
+    last_run_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<RecurringDetectionState(user_id={self.user_id}, last_run_at={self.last_run_at})>"
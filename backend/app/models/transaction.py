@@ -7,9 +7,11 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    func,
 )
 from sqlalchemy.orm import relationship
 
@@ -64,6 +66,44 @@ class Transaction(Base):
         Text, nullable=True
     )  # JSON string for additional transaction data
 
+    __table_args__ = (
+        # Matches the (date, id) newest-first ordering of GET /transactions
+        Index(
+            "ix_transactions_account_id_date_id",
+            account_id,
+            date.desc(),
+            id.desc(),
+        ),
+        # Trigram indexes for substring search (q=) on PostgreSQL
+        Index(
+            "ix_transactions_description_trgm",
+            description,
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_transactions_merchant_name_trgm",
+            merchant_name,
+            postgresql_using="gin",
+            postgresql_ops={"merchant_name": "gin_trgm_ops"},
+        ),
+        # Incremental recurring detection: the rows written since the last
+        # run, then the rows of the merchants they touched, by merchant name
+        # or by description prefix (LIKE 'key%' needs pattern ops)
+        Index("ix_transactions_account_id_updated_at", account_id, "updated_at"),
+        Index(
+            "ix_transactions_account_id_merchant_key",
+            account_id,
+            func.lower(func.trim(merchant_name)),
+        ),
+        Index(
+            "ix_transactions_account_id_description_prefix",
+            account_id,
+            func.lower(description).label("description_prefix"),
+            postgresql_ops={"description_prefix": "text_pattern_ops"},
+        ),
+    )
+
     # Relationships
     account = relationship("Account", back_populates="transactions")
 
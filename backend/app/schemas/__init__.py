@@ -1,12 +1,28 @@
 from .account import AccountCreate, AccountResponse, AccountUpdate
 from .balance import BalanceOverviewResponse, BalanceSnapshotResponse
+from .categorization_rule import (
+    CategorizationRuleCreate,
+    CategorizationRuleResponse,
+    CategorizationRuleUpdate,
+    RecategorizeResponse,
+)
+from .investment import (
+    InvestmentPrice,
+    InvestmentPriceBulkResponse,
+    InvestmentPriceBulkUpdate,
+)
 from .portfolio import (
+    HoldingValuation,
+    PerformancePeriod,
     PortfolioCreate,
     PortfolioItemCreate,
     PortfolioItemResponse,
+    PortfolioItemSnapshotResponse,
     PortfolioItemUpdate,
+    PortfolioPerformanceResponse,
     PortfolioResponse,
     PortfolioUpdate,
+    PortfolioValuationResponse,
 )
 from .transaction import TransactionCreate, TransactionResponse, TransactionUpdate
 from .user import Token, UserCreate, UserLogin, UserResponse, UserUpdate
@@ -29,6 +45,18 @@ __all__ = [
     "PortfolioItemCreate",
     "PortfolioItemUpdate",
     "PortfolioItemResponse",
+    "InvestmentPrice",
+    "InvestmentPriceBulkUpdate",
+    "InvestmentPriceBulkResponse",
+    "HoldingValuation",
+    "PortfolioValuationResponse",
+    "PerformancePeriod",
+    "PortfolioPerformanceResponse",
+    "PortfolioItemSnapshotResponse",
     "BalanceSnapshotResponse",
     "BalanceOverviewResponse",
+    "CategorizationRuleCreate",
+    "CategorizationRuleUpdate",
+    "CategorizationRuleResponse",
+    "RecategorizeResponse",
 ]
@@ -1,3 +1,4 @@
+import enum
 from datetime import date, datetime
 from typing import Dict, List, Optional
 
@@ -28,12 +29,32 @@ class AccountBalance(BaseModel):
     last_updated: datetime
 
 
+class NetWorthPoint(BaseModel):
+    date: date
+    balance: float
+
+
+class NetWorthHistoryPoint(NetWorthPoint):
+    by_account_type: Dict[str, float]
+
+
+class NetWorthRange(str, enum.Enum):
+    """Enumeration for net worth history ranges"""
+
+    ONE_MONTH = "1M"
+    THREE_MONTHS = "3M"
+    SIX_MONTHS = "6M"
+    ONE_YEAR = "1Y"
+    FIVE_YEARS = "5Y"
+    ALL = "all"
+
+
 class BalanceOverviewResponse(BaseModel):
     total_balance: float
     total_available_balance: float
     currency: str
     accounts: List[AccountBalance]
-    net_worth_trend: List[Dict[str, float]]  # List of {date: balance} objects
+    net_worth_trend: List[NetWorthPoint]
     last_updated: datetime
 
     class Config:
@@ -0,0 +1,134 @@
+import re
+import re._parser as sre_parse
+from datetime import datetime
+from typing import List, Optional, Set
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from ..models.transaction import TransactionCategory
+
+# Rule fields that restrict which transactions match
+CONDITION_FIELDS = (
+    "merchant_equals",
+    "description_contains",
+    "description_regex",
+    "min_amount",
+    "max_amount",
+    "account_id",
+)
+
+
+def _alternatives_overlap(branches: List) -> bool:
+    """Whether two alternatives could start matching at the same character"""
+    seen: Set[str] = set()
+    for branch in branches:
+        if not branch or branch[0][0] != sre_parse.LITERAL:
+            return True
+        first = chr(branch[0][1]).lower()
+        if first in seen:
+            return True
+        seen.add(first)
+    return False
+
+
+def _backtracking_risk(items: List, repeated: bool = False) -> Optional[str]:
+    """Why a parsed regex could backtrack exponentially, if it could
+
+    Rules run against every transaction description, so patterns such as
+    ``(a+)+`` or ``(a|ab)*`` are rejected rather than left to stall the
+    matcher on an unlucky input. Possessive repeats and atomic groups never
+    backtrack and are not inspected.
+    """
+    for op, arg in items:
+        children: List = []
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            _, high, body = arg
+            if high > 1 and repeated:
+                return "nested quantifiers"
+            children = [(body, repeated or high > 1)]
+        elif op == sre_parse.BRANCH:
+            if repeated and _alternatives_overlap(arg[1]):
+                return "overlapping alternatives inside a quantifier"
+            children = [(branch, repeated) for branch in arg[1]]
+        elif op == sre_parse.SUBPATTERN:
+            children = [(arg[3], repeated)]
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            children = [(arg[1], repeated)]
+
+        for child, child_repeated in children:
+            reason = _backtracking_risk(child, child_repeated)
+            if reason:
+                return reason
+    return None
+
+
+class CategorizationRuleBase(BaseModel):
+    category: TransactionCategory
+    priority: int = Field(default=100, ge=0, description="Lower runs first")
+    is_active: bool = Field(default=True)
+    merchant_equals: Optional[str] = Field(None, min_length=1, max_length=255)
+    description_contains: Optional[str] = Field(None, min_length=1, max_length=255)
+    description_regex: Optional[str] = Field(None, min_length=1, max_length=500)
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    account_id: Optional[int] = None
+
+    @field_validator("description_regex")
+    @classmethod
+    def check_regex(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            try:
+                re.compile(value)
+            except re.error as exc:
+                raise ValueError(f"Invalid regular expression: {exc}")
+        return value
+
+    @model_validator(mode="after")
+    def check_conditions(self):
+        if all(getattr(self, field) is None for field in CONDITION_FIELDS):
+            raise ValueError("A rule needs at least one condition")
+        if (
+            self.min_amount is not None
+            and self.max_amount is not None
+            and self.min_amount > self.max_amount
+        ):
+            raise ValueError("min_amount must not be greater than max_amount")
+        return self
+
+
+class CategorizationRuleCreate(CategorizationRuleBase):
+    # Checked on writes only, so rules stored before the check still load
+    @field_validator("description_regex")
+    @classmethod
+    def check_regex_backtracking(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            reason = _backtracking_risk(list(sre_parse.parse(value)))
+            if reason:
+                raise ValueError(f"Regular expression is too slow to match: {reason}")
+        return value
+
+
+class CategorizationRuleUpdate(BaseModel):
+    category: Optional[TransactionCategory] = None
+    priority: Optional[int] = Field(None, ge=0)
+    is_active: Optional[bool] = None
+    merchant_equals: Optional[str] = Field(None, min_length=1, max_length=255)
+    description_contains: Optional[str] = Field(None, min_length=1, max_length=255)
+    description_regex: Optional[str] = Field(None, min_length=1, max_length=500)
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    account_id: Optional[int] = None
+
+
+class CategorizationRuleResponse(CategorizationRuleBase):
+    id: int
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class RecategorizeResponse(BaseModel):
+    task_id: str
@@ -0,0 +1,26 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class InvestmentPrice(BaseModel):
+    symbol: str = Field(..., min_length=1, max_length=20)
+    price: float = Field(..., gt=0)
+    price_date: Optional[date] = None  # Defaults to today
+
+    @field_validator("symbol")
+    @classmethod
+    def normalize_symbol(cls, value: str) -> str:
+        return value.strip().upper()
+
+
+class InvestmentPriceBulkUpdate(BaseModel):
+    prices: List[InvestmentPrice] = Field(..., min_length=1, max_length=10000)
+
+
+class InvestmentPriceBulkResponse(BaseModel):
+    updated: int
+    unchanged: int
+    unknown_symbols: List[str]
+    revalued_portfolios: int
@@ -1,5 +1,6 @@
-from datetime import datetime
-from typing import Optional
+import enum
+from datetime import date, datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -75,3 +76,57 @@ class PortfolioItemResponse(PortfolioItemBase):
 
     class Config:
         from_attributes = True
+
+
+class HoldingValuation(BaseModel):
+    item_id: int
+    investment_id: int
+    market_value: float
+    cost_basis: float
+    unrealized_gain_loss: float
+    unrealized_gain_loss_percent: float
+    weight: float
+    target_allocation: Optional[float]
+    drift: Optional[float]
+
+
+class PortfolioValuationResponse(BaseModel):
+    portfolio_id: int
+    total_value: float
+    holdings: List[HoldingValuation]
+
+
+class PerformancePeriod(str, enum.Enum):
+    """Enumeration for portfolio performance periods"""
+
+    ONE_MONTH = "1M"
+    THREE_MONTHS = "3M"
+    SIX_MONTHS = "6M"
+    YEAR_TO_DATE = "YTD"
+    ONE_YEAR = "1Y"
+    THREE_YEARS = "3Y"
+    FIVE_YEARS = "5Y"
+    ALL = "all"
+
+
+class PortfolioPerformanceResponse(BaseModel):
+    portfolio_id: int
+    period: PerformancePeriod
+    start_date: Optional[date]
+    end_date: Optional[date]
+    start_value: float
+    end_value: float
+    net_cash_flow: float
+    time_weighted_return: Optional[float]  # Fraction over the period
+    money_weighted_return: Optional[float]  # Annualized XIRR fraction
+
+
+class PortfolioItemSnapshotResponse(BaseModel):
+    date: date
+    investment_id: int
+    quantity: float
+    cost_basis: float
+    market_value: float
+
+    class Config:
+        from_attributes = True
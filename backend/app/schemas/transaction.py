@@ -1,11 +1,30 @@
+import datetime as dt
+import enum
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
+from ..models.recurring_series import RecurringCadence
 from ..models.transaction import TransactionCategory
 
 
+class TransactionExportFormat(str, enum.Enum):
+    """Enumeration for transaction export formats"""
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class TransactionSummaryGroupBy(str, enum.Enum):
+    """Enumeration for transaction summary groupings"""
+
+    CATEGORY = "category"
+    MERCHANT = "merchant"
+    MONTH = "month"
+    ACCOUNT = "account"
+
+
 class TransactionBase(BaseModel):
     amount: float = Field(
         ...,
@@ -32,7 +51,8 @@ class TransactionCreate(TransactionBase):
 class TransactionUpdate(BaseModel):
     amount: Optional[float] = None
     currency: Optional[str] = Field(None, max_length=3)
-    date: Optional[date] = None
+    # The field shadows ``date`` within the class body, so use the module path
+    date: Optional[dt.date] = None
     description: Optional[str] = Field(None, max_length=500)
     merchant_name: Optional[str] = Field(None, max_length=255)
     category: Optional[TransactionCategory] = None
@@ -54,3 +74,62 @@ class TransactionResponse(TransactionBase):
 
     class Config:
         from_attributes = True
+
+
+class TransactionBulkCreate(BaseModel):
+    transactions: List[TransactionCreate] = Field(..., min_length=1, max_length=5000)
+
+
+class TransactionBulkStatus(str, enum.Enum):
+    """Enumeration for the outcome of one row of a bulk ingest"""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    FAILED = "failed"
+
+
+class TransactionBulkResult(BaseModel):
+    index: int
+    status: TransactionBulkStatus
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class TransactionBulkResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[TransactionBulkResult]
+
+
+class TransactionSummaryGroup(BaseModel):
+    key: Optional[str] = Field(
+        None,
+        description="Category, merchant name, month (YYYY-MM) or account ID",
+    )
+    transaction_count: int
+    total_amount: float
+    income: float = Field(..., description="Sum of positive amounts")
+    spending: float = Field(..., description="Sum of negative amounts, as positive")
+
+
+class TransactionSummaryResponse(BaseModel):
+    group_by: TransactionSummaryGroupBy
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    groups: List[TransactionSummaryGroup]
+
+
+class RecurringSeriesResponse(BaseModel):
+    id: int
+    merchant: str = Field(..., description="Normalized merchant name")
+    cadence: RecurringCadence
+    average_amount: float
+    transaction_count: int
+    first_date: date
+    last_date: date
+    next_expected_date: date
+    is_active: bool
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,66 @@
+from .categorization import (
+    RuleMatcher,
+    matcher_cache,
+    recategorize_transactions,
+    recategorize_user,
+)
+from .category_totals import (
+    rebuild_category_totals,
+    summarize_category_totals,
+    update_category_totals,
+)
+from .holdings_history import (
+    apply_snapshot_retention,
+    snapshot_portfolios,
+    write_item_snapshots,
+)
+from .net_worth import (
+    backfill_daily_net_worth,
+    get_net_worth_history,
+    refresh_daily_net_worth,
+)
+from .performance import get_portfolio_performance, portfolio_returns, xirr
+from .plaid_client import FakePlaidClient, PlaidApiClient, get_plaid_client
+from .plaid_sync import PlaidSyncWorker
+from .prices import CsvPriceSource, apply_prices, get_price_source, refresh_prices
+from .recurring import (
+    detect_recurring_transactions,
+    detect_user_recurring,
+    find_cadences,
+)
+from .transaction_ingest import upsert_transactions
+from .valuation import group_valuations, revalue_portfolios, value_holdings
+
+__all__ = [
+    "RuleMatcher",
+    "matcher_cache",
+    "recategorize_transactions",
+    "recategorize_user",
+    "rebuild_category_totals",
+    "summarize_category_totals",
+    "update_category_totals",
+    "apply_snapshot_retention",
+    "snapshot_portfolios",
+    "write_item_snapshots",
+    "backfill_daily_net_worth",
+    "get_net_worth_history",
+    "refresh_daily_net_worth",
+    "get_portfolio_performance",
+    "portfolio_returns",
+    "xirr",
+    "FakePlaidClient",
+    "PlaidApiClient",
+    "get_plaid_client",
+    "PlaidSyncWorker",
+    "CsvPriceSource",
+    "apply_prices",
+    "get_price_source",
+    "refresh_prices",
+    "detect_recurring_transactions",
+    "detect_user_recurring",
+    "find_cadences",
+    "upsert_transactions",
+    "group_valuations",
+    "revalue_portfolios",
+    "value_holdings",
+]
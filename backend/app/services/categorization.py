@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from pydantic import BaseModel
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import TRANSACTIONS, response_cache
+from ..models.account import Account
+from ..models.categorization_rule import CategorizationRule
+from ..models.transaction import Transaction, TransactionCategory
+from .category_totals import update_category_totals
+
+logger = logging.getLogger(__name__)
+
+# Compiled matchers kept in memory, one per user
+CATEGORIZATION_CACHE_SIZE = int(os.getenv("CATEGORIZATION_CACHE_SIZE", "1024"))
+# Transactions read and updated per statement when re-categorizing
+RECATEGORIZE_BATCH_SIZE = int(os.getenv("RECATEGORIZE_BATCH_SIZE", "5000"))
+
+# Shortest literal regex prefix worth screening on
+MIN_LITERAL_LENGTH = 3
+
+# (account_id, amount, description, merchant_name) of one transaction
+MatchInput = Tuple[int, float, str, Optional[str]]
+
+
+@dataclass
+class _CompiledRule:
+    category: TransactionCategory
+    merchant: Optional[str]
+    contains: Optional[str]
+    regex: Optional[Pattern]
+    min_amount: Optional[float]
+    max_amount: Optional[float]
+    account_id: Optional[int]
+
+    def matches(
+        self,
+        account_id: int,
+        amount: float,
+        description: str,
+        folded_description: str,
+        folded_merchant: str,
+    ) -> bool:
+        return (
+            (self.account_id is None or self.account_id == account_id)
+            and (self.min_amount is None or amount >= self.min_amount)
+            and (self.max_amount is None or amount <= self.max_amount)
+            and (self.merchant is None or self.merchant == folded_merchant)
+            and (self.contains is None or self.contains in folded_description)
+            and (self.regex is None or self.regex.search(description) is not None)
+        )
+
+
+def _folded(text: Optional[str]) -> Optional[str]:
+    return text.lower() if text else None
+
+
+def _compile_rule(rule: CategorizationRule) -> _CompiledRule:
+    regex = rule.description_regex
+    return _CompiledRule(
+        category=rule.category,  # type: ignore[arg-type]
+        merchant=_folded(rule.merchant_equals),  # type: ignore[arg-type]
+        contains=_folded(rule.description_contains),  # type: ignore[arg-type]
+        regex=re.compile(regex, re.IGNORECASE) if regex else None,  # type: ignore
+        min_amount=rule.min_amount,  # type: ignore[arg-type]
+        max_amount=rule.max_amount,  # type: ignore[arg-type]
+        account_id=rule.account_id,  # type: ignore[arg-type]
+    )
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Literal text every match of ``pattern`` starts with, if it is simple
+
+    Used to screen regex rules with the same trie as "contains" rules, so
+    only the transactions that contain the literal run the regex.
+    """
+    if "|" in pattern:
+        return ""
+    prefix: List[str] = []
+    index = 1 if pattern.startswith("^") else 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\" and index + 1 < len(pattern):
+            escaped = pattern[index + 1]
+            if escaped.isalnum():  # A class such as \d or \b
+                break
+            char, index = escaped, index + 1
+        elif char in ".^$*+?{}[]()|":
+            break
+        prefix.append(char)
+        index += 1
+    # A quantifier applies to the last literal character only
+    if index < len(pattern) and pattern[index] in "*?{":
+        prefix = prefix[:-1]
+    return "".join(prefix).lower()
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation of ``words`` factored into a trie
+
+    Shared prefixes are tested once, which the regex engine handles far
+    faster than a flat alternation. Optional suffixes are greedy, so at any
+    position the longest word is matched.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [
+            re.escape(char) + emit(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class RuleMatcher:
+    """A user's active rules compiled into one matcher
+
+    Each transaction is screened once against a merchant lookup table, a
+    single trie regex over every "description contains" text and one merged
+    regex over every "description regex". Only the rules these point at,
+    plus rules with no text condition, are then checked in priority order.
+    """
+
+    def __init__(self, rules: Sequence[CategorizationRule]):
+        ordered = sorted(rules, key=lambda rule: (rule.priority, rule.id))
+        self.rules = [_compile_rule(rule) for rule in ordered]
+
+        self._by_merchant: Dict[str, List[int]] = {}
+        self._by_text: Dict[str, List[int]] = {}
+        self._by_account: Dict[Optional[int], List[int]] = {}
+        self._regex_rules: List[int] = []
+        for index, rule in enumerate(self.rules):
+            # Screen each rule on one condition that can be looked up; the
+            # rest are checked when it is a candidate
+            literal = _literal_prefix(rule.regex.pattern) if rule.regex else ""
+            if rule.merchant is not None:
+                self._by_merchant.setdefault(rule.merchant, []).append(index)
+            elif rule.contains is not None:
+                self._by_text.setdefault(rule.contains, []).append(index)
+            elif len(literal) >= MIN_LITERAL_LENGTH:
+                self._by_text.setdefault(literal, []).append(index)
+            elif rule.regex is not None:
+                self._regex_rules.append(index)
+            else:
+                self._by_account.setdefault(rule.account_id, []).append(index)
+
+        # The trie regex reports the longest text at each position, so also
+        # credit the shorter texts found inside it
+        self._text_rules: Dict[str, List[int]] = {
+            text: sorted(
+                index
+                for other, indexes in self._by_text.items()
+                if other in text
+                for index in indexes
+            )
+            for text in self._by_text
+        }
+        self._texts: Optional[Pattern] = None
+        if self._by_text:
+            self._texts = re.compile(f"(?=({_trie_pattern(self._by_text)}))")
+
+        self._any_regex: Optional[Pattern] = None
+        if self._regex_rules:
+            merged = "|".join(
+                f"(?:{self.rules[index].regex.pattern})"  # type: ignore[union-attr]
+                for index in self._regex_rules
+            )
+            try:
+                self._any_regex = re.compile(merged, re.IGNORECASE)
+            except re.error:
+                # Patterns that cannot be combined (e.g. repeated group
+                # names) are only checked one by one
+                self._any_regex = None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def categorize(
+        self,
+        account_id: int,
+        amount: float,
+        description: str,
+        merchant_name: Optional[str],
+    ) -> Optional[TransactionCategory]:
+        """Category of the first matching rule, or None if no rule matches"""
+        folded_description = description.lower()
+        folded_merchant = merchant_name.lower() if merchant_name else ""
+
+        candidates: Set[int] = set(self._by_account.get(None, ()))
+        candidates.update(self._by_account.get(account_id, ()))
+        candidates.update(self._by_merchant.get(folded_merchant, ()))
+        if self._texts is not None:
+            for text in self._texts.findall(folded_description):
+                candidates.update(self._text_rules[text])
+        if self._regex_rules and (
+            self._any_regex is None or self._any_regex.search(description)
+        ):
+            candidates.update(self._regex_rules)
+
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            if rule.matches(
+                account_id, amount, description, folded_description, folded_merchant
+            ):
+                return rule.category
+        return None
+
+    def categorize_many(
+        self, transactions: Iterable[MatchInput]
+    ) -> List[Optional[TransactionCategory]]:
+        return [self.categorize(*transaction) for transaction in transactions]
+
+
+class MatcherCache:
+    """In-process LRU of compiled matchers, keyed by user
+
+    Each lookup compares a fingerprint of the user's rules (count, highest
+    ID and latest update) so matchers are rebuilt only after the rules
+    change, including changes made by another process. Rule writes in
+    this process also call ``invalidate`` directly.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, Tuple[tuple, RuleMatcher]]" = OrderedDict()
+
+    async def get(self, db: AsyncSession, user_id: int) -> RuleMatcher:
+        fingerprint = tuple(
+            (
+                await db.execute(
+                    select(
+                        func.count(CategorizationRule.id),
+                        func.max(CategorizationRule.id),
+                        func.max(CategorizationRule.updated_at),
+                    ).where(CategorizationRule.user_id == user_id)
+                )
+            ).one()
+        )
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] == fingerprint:
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+        rules = (
+            await db.scalars(
+                select(CategorizationRule).where(
+                    CategorizationRule.user_id == user_id,
+                    CategorizationRule.is_active.is_(True),
+                )
+            )
+        ).all()
+        matcher = RuleMatcher(rules)
+        self._entries[user_id] = (fingerprint, matcher)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return matcher
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+matcher_cache = MatcherCache(CATEGORIZATION_CACHE_SIZE)
+
+
+class RecategorizeResult(BaseModel):
+    users: int = 0
+    scanned: int = 0
+    updated: int = 0
+
+
+async def recategorize_user(
+    db: AsyncSession, user_id: int, batch_size: int = RECATEGORIZE_BATCH_SIZE
+) -> RecategorizeResult:
+    """Apply a user's rules to all of their transactions without committing
+
+    Transactions are read in ID order in batches. Those whose category
+    changes are written with one executemany UPDATE per batch and the
+    monthly category totals are moved along with them. Transactions no
+    rule matches keep their category.
+    """
+    result = RecategorizeResult(users=1)
+    matcher = await matcher_cache.get(db, user_id)
+    if not len(matcher):
+        return result
+
+    last_id = 0
+    while True:
+        rows = (
+            await db.execute(
+                select(
+                    Transaction.id,
+                    Transaction.account_id,
+                    Transaction.amount,
+                    Transaction.description,
+                    Transaction.merchant_name,
+                    Transaction.date,
+                    Transaction.category,
+                )
+                .join(Account)
+                .where(Account.user_id == user_id, Transaction.id > last_id)
+                .order_by(Transaction.id)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        result.scanned += len(rows)
+
+        categories = matcher.categorize_many(
+            (row.account_id, row.amount, row.description, row.merchant_name)
+            for row in rows
+        )
+        changed = [
+            (row, category)
+            for row, category in zip(rows, categories)
+            if category is not None and category != row.category
+        ]
+        if not changed:
+            continue
+
+        await db.execute(
+            update(Transaction),
+            [{"id": row.id, "category": category} for row, category in changed],
+        )
+        await update_category_totals(
+            db,
+            added=[
+                (row.account_id, row.date, category, row.amount)
+                for row, category in changed
+            ],
+            removed=[
+                (row.account_id, row.date, row.category, row.amount)
+                for row, _ in changed
+            ],
+        )
+        result.updated += len(changed)
+
+    return result
+
+
+async def recategorize_transactions(
+    session_factory: Callable[[], AsyncSession],
+    user_ids: Optional[List[int]] = None,
+    batch_size: int = RECATEGORIZE_BATCH_SIZE,
+) -> RecategorizeResult:
+    """Background job: re-apply the rules of every user that has active rules
+
+    Each user is committed on its own so a failure only loses that user.
+    """
+    async with session_factory() as db:
+        query = select(CategorizationRule.user_id).where(
+            CategorizationRule.is_active.is_(True)
+        )
+        if user_ids is not None:
+            query = query.where(CategorizationRule.user_id.in_(user_ids))
+        users = (
+            (await db.execute(query.distinct().order_by(CategorizationRule.user_id)))
+            .scalars()
+            .all()
+        )
+
+    total = RecategorizeResult()
+    for user_id in users:
+        async with session_factory() as db:
+            result = await recategorize_user(db, user_id, batch_size)
+            await db.commit()
+        if result.updated:
+            await response_cache.invalidate(user_id, TRANSACTIONS)
+
+        total.users += 1
+        total.scanned += result.scanned
+        total.updated += result.updated
+
+    logger.info(
+        "Re-categorized %d of %d transactions for %d users",
+        total.updated,
+        total.scanned,
+        total.users,
+    )
+    return total
+
+
+async def main(user_ids: Optional[List[int]] = None) -> None:
+    from ..database import AsyncSessionLocal, close_db
+
+    result = await recategorize_transactions(AsyncSessionLocal, user_ids)
+    await close_db()
+
+    print(
+        f"Re-categorized {result.updated} of {result.scanned} transactions "
+        f"for {result.users} users"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply categorization rules to existing transactions"
+    )
+    parser.add_argument(
+        "--user-id", type=int, action="append", help="Only this user (repeatable)"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_id))
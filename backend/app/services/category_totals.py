@@ -0,0 +1,380 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import (
+    Connection,
+    Row,
+    Select,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert, month_start
+from ..models.account import Account
+from ..models.monthly_category_total import MonthlyCategoryTotal
+from ..models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Category stored for transactions without one
+UNCATEGORIZED = "uncategorized"
+
+# Rows written per INSERT when rebuilding the rollup
+REBUILD_BATCH_SIZE = 1000
+
+# Largest difference between stored and recomputed amounts that still matches
+VERIFY_TOLERANCE = 0.005
+
+# (account_id, date, category, amount) of one transaction
+TransactionValues = Tuple[int, date, object, float]
+
+TOTAL_FIELDS = ("total", "count", "income", "spending")
+
+
+class CategoryTotalsCheck(BaseModel):
+    users: int = 0
+    rows: int = 0
+    mismatched: int = 0
+    written: int = 0
+
+
+def category_key(category) -> str:
+    """Stored category for a transaction category enum, string or None"""
+    if category is None:
+        return UNCATEGORIZED
+    return getattr(category, "value", category)
+
+
+def _deltas(
+    added: Iterable[TransactionValues], removed: Iterable[TransactionValues]
+) -> Dict[Tuple[int, date, str], List[float]]:
+    """Net change to (total, count, income, spending) per account, month, category"""
+    deltas: Dict[Tuple[int, date, str], List[float]] = defaultdict(
+        lambda: [0.0, 0, 0.0, 0.0]
+    )
+    for sign, transactions in ((-1, removed), (1, added)):
+        for account_id, transaction_date, category, amount in transactions:
+            delta = deltas[
+                (account_id, transaction_date.replace(day=1), category_key(category))
+            ]
+            delta[0] += sign * amount
+            delta[1] += sign
+            delta[2] += sign * max(amount, 0.0)
+            delta[3] += sign * max(-amount, 0.0)
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+
+def apply_category_deltas(
+    connection: Connection,
+    added: Iterable[TransactionValues] = (),
+    removed: Iterable[TransactionValues] = (),
+) -> None:
+    """Add ``added`` transactions to the rollup and take ``removed`` ones out
+
+    Each touched (user, month, category) row gets one upserted increment,
+    so the cost depends on how many transactions changed rather than on
+    the size of the history. Rows left without transactions are deleted.
+    """
+    deltas = _deltas(added, removed)
+    if not deltas:
+        return
+
+    account_ids = {account_id for account_id, _, _ in deltas}
+    owners = {
+        account_id: user_id
+        for account_id, user_id in connection.execute(
+            select(Account.id, Account.user_id).where(Account.id.in_(account_ids))
+        )
+    }
+
+    rows: Dict[Tuple[int, date, str], Dict] = {}
+    for (account_id, month, category), delta in deltas.items():
+        if account_id not in owners:
+            continue
+        key = (owners[account_id], month, category)
+        row = rows.setdefault(
+            key,
+            {"user_id": key[0], "month": month, "category": category}
+            | dict.fromkeys(TOTAL_FIELDS, 0),
+        )
+        for field, value in zip(TOTAL_FIELDS, delta):
+            row[field] += value
+    if not rows:
+        return
+
+    statement = dialect_insert(connection, MonthlyCategoryTotal)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                MonthlyCategoryTotal.user_id,
+                MonthlyCategoryTotal.month,
+                MonthlyCategoryTotal.category,
+            ],
+            set_={
+                **{
+                    field: getattr(MonthlyCategoryTotal, field)
+                    + statement.excluded[field]
+                    for field in TOTAL_FIELDS
+                },
+                "updated_at": func.now(),
+            },
+        ),
+        list(rows.values()),
+    )
+    connection.execute(
+        delete(MonthlyCategoryTotal).where(
+            MonthlyCategoryTotal.user_id.in_({user_id for user_id, _, _ in rows}),
+            MonthlyCategoryTotal.count <= 0,
+        )
+    )
+
+
+async def update_category_totals(
+    db: AsyncSession,
+    added: Iterable[TransactionValues] = (),
+    removed: Iterable[TransactionValues] = (),
+) -> None:
+    """Update the rollup after writing transactions without the ORM (bulk writes)"""
+    added, removed = list(added), list(removed)
+    await db.run_sync(
+        lambda session: apply_category_deltas(session.connection(), added, removed)
+    )
+
+
+def _grouped_transactions_query(connection: Connection):
+    month = month_start(connection, Transaction.date)
+    return (
+        select(
+            Account.user_id,
+            month,
+            Transaction.category,
+            func.sum(Transaction.amount),
+            func.count(Transaction.id),
+            func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0)),
+            func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0)),
+        )
+        .join(Account)
+        .group_by(Account.user_id, month, Transaction.category)
+    )
+
+
+def _matches(stored: Optional[Row], expected: Dict) -> bool:
+    if stored is None or stored.count != expected["count"]:
+        return False
+    return all(
+        abs(getattr(stored, field) - expected[field]) <= VERIFY_TOLERANCE
+        for field in ("total", "income", "spending")
+    )
+
+
+def rebuild_rollup(
+    connection: Connection, user_id: Optional[int] = None, verify_only: bool = False
+) -> CategoryTotalsCheck:
+    """Recompute the rollup from transactions and compare it with the stored rows
+
+    Users are checked one at a time; a user whose rows differ has them
+    replaced unless ``verify_only`` is set.
+    """
+    if user_id is None:
+        user_ids: Iterable[int] = connection.execute(
+            select(Account.user_id)
+            .join(Transaction)
+            .distinct()
+            .union(select(MonthlyCategoryTotal.user_id).distinct())
+        ).scalars()
+    else:
+        user_ids = [user_id]
+
+    check = CategoryTotalsCheck()
+    for current_user_id in sorted(user_ids):
+        expected = {}
+        for _, month, category, total, count, income, spending in connection.execute(
+            _grouped_transactions_query(connection).where(
+                Account.user_id == current_user_id
+            )
+        ):
+            key = (month, category_key(category))
+            expected[key] = {
+                "user_id": current_user_id,
+                "month": month,
+                "category": key[1],
+                "total": float(total),
+                "count": count,
+                "income": float(income),
+                "spending": float(spending),
+            }
+        stored = {
+            (row.month, row.category): row
+            for row in connection.execute(
+                select(
+                    MonthlyCategoryTotal.month,
+                    MonthlyCategoryTotal.category,
+                    *(getattr(MonthlyCategoryTotal, f) for f in TOTAL_FIELDS),
+                ).where(MonthlyCategoryTotal.user_id == current_user_id)
+            )
+        }
+
+        mismatched = len(
+            [key for key in expected if not _matches(stored.get(key), expected[key])]
+        ) + len(set(stored) - set(expected))
+        check.users += 1
+        check.rows += len(expected)
+        check.mismatched += mismatched
+        if not mismatched or verify_only:
+            continue
+
+        logger.warning(
+            "Rebuilding %d mismatched category totals for user %s",
+            mismatched,
+            current_user_id,
+        )
+        connection.execute(
+            delete(MonthlyCategoryTotal).where(
+                MonthlyCategoryTotal.user_id == current_user_id
+            )
+        )
+        rows = list(expected.values())
+        for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+            connection.execute(
+                insert(MonthlyCategoryTotal),
+                rows[start : start + REBUILD_BATCH_SIZE],
+            )
+        check.written += len(rows)
+    return check
+
+
+async def rebuild_category_totals(
+    db: AsyncSession, user_id: Optional[int] = None, verify_only: bool = False
+) -> CategoryTotalsCheck:
+    """Verify the rollup against transactions and repair it unless ``verify_only``"""
+    return await db.run_sync(
+        lambda session: rebuild_rollup(session.connection(), user_id, verify_only)
+    )
+
+
+def _history_value(state, attribute: str, previous: bool):
+    history = state.attrs[attribute].history
+    values = (history.deleted if previous else history.added) or history.unchanged
+    return values[0] if values else None
+
+
+def _transaction_values(state, previous: bool) -> Optional[TransactionValues]:
+    values = tuple(
+        _history_value(state, attribute, previous)
+        for attribute in ("account_id", "date", "category", "amount")
+    )
+    if values[0] is None or values[1] is None or values[3] is None:
+        return None
+    return values  # type: ignore[return-value]
+
+
+@event.listens_for(Session, "after_flush")
+def _update_totals_after_flush(session: Session, flush_context) -> None:
+    """Keep the rollup in step with transactions written through the ORM"""
+    added: List[TransactionValues] = []
+    removed: List[TransactionValues] = []
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Transaction):
+            continue
+
+        state = inspect(obj)
+        if obj not in session.new:
+            previous = _transaction_values(state, previous=True)
+            if previous is None:
+                logger.warning(
+                    "Previous values of transaction %s were not loaded; run "
+                    "python -m app.services.category_totals to repair the rollup",
+                    obj.id,
+                )
+            else:
+                removed.append(previous)
+        if obj not in session.deleted:
+            current = _transaction_values(state, previous=False)
+            if current is not None:
+                added.append(current)
+
+    if added or removed:
+        apply_category_deltas(session.connection(), added, removed)
+
+
+def category_totals_query(
+    user_id: int,
+    by_month: bool,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    category: Optional[str] = None,
+) -> Select:
+    """Select a user's (key, count, total, income, spending) per category or month"""
+    key = MonthlyCategoryTotal.month if by_month else MonthlyCategoryTotal.category
+    query = select(
+        key,
+        func.sum(MonthlyCategoryTotal.count),
+        func.sum(MonthlyCategoryTotal.total),
+        func.sum(MonthlyCategoryTotal.income),
+        func.sum(MonthlyCategoryTotal.spending),
+    ).where(MonthlyCategoryTotal.user_id == user_id)
+    if start_month:
+        query = query.where(MonthlyCategoryTotal.month >= start_month)
+    if end_month:
+        query = query.where(MonthlyCategoryTotal.month <= end_month)
+    if category:
+        query = query.where(MonthlyCategoryTotal.category == category)
+    return query.group_by(key).order_by(key)
+
+
+async def summarize_category_totals(
+    db: AsyncSession,
+    user_id: int,
+    by_month: bool,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    category: Optional[str] = None,
+) -> List[Tuple]:
+    """A user's (key, count, total, income, spending) per category or month
+
+    Reads the rollup rather than transactions, so the cost depends on the
+    number of months and categories rather than on the number of transactions.
+    """
+    query = category_totals_query(user_id, by_month, start_month, end_month, category)
+    result = await db.execute(query)
+    return [tuple(row) for row in result.all()]
+
+
+async def main(user_id: Optional[int] = None, verify_only: bool = False) -> None:
+    from ..database import AsyncSessionLocal, close_db
+
+    async with AsyncSessionLocal() as db:
+        check = await rebuild_category_totals(db, user_id, verify_only)
+        await db.commit()
+    await close_db()
+
+    print(
+        f"Checked {check.rows} category totals for {check.users} users: "
+        f"{check.mismatched} mismatched, {check.written} rows rewritten"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Verify and rebuild the monthly category totals from transactions"
+    )
+    parser.add_argument("--user-id", type=int, help="Only check this user's rows")
+    parser.add_argument(
+        "--verify-only", action="store_true", help="Report mismatches without fixing"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_id, args.verify_only))
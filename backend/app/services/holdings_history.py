@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import calendar
+import logging
+import os
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import Date, and_, delete, func, insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import PORTFOLIOS, response_cache
+from ..models.portfolio import Portfolio, PortfolioItem
+from ..models.portfolio_item_snapshot import PortfolioItemSnapshot
+from .valuation import revalue_portfolios
+
+logger = logging.getLogger(__name__)
+
+# Retention policy: daily snapshots are thinned to one per week once they are
+# older than PORTFOLIO_SNAPSHOT_DAILY_MONTHS, and dropped entirely after
+# PORTFOLIO_SNAPSHOT_RETENTION_MONTHS (0 keeps them forever)
+PORTFOLIO_SNAPSHOT_DAILY_MONTHS = int(os.getenv("PORTFOLIO_SNAPSHOT_DAILY_MONTHS", "6"))
+PORTFOLIO_SNAPSHOT_RETENTION_MONTHS = int(
+    os.getenv("PORTFOLIO_SNAPSHOT_RETENTION_MONTHS", "0")
+)
+
+
+class SnapshotResult(BaseModel):
+    snapshot_date: date
+    portfolios: int = 0
+    downsampled: int = 0
+    expired: int = 0
+
+
+def months_before(day: date, months: int) -> date:
+    """The same day ``months`` earlier, clamped to the end of shorter months"""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    last_day = calendar.monthrange(year, month + 1)[1]
+    return date(year, month + 1, min(day.day, last_day))
+
+
+async def ensure_snapshot_partitions(db: AsyncSession, years: Iterable[int]) -> None:
+    """Create the yearly PostgreSQL partitions that will receive snapshots"""
+    if db.bind.dialect.name != "postgresql":
+        return
+    for year in sorted(set(years)):
+        await db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS portfolio_item_snapshots_{year:04d} "
+                "PARTITION OF portfolio_item_snapshots "
+                f"FOR VALUES FROM ('{year:04d}-01-01') TO ('{year + 1:04d}-01-01')"
+            )
+        )
+
+
+async def write_item_snapshots(
+    db: AsyncSession,
+    snapshot_date: date,
+    portfolio_ids: Optional[List[int]] = None,
+) -> int:
+    """Replace the day's holdings snapshot of active portfolios without committing
+
+    The holdings are copied from ``portfolio_items`` with one
+    ``INSERT ... SELECT``, so no rows pass through Python. Returns the number
+    of rows written.
+    """
+    portfolio_filter = [Portfolio.is_active.is_(True)]
+    if portfolio_ids is not None:
+        portfolio_filter.append(Portfolio.id.in_(portfolio_ids))
+
+    await ensure_snapshot_partitions(db, [snapshot_date.year])
+    await db.execute(
+        delete(PortfolioItemSnapshot).where(
+            PortfolioItemSnapshot.date == snapshot_date,
+            PortfolioItemSnapshot.portfolio_id.in_(
+                select(Portfolio.id).where(*portfolio_filter)
+            ),
+        )
+    )
+
+    source = (
+        select(
+            literal(snapshot_date, Date),
+            Portfolio.id,
+            PortfolioItem.investment_id,
+            func.sum(PortfolioItem.quantity),
+            func.sum(PortfolioItem.quantity * PortfolioItem.average_cost),
+            func.sum(PortfolioItem.current_value),
+        )
+        .join(PortfolioItem, PortfolioItem.portfolio_id == Portfolio.id)
+        .where(*portfolio_filter)
+        .group_by(Portfolio.id, PortfolioItem.investment_id)
+    )
+    result = await db.execute(
+        insert(PortfolioItemSnapshot).from_select(
+            [
+                "date",
+                "portfolio_id",
+                "investment_id",
+                "quantity",
+                "cost_basis",
+                "market_value",
+            ],
+            source,
+        )
+    )
+    return result.rowcount
+
+
+async def apply_snapshot_retention(
+    db: AsyncSession,
+    today: date,
+    daily_months: int = PORTFOLIO_SNAPSHOT_DAILY_MONTHS,
+    retention_months: int = PORTFOLIO_SNAPSHOT_RETENTION_MONTHS,
+) -> SnapshotResult:
+    """Downsample and expire old snapshots without committing
+
+    Before the daily cutoff only the last snapshot date of each ISO week is
+    kept. The distinct dates are few, so the weeks are picked in Python and
+    each policy is a single DELETE.
+    """
+    result = SnapshotResult(snapshot_date=today)
+
+    if retention_months:
+        expired = await db.execute(
+            delete(PortfolioItemSnapshot).where(
+                PortfolioItemSnapshot.date < months_before(today, retention_months)
+            )
+        )
+        result.expired = expired.rowcount
+
+    daily_cutoff = months_before(today, daily_months)
+    old_dates = (
+        await db.scalars(
+            select(PortfolioItemSnapshot.date)
+            .where(PortfolioItemSnapshot.date < daily_cutoff)
+            .distinct()
+        )
+    ).all()
+    last_in_week: Dict[Tuple[int, int], date] = {}
+    for snapshot_date in old_dates:
+        week = snapshot_date.isocalendar()[:2]
+        last_in_week[week] = max(snapshot_date, last_in_week.get(week, snapshot_date))
+
+    thinned = set(old_dates) - set(last_in_week.values())
+    if thinned:
+        downsampled = await db.execute(
+            delete(PortfolioItemSnapshot).where(
+                PortfolioItemSnapshot.date.in_(sorted(thinned))
+            )
+        )
+        result.downsampled = downsampled.rowcount
+
+    return result
+
+
+async def snapshot_portfolios(
+    session_factory: Callable[[], AsyncSession],
+    snapshot_date: Optional[date] = None,
+) -> SnapshotResult:
+    """Daily job: revalue every portfolio, snapshot its holdings, apply retention"""
+    snapshot_date = snapshot_date or date.today()
+
+    async with session_factory() as db:
+        valuations = await revalue_portfolios(db)
+        await write_item_snapshots(db, snapshot_date)
+        result = await apply_snapshot_retention(db, snapshot_date)
+        await ensure_snapshot_partitions(
+            db, [(snapshot_date + timedelta(days=31)).year]
+        )
+        owners = (
+            (
+                await db.execute(
+                    select(Portfolio.user_id)
+                    .where(Portfolio.id.in_(list(valuations.portfolio_totals)))
+                    .distinct()
+                )
+            )
+            .scalars()
+            .all()
+        )
+        await db.commit()
+
+    for user_id in owners:
+        await response_cache.invalidate(user_id, PORTFOLIOS)
+
+    result.portfolios = len(valuations.portfolio_totals)
+    logger.info(
+        "Snapshotted %d portfolios for %s; downsampled %d and expired %d rows",
+        result.portfolios,
+        snapshot_date,
+        result.downsampled,
+        result.expired,
+    )
+    return result
+
+
+async def get_holdings_history(
+    db: AsyncSession,
+    portfolio_id: int,
+    user_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Optional[List[PortfolioItemSnapshot]]:
+    """A user's portfolio holdings by date, or None if there is no such portfolio"""
+    history_filter = [PortfolioItemSnapshot.portfolio_id == Portfolio.id]
+    if start_date:
+        history_filter.append(PortfolioItemSnapshot.date >= start_date)
+    if end_date:
+        history_filter.append(PortfolioItemSnapshot.date <= end_date)
+
+    # As with portfolio items, a missing portfolio gives no rows and one
+    # without history gives a single NULL snapshot
+    result = await db.execute(
+        select(Portfolio.id, PortfolioItemSnapshot)
+        .outerjoin(PortfolioItemSnapshot, and_(*history_filter))
+        .where(Portfolio.id == portfolio_id, Portfolio.user_id == user_id)
+        .order_by(PortfolioItemSnapshot.date, PortfolioItemSnapshot.investment_id)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+    return [snapshot for _, snapshot in rows if snapshot is not None]
+
+
+async def main(snapshot_date: Optional[date] = None) -> None:
+    from ..database import AsyncSessionLocal, close_db
+
+    result = await snapshot_portfolios(AsyncSessionLocal, snapshot_date)
+    await close_db()
+
+    print(
+        f"Snapshotted {result.portfolios} portfolios, downsampled "
+        f"{result.downsampled} and expired {result.expired} rows"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot portfolio holdings")
+    parser.add_argument(
+        "--date", type=date.fromisoformat, help="Snapshot date (default: today)"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.date))
@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date
+from itertools import chain, product
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import (
+    Connection,
+    Select,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.account import Account
+from ..models.balance_snapshot import BalanceSnapshot
+from ..models.daily_net_worth import DailyNetWorth
+
+# Rows written per INSERT when rebuilding the rollup
+REBUILD_BATCH_SIZE = 1000
+
+# Account columns the rollup depends on; changing one refreshes every day the
+# account has a snapshot for
+ROLLUP_ACCOUNT_ATTRIBUTES = ("type", "is_archived")
+
+
+def _rollup_rows(grouped_rows: Iterable) -> List[dict]:
+    """Fold (user_id, date, account type, balance) groups into rollup rows"""
+    totals: Dict[Tuple[int, date], Dict[str, float]] = defaultdict(dict)
+    for user_id, snapshot_date, account_type, balance in grouped_rows:
+        totals[(user_id, snapshot_date)][account_type.value] = float(balance)
+
+    return [
+        {
+            "user_id": user_id,
+            "date": snapshot_date,
+            "total": sum(by_type.values()),
+            "by_account_type": json.dumps(by_type, sort_keys=True),
+        }
+        for (user_id, snapshot_date), by_type in totals.items()
+    ]
+
+
+def _grouped_snapshots_query():
+    return (
+        select(
+            Account.user_id,
+            BalanceSnapshot.date,
+            Account.type,
+            func.sum(BalanceSnapshot.balance),
+        )
+        .join(Account)
+        .where(Account.is_archived.is_(False))
+        .group_by(Account.user_id, BalanceSnapshot.date, Account.type)
+    )
+
+
+def refresh_rollup(
+    connection: Connection, account_dates: Iterable[Tuple[int, date]]
+) -> None:
+    """Recompute the rollup rows touched by snapshots on (account_id, date)
+
+    Only the affected user/day pairs are recomputed, so the cost depends on
+    how many snapshots changed rather than on the size of the history.
+    """
+    account_dates = set(account_dates)
+    if not account_dates:
+        return
+
+    account_ids = {account_id for account_id, _ in account_dates}
+    owners: Dict[int, int] = {
+        account_id: user_id
+        for account_id, user_id in connection.execute(
+            select(Account.id, Account.user_id).where(Account.id.in_(account_ids))
+        )
+    }
+
+    dates_by_user: Dict[int, Set[date]] = defaultdict(set)
+    for account_id, snapshot_date in account_dates:
+        if account_id in owners:
+            dates_by_user[owners[account_id]].add(snapshot_date)
+
+    for user_id, dates in dates_by_user.items():
+        grouped = connection.execute(
+            _grouped_snapshots_query().where(
+                Account.user_id == user_id, BalanceSnapshot.date.in_(dates)
+            )
+        ).all()
+
+        connection.execute(
+            delete(DailyNetWorth).where(
+                DailyNetWorth.user_id == user_id, DailyNetWorth.date.in_(dates)
+            )
+        )
+        rows = _rollup_rows(grouped)
+        if rows:
+            connection.execute(insert(DailyNetWorth), rows)
+
+
+def rebuild_rollup(connection: Connection, user_id: Optional[int] = None) -> int:
+    """Recompute the whole rollup, or one user's part of it, from snapshots
+
+    Users are rebuilt one at a time so memory use is bounded by the longest
+    single history rather than by the whole table.
+    """
+    if user_id is None:
+        connection.execute(delete(DailyNetWorth))
+        user_ids = list(
+            connection.execute(
+                select(Account.user_id)
+                .join(BalanceSnapshot)
+                .distinct()
+                .order_by(Account.user_id)
+            ).scalars()
+        )
+    else:
+        connection.execute(
+            delete(DailyNetWorth).where(DailyNetWorth.user_id == user_id)
+        )
+        user_ids = [user_id]
+
+    written = 0
+    for current_user_id in user_ids:
+        rows = _rollup_rows(
+            connection.execute(
+                _grouped_snapshots_query().where(Account.user_id == current_user_id)
+            )
+        )
+        for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+            connection.execute(
+                insert(DailyNetWorth), rows[start : start + REBUILD_BATCH_SIZE]
+            )
+        written += len(rows)
+    return written
+
+
+async def refresh_daily_net_worth(
+    db: AsyncSession, account_dates: Iterable[Tuple[int, date]]
+) -> None:
+    """Update the rollup after writing snapshots without the ORM (bulk inserts)"""
+    account_dates = set(account_dates)
+    await db.run_sync(
+        lambda session: refresh_rollup(session.connection(), account_dates)
+    )
+
+
+async def backfill_daily_net_worth(
+    db: AsyncSession, user_id: Optional[int] = None
+) -> int:
+    """Rebuild the rollup from existing snapshots and return the rows written"""
+    return await db.run_sync(
+        lambda session: rebuild_rollup(session.connection(), user_id)
+    )
+
+
+def net_worth_history_query(user_id: int, start_date: Optional[date] = None) -> Select:
+    """Select a user's daily net worth rows, oldest first, optionally from a date"""
+    query = select(DailyNetWorth).where(DailyNetWorth.user_id == user_id)
+    if start_date:
+        query = query.where(DailyNetWorth.date >= start_date)
+    return query.order_by(DailyNetWorth.date)
+
+
+async def get_net_worth_history(
+    db: AsyncSession, user_id: int, start_date: Optional[date] = None
+) -> List[DailyNetWorth]:
+    """Get a user's daily net worth, oldest first, optionally from a date"""
+    result = await db.execute(net_worth_history_query(user_id, start_date))
+    return list(result.scalars().all())
+
+
+def _account_snapshot_dates(
+    connection: Connection, account_ids: Set[int]
+) -> Set[Tuple[int, date]]:
+    if not account_ids:
+        return set()
+    return {
+        (account_id, snapshot_date)
+        for account_id, snapshot_date in connection.execute(
+            select(BalanceSnapshot.account_id, BalanceSnapshot.date).where(
+                BalanceSnapshot.account_id.in_(account_ids)
+            )
+        )
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_rollup_after_flush(session: Session, flush_context) -> None:
+    """Keep the rollup in step with snapshots and accounts written through the ORM
+
+    Archiving an account or changing its type touches its whole history, so
+    every day the account has a snapshot for is recomputed.
+    """
+    account_dates: Set[Tuple[int, date]] = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, BalanceSnapshot):
+            continue
+
+        # Include the previous account/date too, in case either was changed
+        state = inspect(obj)
+        account_ids = state.attrs.account_id.history.sum()
+        dates = state.attrs.date.history.sum()
+        account_dates.update(
+            (account_id, snapshot_date)
+            for account_id, snapshot_date in product(account_ids, dates)
+            if account_id is not None and snapshot_date is not None
+        )
+
+    # New accounts have no snapshots yet, so only updated ones are checked
+    changed_accounts: Set[int] = set()
+    for obj in session.dirty:
+        if not isinstance(obj, Account):
+            continue
+        state = inspect(obj)
+        if state.identity and any(
+            state.attrs[name].history.has_changes()
+            for name in ROLLUP_ACCOUNT_ATTRIBUTES
+        ):
+            changed_accounts.update(state.identity)
+
+    if account_dates or changed_accounts:
+        connection = session.connection()
+        account_dates |= _account_snapshot_dates(connection, changed_accounts)
+        refresh_rollup(connection, account_dates)
+
+
+async def main(user_id: Optional[int] = None) -> None:
+    from ..database import AsyncSessionLocal, close_db
+
+    async with AsyncSessionLocal() as db:
+        rows = await backfill_daily_net_worth(db, user_id)
+        await db.commit()
+    await close_db()
+
+    print(f"Wrote {rows} daily net worth rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backfill the daily net worth rollup from balance snapshots"
+    )
+    parser.add_argument("--user-id", type=int, help="Only rebuild this user's rows")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_id))
@@ -0,0 +1,182 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.portfolio import Portfolio
+from ..models.portfolio_daily_value import PortfolioDailyValue
+from ..schemas.portfolio import PerformancePeriod
+
+# Days covered by each performance period; None means the whole history
+PERFORMANCE_PERIOD_DAYS = {
+    PerformancePeriod.ONE_MONTH: 30,
+    PerformancePeriod.THREE_MONTHS: 91,
+    PerformancePeriod.SIX_MONTHS: 182,
+    PerformancePeriod.ONE_YEAR: 365,
+    PerformancePeriod.THREE_YEARS: 3 * 365,
+    PerformancePeriod.FIVE_YEARS: 5 * 365,
+    PerformancePeriod.ALL: None,
+}
+
+# XIRR solver settings
+XIRR_TOLERANCE = 1e-10
+XIRR_MAX_ITERATIONS = 50
+# Candidate rates searched for a sign change when Newton's method fails
+XIRR_BRACKET_RATES = np.concatenate(
+    [-1 + np.geomspace(1e-6, 1, 40, endpoint=False), np.geomspace(1e-6, 1e4, 60)]
+)
+
+
+def period_start(period: PerformancePeriod, as_of: date) -> Optional[date]:
+    """First day of ``period`` ending on ``as_of``"""
+    if period == PerformancePeriod.YEAR_TO_DATE:
+        return date(as_of.year, 1, 1)
+    days = PERFORMANCE_PERIOD_DAYS[period]
+    return as_of - timedelta(days=days) if days else None
+
+
+def time_weighted_return(values: np.ndarray, flows: np.ndarray) -> Optional[float]:
+    """Chain daily returns, treating each day's flow as arriving at its start
+
+    ``values[i]`` is the value at the end of day ``i`` and ``flows[i]`` the
+    net amount added that day. Days that start with nothing invested are
+    skipped.
+    """
+    if len(values) < 2:
+        return None
+    start = values[:-1] + flows[1:]
+    growth = np.divide(values[1:], start, out=np.ones_like(start), where=start > 0)
+    return float(np.prod(growth) - 1)
+
+
+def _npv(rates: np.ndarray, amounts: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """Net present value of the cash flows at each of ``rates`` at once"""
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        return (1 + rates[:, None]) ** -years @ amounts
+
+
+def xirr(amounts: np.ndarray, years: np.ndarray, guess: float = 0.1) -> Optional[float]:
+    """Annual rate at which the cash flows' net present value is zero
+
+    Uses Newton's method from ``guess``. If that diverges, a sign change is
+    located by evaluating the NPV at a grid of rates in one pass and then
+    bisected. Returns None when the flows have no root.
+    """
+    if not (amounts > 0).any() or not (amounts < 0).any():
+        return None
+
+    rate = guess
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        for _ in range(XIRR_MAX_ITERATIONS):
+            discount = (1 + rate) ** -years
+            npv = amounts @ discount
+            slope = -(years * amounts) @ (discount / (1 + rate))
+            if not np.isfinite(slope) or slope == 0:
+                break
+            step = npv / slope
+            rate -= step
+            if not np.isfinite(rate) or rate <= -1:
+                break
+            if abs(step) < XIRR_TOLERANCE:
+                return float(rate)
+
+    npvs = _npv(XIRR_BRACKET_RATES, amounts, years)
+    signs = np.sign(npvs)
+    crossings = np.flatnonzero(
+        np.isfinite(npvs[:-1]) & np.isfinite(npvs[1:]) & (signs[:-1] != signs[1:])
+    )
+    if not len(crossings):
+        return None
+
+    low, high = XIRR_BRACKET_RATES[crossings[0] : crossings[0] + 2]
+    low_npv = npvs[crossings[0]]
+    for _ in range(200):
+        mid = (low + high) / 2
+        mid_npv = _npv(np.array([mid]), amounts, years)[0]
+        if np.sign(mid_npv) == np.sign(low_npv):
+            low, low_npv = mid, mid_npv
+        else:
+            high = mid
+        if high - low < XIRR_TOLERANCE:
+            break
+    return float((low + high) / 2)
+
+
+def portfolio_returns(
+    dates: np.ndarray, market_value: np.ndarray, flows: np.ndarray
+) -> Dict[str, Any]:
+    """Time- and money-weighted returns of a daily value history
+
+    ``market_value`` and ``flows`` hold one value per day; ``flows`` is the
+    net cash added that day. Returns are fractions; XIRR is annualized.
+    """
+    # Investor cash flows: the starting value and later contributions are
+    # paid in, the final value is received
+    amounts = -flows
+    if len(amounts):
+        amounts[0] = -market_value[0]
+        amounts[-1] += market_value[-1]
+    days = (dates - dates[:1]).astype("timedelta64[D]").astype(np.float64)
+
+    return {
+        "start_value": float(market_value[0]) if len(market_value) else 0.0,
+        "end_value": float(market_value[-1]) if len(market_value) else 0.0,
+        "net_cash_flow": float(flows[1:].sum()),
+        "time_weighted_return": time_weighted_return(market_value, flows),
+        "money_weighted_return": (
+            xirr(amounts, days / 365) if len(amounts) > 1 else None
+        ),
+    }
+
+
+async def get_portfolio_performance(
+    db: AsyncSession,
+    portfolio_id: int,
+    user_id: int,
+    period: PerformancePeriod,
+    as_of: date,
+) -> Optional[Dict[str, Any]]:
+    """Returns of a user's portfolio over ``period`` ending on ``as_of``
+
+    The ownership check and the history read are one statement. Returns
+    None if the user has no such portfolio.
+    """
+    start = period_start(period, as_of)
+    history_filter = and_(
+        PortfolioDailyValue.portfolio_id == Portfolio.id,
+        PortfolioDailyValue.date <= as_of,
+    )
+    if start is not None:
+        history_filter = and_(history_filter, PortfolioDailyValue.date >= start)
+
+    result = await db.execute(
+        select(
+            Portfolio.id,
+            PortfolioDailyValue.date,
+            PortfolioDailyValue.market_value,
+            PortfolioDailyValue.net_flow,
+        )
+        .outerjoin(PortfolioDailyValue, history_filter)
+        .where(Portfolio.id == portfolio_id, Portfolio.user_id == user_id)
+        .order_by(PortfolioDailyValue.date)
+    )
+    rows = result.all()
+    if not rows:
+        return None
+
+    history = [row for row in rows if row.date is not None]
+    dates = np.array([row.date for row in history], dtype="datetime64[D]")
+    returns = portfolio_returns(
+        dates,
+        np.array([row.market_value for row in history], dtype=np.float64),
+        np.array([row.net_flow for row in history], dtype=np.float64),
+    )
+    return {
+        "portfolio_id": portfolio_id,
+        "period": period,
+        "start_date": history[0].date if history else None,
+        "end_date": history[-1].date if history else None,
+        **returns,
+    }
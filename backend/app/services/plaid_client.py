@@ -0,0 +1,234 @@
+import asyncio
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+from pydantic import BaseModel
+
+# Plaid API configuration
+PLAID_CLIENT_ID = os.getenv("PLAID_CLIENT_ID", "")
+PLAID_SECRET = os.getenv("PLAID_SECRET", "")
+PLAID_ENV = os.getenv("PLAID_ENV", "sandbox")
+PLAID_SYNC_PAGE_SIZE = int(os.getenv("PLAID_SYNC_PAGE_SIZE", "500"))
+
+
+class PlaidError(Exception):
+    """Raised when a Plaid API call fails"""
+
+
+class PlaidRateLimitError(PlaidError):
+    """Raised when Plaid rejects a call because of rate limiting"""
+
+
+class PlaidAccountData(BaseModel):
+    account_id: str
+    name: str
+    mask: Optional[str] = None
+    type: str
+    subtype: Optional[str] = None
+    current_balance: Optional[float] = None
+    available_balance: Optional[float] = None
+    currency: Optional[str] = None
+
+
+class PlaidTransactionData(BaseModel):
+    transaction_id: str
+    account_id: str
+    amount: float  # Plaid convention: positive when money leaves the account
+    currency: Optional[str] = None
+    date: date
+    name: str
+    merchant_name: Optional[str] = None
+    pending: bool = False
+    payment_channel: Optional[str] = None
+    category: Optional[str] = None  # personal_finance_category.primary
+    subcategory: Optional[str] = None  # personal_finance_category.detailed
+    check_number: Optional[str] = None
+
+
+class PlaidSyncPage(BaseModel):
+    added: List[PlaidTransactionData] = []
+    modified: List[PlaidTransactionData] = []
+    removed: List[str] = []
+    next_cursor: str
+    has_more: bool = False
+
+
+class PlaidClient(Protocol):
+    """The Plaid calls needed by the sync worker"""
+
+    async def get_accounts(self, access_token: str) -> List[PlaidAccountData]: ...
+
+    async def sync_transactions(
+        self, access_token: str, cursor: Optional[str]
+    ) -> PlaidSyncPage: ...
+
+
+def _value(field: Any) -> Any:
+    """Unwrap plaid-python enum models to their plain value"""
+    return getattr(field, "value", field)
+
+
+class PlaidApiClient:
+    """Plaid client backed by plaid-python
+
+    plaid-python is synchronous, so each call runs in a worker thread to keep
+    the event loop free while many connections sync at once.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        secret: str,
+        environment: str = "sandbox",
+        page_size: int = PLAID_SYNC_PAGE_SIZE,
+    ):
+        import plaid
+        from plaid.api import plaid_api
+
+        configuration = plaid.Configuration(
+            host=getattr(plaid.Environment, environment.capitalize()),
+            api_key={"clientId": client_id, "secret": secret},
+        )
+        self._api = plaid_api.PlaidApi(plaid.ApiClient(configuration))
+        self.page_size = page_size
+
+    async def get_accounts(self, access_token: str) -> List[PlaidAccountData]:
+        """Get the accounts of an item with their cached balances"""
+        from plaid.model.accounts_get_request import AccountsGetRequest
+
+        response = await self._call(
+            self._api.accounts_get, AccountsGetRequest(access_token=access_token)
+        )
+        return [
+            PlaidAccountData(
+                account_id=account["account_id"],
+                name=account["name"],
+                mask=account.get("mask"),
+                type=str(_value(account["type"])),
+                subtype=_value(account.get("subtype")),
+                current_balance=account["balances"].get("current"),
+                available_balance=account["balances"].get("available"),
+                currency=account["balances"].get("iso_currency_code"),
+            )
+            for account in response["accounts"]
+        ]
+
+    async def sync_transactions(
+        self, access_token: str, cursor: Optional[str]
+    ) -> PlaidSyncPage:
+        """Get one page of transaction changes since ``cursor``"""
+        from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+        request_args: Dict[str, Any] = {
+            "access_token": access_token,
+            "count": self.page_size,
+        }
+        if cursor:
+            request_args["cursor"] = cursor
+
+        response = await self._call(
+            self._api.transactions_sync, TransactionsSyncRequest(**request_args)
+        )
+        return PlaidSyncPage(
+            added=[self._transaction_data(t) for t in response["added"]],
+            modified=[self._transaction_data(t) for t in response["modified"]],
+            removed=[t["transaction_id"] for t in response["removed"]],
+            next_cursor=response["next_cursor"],
+            has_more=response["has_more"],
+        )
+
+    @staticmethod
+    def _transaction_data(transaction) -> PlaidTransactionData:
+        category = transaction.get("personal_finance_category")
+        return PlaidTransactionData(
+            transaction_id=transaction["transaction_id"],
+            account_id=transaction["account_id"],
+            amount=transaction["amount"],
+            currency=transaction.get("iso_currency_code"),
+            date=transaction["date"],
+            name=transaction["name"],
+            merchant_name=transaction.get("merchant_name"),
+            pending=transaction["pending"],
+            payment_channel=_value(transaction.get("payment_channel")),
+            category=category["primary"] if category else None,
+            subcategory=category["detailed"] if category else None,
+            check_number=transaction.get("check_number"),
+        )
+
+    @staticmethod
+    async def _call(method: Callable[[Any], Any], request: Any) -> Any:
+        import plaid
+
+        try:
+            return await asyncio.to_thread(method, request)
+        except plaid.ApiException as exc:
+            if exc.status == 429:
+                raise PlaidRateLimitError(exc.body) from exc
+            raise PlaidError(exc.body) from exc
+
+
+class FakePlaidClient:
+    """In-memory stand-in for Plaid, for tests and offline development
+
+    Items are keyed by access token. Transaction changes are kept as an
+    append-only log and ``sync_transactions`` pages through it, using the
+    log position as the cursor, the same way Plaid replays changes since a
+    cursor. Set ``rate_limited_calls`` to make the next calls fail with
+    :class:`PlaidRateLimitError`.
+    """
+
+    def __init__(self, page_size: int = 100):
+        self.page_size = page_size
+        self.rate_limited_calls = 0
+        self.calls = 0
+        self._accounts: Dict[str, List[PlaidAccountData]] = {}
+        self._changes: Dict[str, List[Tuple[str, Any]]] = defaultdict(list)
+
+    def set_accounts(self, access_token: str, accounts: List[PlaidAccountData]):
+        """Create an item, or replace its accounts and balances"""
+        self._accounts[access_token] = list(accounts)
+
+    def add_transactions(
+        self, access_token: str, transactions: List[PlaidTransactionData]
+    ):
+        self._changes[access_token].extend(("added", t) for t in transactions)
+
+    def modify_transactions(
+        self, access_token: str, transactions: List[PlaidTransactionData]
+    ):
+        self._changes[access_token].extend(("modified", t) for t in transactions)
+
+    def remove_transactions(self, access_token: str, transaction_ids: List[str]):
+        self._changes[access_token].extend(("removed", t) for t in transaction_ids)
+
+    async def get_accounts(self, access_token: str) -> List[PlaidAccountData]:
+        self._check_call(access_token)
+        return list(self._accounts[access_token])
+
+    async def sync_transactions(
+        self, access_token: str, cursor: Optional[str]
+    ) -> PlaidSyncPage:
+        self._check_call(access_token)
+        changes = self._changes[access_token]
+        start = int(cursor) if cursor else 0
+        end = min(start + self.page_size, len(changes))
+
+        page: Dict[str, list] = defaultdict(list)
+        for kind, change in changes[start:end]:
+            page[kind].append(change)
+        return PlaidSyncPage(**page, next_cursor=str(end), has_more=end < len(changes))
+
+    def _check_call(self, access_token: str) -> None:
+        self.calls += 1
+        if self.rate_limited_calls > 0:
+            self.rate_limited_calls -= 1
+            raise PlaidRateLimitError("RATE_LIMIT_EXCEEDED")
+        if access_token not in self._accounts:
+            raise PlaidError("ITEM_NOT_FOUND")
+
+
+def get_plaid_client() -> PlaidClient:
+    """Create a Plaid client from the environment configuration"""
+    return PlaidApiClient(PLAID_CLIENT_ID, PLAID_SECRET, PLAID_ENV)
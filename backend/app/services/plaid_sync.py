@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import ACCOUNTS, BALANCES, TRANSACTIONS, response_cache
+from ..database import dialect_insert
+from ..models.account import Account, AccountType
+from ..models.balance_snapshot import BalanceSnapshot
+from ..models.plaid_connection import PlaidConnection
+from ..models.transaction import Transaction, TransactionCategory
+from ..schemas.transaction import TransactionBulkStatus, TransactionCreate
+from .category_totals import update_category_totals
+from .net_worth import refresh_daily_net_worth
+from .plaid_client import (
+    PlaidAccountData,
+    PlaidClient,
+    PlaidRateLimitError,
+    PlaidTransactionData,
+)
+from .transaction_ingest import upsert_transactions
+
+logger = logging.getLogger(__name__)
+
+# Sync configuration. The rate limit is shared by every connection in a run.
+PLAID_SYNC_CONCURRENCY = int(os.getenv("PLAID_SYNC_CONCURRENCY", "8"))
+PLAID_RATE_LIMIT_PER_SECOND = float(os.getenv("PLAID_RATE_LIMIT_PER_SECOND", "10"))
+PLAID_SYNC_MAX_RETRIES = int(os.getenv("PLAID_SYNC_MAX_RETRIES", "5"))
+PLAID_SYNC_BACKOFF_SECONDS = float(os.getenv("PLAID_SYNC_BACKOFF_SECONDS", "1"))
+
+# Plaid account (type, subtype) to our account types; None matches any subtype
+ACCOUNT_TYPES = {
+    ("depository", "savings"): AccountType.SAVINGS,
+    ("depository", "money market"): AccountType.SAVINGS,
+    ("depository", "cd"): AccountType.SAVINGS,
+    ("depository", None): AccountType.CHECKING,
+    ("credit", None): AccountType.CREDIT_CARD,
+    ("investment", "401k"): AccountType.RETIREMENT,
+    ("investment", "403b"): AccountType.RETIREMENT,
+    ("investment", "457b"): AccountType.RETIREMENT,
+    ("investment", "ira"): AccountType.RETIREMENT,
+    ("investment", "roth"): AccountType.RETIREMENT,
+    ("investment", "roth 401k"): AccountType.RETIREMENT,
+    ("investment", "pension"): AccountType.RETIREMENT,
+    ("investment", None): AccountType.INVESTMENT,
+    ("loan", "mortgage"): AccountType.MORTGAGE,
+    ("loan", None): AccountType.LOAN,
+}
+
+# Plaid personal finance categories (primary) to our transaction categories
+TRANSACTION_CATEGORIES = {
+    "INCOME": TransactionCategory.INCOME,
+    "TRANSFER_IN": TransactionCategory.TRANSFER,
+    "TRANSFER_OUT": TransactionCategory.TRANSFER,
+    "LOAN_PAYMENTS": TransactionCategory.PAYMENT,
+    "ENTERTAINMENT": TransactionCategory.ENTERTAINMENT,
+    "FOOD_AND_DRINK": TransactionCategory.FOOD_AND_DRINK,
+    "GENERAL_MERCHANDISE": TransactionCategory.SHOPPING,
+    "HOME_IMPROVEMENT": TransactionCategory.HOME_IMPROVEMENT,
+    "MEDICAL": TransactionCategory.HEALTH_AND_FITNESS,
+    "PERSONAL_CARE": TransactionCategory.PERSONAL_CARE,
+    "GENERAL_SERVICES": TransactionCategory.BUSINESS_SERVICES,
+    "GOVERNMENT_AND_NON_PROFIT": TransactionCategory.GOVERNMENT_SERVICES,
+    "TRANSPORTATION": TransactionCategory.TRANSPORTATION,
+    "TRAVEL": TransactionCategory.TRAVEL,
+}
+
+
+class PlaidSyncResult(BaseModel):
+    connection_id: int
+    status: str  # success, error
+    accounts: int = 0
+    added: int = 0
+    modified: int = 0
+    removed: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` calls per second with bursts of ``burst``
+
+    Create one per event loop; the internal lock belongs to the loop that
+    first waits on it.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a call is allowed"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _account_type(account: PlaidAccountData) -> AccountType:
+    return ACCOUNT_TYPES.get(
+        (account.type, account.subtype),
+        ACCOUNT_TYPES.get((account.type, None), AccountType.OTHER),
+    )
+
+
+def _transaction_create(
+    transaction: PlaidTransactionData, account_id: int
+) -> TransactionCreate:
+    category = None
+    if transaction.category:
+        category = TRANSACTION_CATEGORIES.get(
+            transaction.category, TransactionCategory.OTHER
+        )
+
+    return TransactionCreate(
+        account_id=account_id,
+        plaid_transaction_id=transaction.transaction_id,
+        # Plaid amounts are positive for money out; ours are negative
+        amount=-transaction.amount,
+        currency=transaction.currency or "USD",
+        date=transaction.date,
+        description=transaction.name[:500],
+        merchant_name=transaction.merchant_name,
+        category=category,
+        subcategory=(
+            transaction.subcategory.lower()[:100] if transaction.subcategory else None
+        ),
+        is_pending=transaction.pending,
+        check_number=transaction.check_number,
+        payment_channel=transaction.payment_channel,
+    )
+
+
+async def upsert_plaid_accounts(
+    db: AsyncSession, connection: PlaidConnection, accounts: List[PlaidAccountData]
+) -> Dict[str, int]:
+    """Insert or update the connection's accounts and their balances
+
+    Returns our account IDs keyed by Plaid account ID. Accounts whose Plaid ID
+    already belongs to another user are left untouched and not returned.
+    """
+    if not accounts:
+        return {}
+
+    rows = [
+        {
+            "user_id": connection.user_id,
+            "plaid_account_id": account.account_id,
+            "name": account.name,
+            "type": _account_type(account),
+            "institution_name": connection.institution_name,
+            "account_number": account.mask,
+            "current_balance": account.current_balance or 0.0,
+            "available_balance": account.available_balance,
+            "currency": account.currency or "USD",
+        }
+        for account in accounts
+    ]
+    statement = dialect_insert(db, Account)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Account.plaid_account_id],
+        set_={
+            "name": statement.excluded.name,
+            "account_number": statement.excluded.account_number,
+            "current_balance": statement.excluded.current_balance,
+            "available_balance": statement.excluded.available_balance,
+            "currency": statement.excluded.currency,
+            "updated_at": func.now(),
+        },
+        where=Account.user_id == connection.user_id,
+    )
+    await db.execute(statement, rows)
+
+    result = await db.execute(
+        select(Account.plaid_account_id, Account.id).where(
+            Account.plaid_account_id.in_([row["plaid_account_id"] for row in rows]),
+            Account.user_id == connection.user_id,
+        )
+    )
+    return dict(result.tuples().all())
+
+
+async def write_balance_snapshots(
+    db: AsyncSession,
+    accounts: List[PlaidAccountData],
+    account_ids: Dict[str, int],
+    snapshot_date: date,
+) -> None:
+    """Replace the day's snapshot of each synced account and update the rollup"""
+    synced = [
+        (account_ids[account.account_id], account)
+        for account in accounts
+        if account.account_id in account_ids
+    ]
+    if not synced:
+        return
+
+    ids = [account_id for account_id, _ in synced]
+    rows = [
+        {
+            "account_id": account_id,
+            "date": snapshot_date,
+            "balance": account.current_balance or 0.0,
+            "available_balance": account.available_balance,
+            "currency": account.currency or "USD",
+        }
+        for account_id, account in synced
+    ]
+    await db.execute(
+        delete(BalanceSnapshot).where(
+            BalanceSnapshot.account_id.in_(ids), BalanceSnapshot.date == snapshot_date
+        )
+    )
+    await db.execute(insert(BalanceSnapshot), rows)
+
+    # Core writes skip the ORM flush hook that normally maintains the rollup
+    await refresh_daily_net_worth(
+        db, [(account_id, snapshot_date) for account_id in ids]
+    )
+
+
+async def remove_plaid_transactions(
+    db: AsyncSession, user_id: int, transaction_ids: Iterable[str]
+) -> int:
+    """Delete a user's transactions by Plaid transaction ID"""
+    result = await db.execute(
+        delete(Transaction)
+        .where(
+            Transaction.plaid_transaction_id.in_(list(transaction_ids)),
+            Transaction.account_id.in_(
+                select(Account.id).where(Account.user_id == user_id)
+            ),
+        )
+        .returning(
+            Transaction.account_id,
+            Transaction.date,
+            Transaction.category,
+            Transaction.amount,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    removed = [tuple(row) for row in result.all()]
+    await update_category_totals(db, removed=removed)
+    return len(removed)
+
+
+class PlaidSyncWorker:
+    """Pulls new data for Plaid connections
+
+    Every connection is synced in its own session and committed on its own,
+    so one failing item does not hold back the others. Up to ``concurrency``
+    connections run at once and all Plaid calls share one rate limiter;
+    rate-limited calls are retried with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        client: PlaidClient,
+        session_factory: Callable[[], AsyncSession],
+        concurrency: int = PLAID_SYNC_CONCURRENCY,
+        rate_limit: float = PLAID_RATE_LIMIT_PER_SECOND,
+        max_retries: int = PLAID_SYNC_MAX_RETRIES,
+        backoff_seconds: float = PLAID_SYNC_BACKOFF_SECONDS,
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.concurrency = max(1, concurrency)
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._limiter: Optional[RateLimiter] = None
+
+    async def sync_all(
+        self, connection_ids: Optional[List[int]] = None
+    ) -> List[PlaidSyncResult]:
+        """Sync every active connection, or only the given ones"""
+        query = select(PlaidConnection.id).where(PlaidConnection.is_active.is_(True))
+        if connection_ids is not None:
+            query = query.where(PlaidConnection.id.in_(connection_ids))
+
+        async with self.session_factory() as db:
+            ids = (await db.execute(query.order_by(PlaidConnection.id))).scalars().all()
+
+        self._limiter = RateLimiter(self.rate_limit)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(connection_id: int) -> PlaidSyncResult:
+            async with semaphore:
+                return await self._sync_in_session(connection_id)
+
+        return list(await asyncio.gather(*(run(i) for i in ids)))
+
+    async def sync_connection(
+        self, db: AsyncSession, connection: PlaidConnection
+    ) -> PlaidSyncResult:
+        """Sync one connection without committing
+
+        Transaction pages are applied as they arrive, but the new cursor is
+        only stored on the connection once the last page has been applied.
+        If anything fails the caller rolls back and the next run replays the
+        changes from the previous cursor.
+        """
+        result = PlaidSyncResult(connection_id=connection.id, status="success")
+
+        accounts = await self._call(self.client.get_accounts, connection.access_token)
+        account_ids = await upsert_plaid_accounts(db, connection, accounts)
+        result.accounts = len(account_ids)
+
+        cursor = connection.sync_cursor
+        has_more = True
+        while has_more:
+            page = await self._call(
+                self.client.sync_transactions, connection.access_token, cursor
+            )
+            rows = [
+                _transaction_create(transaction, account_ids[transaction.account_id])
+                for transaction in page.added + page.modified
+                if transaction.account_id in account_ids
+            ]
+            if rows:
+                ingested = await upsert_transactions(
+                    db, connection.user_id, rows, override_category=True
+                )
+                result.failed += sum(
+                    1 for r in ingested if r.status == TransactionBulkStatus.FAILED
+                )
+            if page.removed:
+                result.removed += await remove_plaid_transactions(
+                    db, connection.user_id, page.removed
+                )
+            result.added += len(page.added)
+            result.modified += len(page.modified)
+            cursor, has_more = page.next_cursor, page.has_more
+
+        await write_balance_snapshots(db, accounts, account_ids, date.today())
+
+        connection.sync_cursor = cursor
+        connection.last_sync_at = datetime.utcnow()
+        connection.sync_status = "success"
+        connection.error_message = None
+        return result
+
+    async def _sync_in_session(self, connection_id: int) -> PlaidSyncResult:
+        async with self.session_factory() as db:
+            connection = await db.get(PlaidConnection, connection_id)
+            if connection is None:
+                # Deleted since the connections to sync were listed
+                return PlaidSyncResult(
+                    connection_id=connection_id,
+                    status="error",
+                    error="Connection not found",
+                )
+            try:
+                result = await self.sync_connection(db, connection)
+                user_id = connection.user_id
+                await db.commit()
+                await response_cache.invalidate(
+                    user_id, ACCOUNTS, BALANCES, TRANSACTIONS
+                )
+                return result
+            except Exception as exc:
+                logger.exception("Plaid sync failed for connection %s", connection_id)
+                await db.rollback()
+                await db.execute(
+                    update(PlaidConnection)
+                    .where(PlaidConnection.id == connection_id)
+                    .values(sync_status="error", error_message=str(exc))
+                )
+                await db.commit()
+                return PlaidSyncResult(
+                    connection_id=connection_id, status="error", error=str(exc)
+                )
+
+    async def _call(self, method: Callable[..., Awaitable[Any]], *args) -> Any:
+        if self._limiter is None:
+            self._limiter = RateLimiter(self.rate_limit)
+
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            try:
+                return await method(*args)
+            except PlaidRateLimitError:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * 2**attempt
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+
+async def main(connection_ids: Optional[List[int]] = None) -> None:
+    from ..database import AsyncSessionLocal, close_db
+    from .plaid_client import get_plaid_client
+
+    worker = PlaidSyncWorker(get_plaid_client(), AsyncSessionLocal)
+    results = await worker.sync_all(connection_ids)
+    await close_db()
+
+    failed = [result for result in results if result.status == "error"]
+    print(f"Synced {len(results) - len(failed)} connections, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync Plaid connections")
+    parser.add_argument(
+        "--connection-id",
+        type=int,
+        action="append",
+        help="Only sync this connection (repeatable)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.connection_id))
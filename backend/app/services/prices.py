@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import csv
+import logging
+import os
+from datetime import date
+from typing import Callable, Dict, List, Optional, Protocol, Sequence, Set
+
+from pydantic import BaseModel
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import PORTFOLIOS, response_cache
+from ..models.investment import Investment
+from ..models.portfolio import Portfolio, PortfolioItem
+from ..schemas.investment import InvestmentPrice
+from .valuation import revalue_portfolios
+
+logger = logging.getLogger(__name__)
+
+# Price refresh configuration; PRICE_SOURCE is csv (read from PRICE_SOURCE_PATH)
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "csv")
+PRICE_SOURCE_PATH = os.getenv("PRICE_SOURCE_PATH", "prices.csv")
+PRICE_REFRESH_BATCH_SIZE = int(os.getenv("PRICE_REFRESH_BATCH_SIZE", "1000"))
+
+
+class PriceSource(Protocol):
+    """Where the price refresh job gets quotes from"""
+
+    async def fetch_prices(self, symbols: Sequence[str]) -> List[InvestmentPrice]: ...
+
+
+class CsvPriceSource:
+    """Reads quotes from a local CSV file for offline and end-of-day loads
+
+    The file needs ``symbol`` and ``price`` columns and may have a
+    ``price_date`` column in ISO format. Symbols that were not asked for are
+    ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def fetch_prices(self, symbols: Sequence[str]) -> List[InvestmentPrice]:
+        return await asyncio.to_thread(self._read, set(symbols))
+
+    def _read(self, symbols: Set[str]) -> List[InvestmentPrice]:
+        prices = []
+        with open(self.path, newline="") as file:
+            for row in csv.DictReader(file):
+                quote = InvestmentPrice(
+                    symbol=row["symbol"],
+                    price=row["price"],  # type: ignore[arg-type]
+                    price_date=row.get("price_date") or None,  # type: ignore
+                )
+                if quote.symbol in symbols:
+                    prices.append(quote)
+        return prices
+
+
+def get_price_source() -> PriceSource:
+    """Create the price source from the environment configuration"""
+    if PRICE_SOURCE == "csv":
+        return CsvPriceSource(PRICE_SOURCE_PATH)
+    raise ValueError(f"Unknown price source: {PRICE_SOURCE}")
+
+
+class PriceUpdateResult(BaseModel):
+    updated: int = 0
+    unchanged: int = 0
+    unknown_symbols: List[str] = []
+    portfolio_ids: List[int] = []
+    user_ids: List[int] = []
+
+
+async def apply_prices(
+    db: AsyncSession, prices: Sequence[InvestmentPrice]
+) -> PriceUpdateResult:
+    """Store investment prices and revalue affected portfolios without committing
+
+    The last quote per symbol wins. Investments whose price and date are
+    already current are skipped, the rest are written with one executemany
+    UPDATE, and only the active portfolios holding a changed investment are
+    revalued. Invalidate the cached portfolios of ``user_ids`` once the
+    caller commits.
+    """
+    today = date.today()
+    quotes: Dict[str, InvestmentPrice] = {quote.symbol: quote for quote in prices}
+
+    result = await db.execute(
+        select(
+            Investment.id,
+            Investment.symbol,
+            Investment.current_price,
+            Investment.price_date,
+        ).where(Investment.symbol.in_(quotes))
+    )
+    rows = []
+    known_symbols = set()
+    unchanged = 0
+    for investment_id, symbol, current_price, price_date in result.all():
+        known_symbols.add(symbol)
+        quote = quotes[symbol]
+        quote_date = quote.price_date or today
+        if current_price == quote.price and price_date == quote_date:
+            unchanged += 1
+            continue
+        rows.append(
+            {
+                "id": investment_id,
+                "current_price": quote.price,
+                "price_date": quote_date,
+            }
+        )
+
+    update_result = PriceUpdateResult(
+        updated=len(rows),
+        unchanged=unchanged,
+        unknown_symbols=sorted(set(quotes) - known_symbols),
+    )
+    if not rows:
+        return update_result
+
+    await db.execute(update(Investment), rows)
+
+    affected = (
+        await db.execute(
+            select(Portfolio.id, Portfolio.user_id)
+            .where(
+                Portfolio.is_active.is_(True),
+                Portfolio.id.in_(
+                    select(PortfolioItem.portfolio_id).where(
+                        PortfolioItem.investment_id.in_([row["id"] for row in rows])
+                    )
+                ),
+            )
+            .order_by(Portfolio.id)
+        )
+    ).all()
+    if affected:
+        update_result.portfolio_ids = [portfolio_id for portfolio_id, _ in affected]
+        update_result.user_ids = sorted({user_id for _, user_id in affected})
+        await revalue_portfolios(db, portfolio_ids=update_result.portfolio_ids)
+
+    return update_result
+
+
+async def refresh_prices(
+    session_factory: Callable[[], AsyncSession],
+    source: PriceSource,
+    batch_size: int = PRICE_REFRESH_BATCH_SIZE,
+) -> PriceUpdateResult:
+    """Fetch quotes for every active investment and apply them in batches
+
+    Each batch is committed on its own so a failure only loses that batch.
+    """
+    async with session_factory() as db:
+        symbols = (
+            (
+                await db.execute(
+                    select(Investment.symbol)
+                    .where(Investment.is_active.is_(True))
+                    .distinct()
+                    .order_by(Investment.symbol)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    quotes = await source.fetch_prices(symbols)
+    total = PriceUpdateResult(
+        unknown_symbols=sorted(set(symbols) - {q.symbol for q in quotes})
+    )
+    portfolio_ids: Set[int] = set()
+    user_ids: Set[int] = set()
+
+    for start in range(0, len(quotes), batch_size):
+        async with session_factory() as db:
+            result = await apply_prices(db, quotes[start : start + batch_size])
+            await db.commit()
+        for user_id in result.user_ids:
+            await response_cache.invalidate(user_id, PORTFOLIOS)
+
+        total.updated += result.updated
+        total.unchanged += result.unchanged
+        portfolio_ids.update(result.portfolio_ids)
+        user_ids.update(result.user_ids)
+
+    total.portfolio_ids = sorted(portfolio_ids)
+    total.user_ids = sorted(user_ids)
+    logger.info(
+        "Refreshed %d prices (%d unchanged, %d missing), revalued %d portfolios",
+        total.updated,
+        total.unchanged,
+        len(total.unknown_symbols),
+        len(total.portfolio_ids),
+    )
+    return total
+
+
+async def main(path: Optional[str] = None) -> None:
+    from ..database import AsyncSessionLocal, close_db
+
+    source = CsvPriceSource(path) if path else get_price_source()
+    result = await refresh_prices(AsyncSessionLocal, source)
+    await close_db()
+
+    print(
+        f"Updated {result.updated} prices, revalued "
+        f"{len(result.portfolio_ids)} portfolios"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh investment prices")
+    parser.add_argument("--csv", help="Read prices from this CSV file")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.csv))
@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+from sqlalchemy import Select, and_, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import TRANSACTIONS, response_cache
+from ..database import dialect_insert
+from ..models.account import Account
+from ..models.recurring_series import (
+    RecurringCadence,
+    RecurringDetectionState,
+    RecurringSeries,
+)
+from ..models.transaction import Transaction
+from .holdings_history import months_before
+
+logger = logging.getLogger(__name__)
+
+# Fewest distinct dates that make a series
+RECURRING_MIN_OCCURRENCES = int(os.getenv("RECURRING_MIN_OCCURRENCES", "3"))
+
+# Amounts of one merchant within this fraction of each other share a band
+AMOUNT_BAND_TOLERANCE = 0.2
+
+# Share of a band's gaps that must fit its cadence
+MIN_REGULAR_SHARE = 0.75
+
+# Changes made this long before the last run started are examined again,
+# which covers writes that committed while it was running
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Merchant keys per statement when loading or replacing touched merchants
+MERCHANT_BATCH_SIZE = 200
+
+# (cadence, expected days between transactions, allowed deviation in days)
+CADENCES = (
+    (RecurringCadence.WEEKLY, 7.0, 1.0),
+    (RecurringCadence.BIWEEKLY, 14.0, 2.0),
+    (RecurringCadence.MONTHLY, 30.44, 4.0),
+    (RecurringCadence.ANNUAL, 365.25, 10.0),
+)
+CADENCE_PERIODS = np.array([period for _, period, _ in CADENCES])
+CADENCE_TOLERANCES = np.array([tolerance for _, _, tolerance in CADENCES])
+
+# Day number of 1970-01-01, the datetime64 epoch
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Description text before the first digit, "#" or "*" (store numbers,
+# references and card suffixes)
+_DESCRIPTION_PREFIX = re.compile(r"[^\d#*]*")
+
+_MERCHANT_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.amount,
+    Transaction.merchant_name,
+    Transaction.description,
+    Transaction.is_recurring,
+)
+
+
+class RecurringResult(BaseModel):
+    users: int = 0
+    merchants: int = 0
+    series: int = 0
+    flagged: int = 0
+
+
+def merchant_key(merchant_name: Optional[str], description: str) -> str:
+    """Normalized merchant a transaction is grouped by
+
+    The merchant name if there is one, otherwise the start of the
+    description up to the first number. Both are lower-cased; the
+    description key is always a prefix of the lower-cased description so
+    it can be looked up with ``LIKE``.
+    """
+    if merchant_name and merchant_name.strip(" "):
+        return merchant_name.strip(" ").lower()[:255]
+    folded = description.lower()
+    prefix = _DESCRIPTION_PREFIX.match(folded).group().rstrip(" -.,/")  # type: ignore
+    return (prefix or folded.rstrip(" "))[:255]
+
+
+def find_cadences(groups: np.ndarray, days: np.ndarray, group_count: int) -> np.ndarray:
+    """Index into CADENCES of each group's cadence, or -1 if it has none
+
+    ``groups`` numbers the transactions' groups from 0 and ``days`` are
+    their dates as day numbers, both sorted by group and then day. The
+    gaps between consecutive distinct dates of every group are found in
+    one diff. A group's cadence is the one its median gap falls in, as
+    long as most of its gaps fit that cadence too.
+    """
+    gaps = np.diff(days)
+    gap_groups = groups[1:]
+    keep = (gap_groups == groups[:-1]) & (gaps > 0)
+    gaps, gap_groups = gaps[keep], gap_groups[keep]
+
+    counts = np.bincount(gap_groups, minlength=group_count)
+    starts = np.cumsum(counts) - counts
+    sorted_gaps = gaps[np.lexsort((gaps, gap_groups))]
+    eligible = counts >= max(RECURRING_MIN_OCCURRENCES - 1, 1)
+
+    median = np.full(group_count, np.nan)
+    lower = starts[eligible] + (counts[eligible] - 1) // 2
+    upper = starts[eligible] + counts[eligible] // 2
+    median[eligible] = (sorted_gaps[lower] + sorted_gaps[upper]) / 2
+
+    matched = np.abs(median[:, None] - CADENCE_PERIODS) <= CADENCE_TOLERANCES
+    cadence = np.where(matched.any(axis=1), matched.argmax(axis=1), -1)
+
+    gap_cadence = cadence[gap_groups]
+    regular = (gap_cadence >= 0) & (
+        np.abs(gaps - CADENCE_PERIODS[gap_cadence]) <= CADENCE_TOLERANCES[gap_cadence]
+    )
+    regular_share = np.divide(
+        np.bincount(gap_groups, weights=regular, minlength=group_count),
+        counts,
+        out=np.zeros(group_count),
+        where=counts > 0,
+    )
+    cadence[regular_share < MIN_REGULAR_SHARE] = -1
+    return cadence
+
+
+def amount_bands(key_ids: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """Band number of each transaction within its merchant
+
+    Amounts of one merchant and sign are sorted, and a new band starts
+    wherever an amount is more than AMOUNT_BAND_TOLERANCE above the
+    previous one.
+    """
+    income = amounts > 0
+    size = np.abs(amounts)
+    order = np.lexsort((size, income, key_ids))
+    sorted_size = size[order]
+
+    new_band = np.ones(len(order), dtype=bool)
+    new_band[1:] = (
+        (key_ids[order][1:] != key_ids[order][:-1])
+        | (income[order][1:] != income[order][:-1])
+        | (sorted_size[1:] > sorted_size[:-1] * (1 + AMOUNT_BAND_TOLERANCE))
+    )
+    bands = np.empty(len(order), dtype=np.int64)
+    bands[order] = np.cumsum(new_band) - 1
+    return bands
+
+
+def next_expected_date(cadence: RecurringCadence, last_date: date) -> date:
+    if cadence == RecurringCadence.MONTHLY:
+        return months_before(last_date, -1)
+    if cadence == RecurringCadence.ANNUAL:
+        return months_before(last_date, -12)
+    return last_date + timedelta(days=7 if cadence == RecurringCadence.WEEKLY else 14)
+
+
+def detect_series(
+    keys: List[str],
+    dates: Iterable[date],
+    amounts: np.ndarray,
+    today: date,
+) -> Tuple[np.ndarray, List[Dict]]:
+    """Find recurring series among one user's transactions
+
+    Returns whether each transaction belongs to a series, and one row of
+    ``recurring_series`` values per series.
+    """
+    # Numbering keys and converting dates in plain Python is several times
+    # faster than np.unique and datetime64 on object arrays
+    key_numbers: Dict[str, int] = {}
+    key_ids = np.fromiter(
+        (key_numbers.setdefault(key, len(key_numbers)) for key in keys),
+        dtype=np.int64,
+        count=len(keys),
+    )
+    key_values = list(key_numbers)
+    days = np.fromiter(
+        (day.toordinal() - EPOCH_ORDINAL for day in dates),
+        dtype=np.int64,
+        count=len(keys),
+    )
+    bands = amount_bands(key_ids, amounts)
+    band_count = int(bands.max()) + 1 if len(bands) else 0
+
+    order = np.lexsort((days, bands))
+    cadence = find_cadences(bands[order], days[order], band_count)
+
+    counts = np.bincount(bands, minlength=band_count)
+    totals = np.bincount(bands, weights=amounts, minlength=band_count)
+    first = np.full(band_count, np.iinfo(np.int64).max)
+    last = np.full(band_count, np.iinfo(np.int64).min)
+    np.minimum.at(first, bands, days)
+    np.maximum.at(last, bands, days)
+    band_keys = np.empty(band_count, dtype=np.int64)
+    band_keys[bands] = key_ids
+
+    series = []
+    for band in np.flatnonzero(cadence >= 0).tolist():
+        kind, _, tolerance = CADENCES[cadence[band]]
+        last_date = (np.datetime64(0, "D") + last[band]).astype(date)
+        next_date = next_expected_date(kind, last_date)
+        series.append(
+            {
+                "merchant": key_values[band_keys[band]],
+                "cadence": kind,
+                "average_amount": float(totals[band] / counts[band]),
+                "transaction_count": int(counts[band]),
+                "first_date": (np.datetime64(0, "D") + first[band]).astype(date),
+                "last_date": last_date,
+                "next_expected_date": next_date,
+                "is_active": next_date + timedelta(days=tolerance) >= today,
+            }
+        )
+    return cadence[bands] >= 0, series
+
+
+def _batches(keys: Iterable[str]) -> Iterable[List[str]]:
+    ordered = sorted(keys)
+    for start in range(0, len(ordered), MERCHANT_BATCH_SIZE):
+        yield ordered[start : start + MERCHANT_BATCH_SIZE]
+
+
+def touched_merchants_query(user_id: int, since: datetime) -> Select:
+    """Select the merchant fields of a user's transactions written since ``since``"""
+    return (
+        select(Transaction.merchant_name, Transaction.description)
+        .join(Account)
+        .where(Account.user_id == user_id, Transaction.updated_at >= since)
+        .distinct()
+    )
+
+
+def merchant_transactions_query(user_id: int, keys: Optional[List[str]]) -> Select:
+    """Select a user's transactions for the detector, or only those of ``keys``
+
+    Merchant names match exactly and descriptions by prefix, on the same
+    expressions as the transactions' merchant key indexes; callers narrow
+    the prefix matches to the exact key.
+    """
+    query = select(*_MERCHANT_COLUMNS).join(Account).where(Account.user_id == user_id)
+    if keys is None:
+        return query
+
+    folded_description = func.lower(Transaction.description)
+    return query.where(
+        or_(
+            func.lower(func.trim(Transaction.merchant_name)).in_(keys),
+            and_(
+                func.coalesce(func.trim(Transaction.merchant_name), "") == "",
+                or_(
+                    *(
+                        folded_description.startswith(key, autoescape=True)
+                        for key in keys
+                    )
+                ),
+            ),
+        )
+    )
+
+
+async def _touched_merchants(
+    db: AsyncSession, user_id: int, since: datetime
+) -> Set[str]:
+    result = await db.execute(touched_merchants_query(user_id, since))
+    return {merchant_key(merchant, description) for merchant, description in result}
+
+
+async def _load_merchants(
+    db: AsyncSession, user_id: int, merchants: Optional[Set[str]]
+) -> List:
+    """Transactions of a user, or only of the given merchants"""
+    if merchants is None:
+        result = await db.execute(merchant_transactions_query(user_id, None))
+        return list(result.all())
+
+    rows: Dict[int, object] = {}
+    for batch in _batches(merchants):
+        result = await db.execute(merchant_transactions_query(user_id, batch))
+        rows.update((row.id, row) for row in result)
+    return list(rows.values())
+
+
+async def detect_user_recurring(
+    db: AsyncSession,
+    user_id: int,
+    full: bool = False,
+    today: Optional[date] = None,
+    overlap: timedelta = WATERMARK_OVERLAP,
+) -> RecurringResult:
+    """Detect a user's recurring transactions without committing
+
+    Only merchants with transactions written since the user's last run
+    are re-examined, unless ``full`` is set or this is the first run. The
+    series of every examined merchant are replaced, and ``is_recurring``
+    is set on their transactions that belong to a series and cleared on
+    the rest. Deleted transactions are only noticed once their merchant
+    changes again, or by a full run.
+    """
+    today = today or date.today()
+    started = await db.scalar(select(func.now()))
+    state = await db.get(RecurringDetectionState, user_id)
+
+    merchants: Optional[Set[str]] = None
+    if state is not None and not full:
+        merchants = await _touched_merchants(
+            db, user_id, state.last_run_at - overlap  # type: ignore[arg-type]
+        )
+
+    result = RecurringResult(users=1)
+    if merchants is None or merchants:
+        rows = await _load_merchants(db, user_id, merchants)
+        keys = [merchant_key(row.merchant_name, row.description) for row in rows]
+        if merchants is not None:
+            kept = [index for index, key in enumerate(keys) if key in merchants]
+            rows = [rows[index] for index in kept]
+            keys = [keys[index] for index in kept]
+        result.merchants = len(set(keys))
+
+        recurring, series = detect_series(
+            keys,
+            (row.date for row in rows),
+            np.array([row.amount for row in rows], dtype=np.float64),
+            today,
+        )
+
+        series_filter = [RecurringSeries.user_id == user_id]
+        if merchants is None:
+            await db.execute(delete(RecurringSeries).where(*series_filter))
+        else:
+            for batch in _batches(merchants):
+                await db.execute(
+                    delete(RecurringSeries).where(
+                        *series_filter, RecurringSeries.merchant.in_(batch)
+                    )
+                )
+        if series:
+            await db.execute(
+                insert(RecurringSeries),
+                [dict(values, user_id=user_id) for values in series],
+            )
+        result.series = len(series)
+
+        # Flags are derived data, so updated_at is kept to avoid marking
+        # the merchants as touched for the next run
+        for flag in (True, False):
+            ids = [
+                row.id
+                for row, is_recurring in zip(rows, recurring.tolist())
+                if is_recurring is flag and row.is_recurring is not flag
+            ]
+            for start in range(0, len(ids), MERCHANT_BATCH_SIZE):
+                await db.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_(ids[start : start + MERCHANT_BATCH_SIZE]))
+                    .values(is_recurring=flag, updated_at=Transaction.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+            result.flagged += len(ids)
+
+    statement = dialect_insert(db, RecurringDetectionState)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[RecurringDetectionState.user_id],
+            set_={
+                "last_run_at": statement.excluded.last_run_at,
+                "updated_at": func.now(),
+            },
+        ),
+        [{"user_id": user_id, "last_run_at": started}],
+    )
+    return result
+
+
+async def detect_recurring_transactions(
+    session_factory: Callable[[], AsyncSession],
+    user_ids: Optional[List[int]] = None,
+    full: bool = False,
+) -> RecurringResult:
+    """Background job: detect recurring transactions of every user
+
+    Each user is committed on its own so a failure only loses that user.
+    """
+    async with session_factory() as db:
+        query = select(Account.user_id).join(Transaction)
+        if user_ids is not None:
+            query = query.where(Account.user_id.in_(user_ids))
+        users = (
+            (await db.execute(query.distinct().order_by(Account.user_id)))
+            .scalars()
+            .all()
+        )
+
+    total = RecurringResult()
+    for user_id in users:
+        async with session_factory() as db:
+            result = await detect_user_recurring(db, user_id, full)
+            await db.commit()
+        if result.flagged:
+            await response_cache.invalidate(user_id, TRANSACTIONS)
+
+        total.users += 1
+        total.merchants += result.merchants
+        total.series += result.series
+        total.flagged += result.flagged
+
+    logger.info(
+        "Examined %d merchants for %d users: %d recurring series, %d flags changed",
+        total.merchants,
+        total.users,
+        total.series,
+        total.flagged,
+    )
+    return total
+
+
+async def get_recurring_series(
+    db: AsyncSession, user_id: int, include_inactive: bool = False
+) -> List[RecurringSeries]:
+    query = select(RecurringSeries).where(RecurringSeries.user_id == user_id)
+    if not include_inactive:
+        query = query.where(RecurringSeries.is_active.is_(True))
+    result = await db.execute(
+        query.order_by(RecurringSeries.next_expected_date, RecurringSeries.id)
+    )
+    return list(result.scalars().all())
+
+
+async def main(user_ids: Optional[List[int]] = None, full: bool = False) -> None:
+    from ..database import AsyncSessionLocal, close_db
+
+    result = await detect_recurring_transactions(AsyncSessionLocal, user_ids, full)
+    await close_db()
+
+    print(
+        f"Examined {result.merchants} merchants for {result.users} users: "
+        f"{result.series} recurring series, {result.flagged} flags changed"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect recurring transactions")
+    parser.add_argument(
+        "--user-id", type=int, action="append", help="Only this user (repeatable)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-examine every merchant, not just those changed since the last run",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args.user_id, args.full))
@@ -0,0 +1,251 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import dialect_insert
+from ..models.account import Account
+from ..models.transaction import Transaction, TransactionCategory
+from ..schemas.transaction import (
+    TransactionBulkResult,
+    TransactionBulkStatus,
+    TransactionCreate,
+)
+from .categorization import matcher_cache
+from .category_totals import update_category_totals
+
+# Columns an upsert leaves alone: the key, and is_recurring, which the
+# recurring detector owns. Category is only replaced by a new one.
+PRESERVED_COLUMNS = {"plaid_transaction_id", "is_recurring", "category"}
+
+
+class _ValidatedRows:
+    """Rows of a bulk request that passed validation, with their input indexes"""
+
+    def __init__(self, size: int):
+        self.results: List[Optional[TransactionBulkResult]] = [None] * size
+        self.rows: List[Dict] = []
+        self.indexes: List[int] = []
+        # Values of the rows being replaced, by Plaid ID
+        self.existing_owners: Dict[str, int] = {}
+        self.existing_values: Dict[str, tuple] = {}
+
+    def existing_category(self, row: Dict) -> Optional[TransactionCategory]:
+        """Category of the stored row a row replaces, if any"""
+        existing = self.existing_values.get(row["plaid_transaction_id"])
+        return existing[2] if existing else None
+
+
+async def _validate_transactions(
+    db: AsyncSession, user_id: int, transactions: Sequence[TransactionCreate]
+) -> _ValidatedRows:
+    """Check ownership and Plaid ID conflicts with one query for each"""
+    validated = _ValidatedRows(len(transactions))
+    account_ids = {transaction.account_id for transaction in transactions}
+    owned_accounts = set(
+        (
+            await db.execute(
+                select(Account.id).where(
+                    Account.id.in_(account_ids), Account.user_id == user_id
+                )
+            )
+        ).scalars()
+    )
+
+    plaid_ids = {
+        transaction.plaid_transaction_id
+        for transaction in transactions
+        if transaction.plaid_transaction_id
+    }
+    if plaid_ids:
+        existing = await db.execute(
+            select(
+                Transaction.plaid_transaction_id,
+                Account.user_id,
+                Transaction.account_id,
+                Transaction.date,
+                Transaction.category,
+                Transaction.amount,
+            )
+            .join(Account)
+            .where(Transaction.plaid_transaction_id.in_(plaid_ids))
+        )
+        for plaid_id, owner_id, *values in existing.all():
+            validated.existing_owners[plaid_id] = owner_id
+            validated.existing_values[plaid_id] = tuple(values)
+
+    seen_plaid_ids = set()
+    for index, transaction in enumerate(transactions):
+        plaid_id = transaction.plaid_transaction_id
+        detail = None
+        if transaction.account_id not in owned_accounts:
+            detail = "Account not found"
+        elif plaid_id and plaid_id in seen_plaid_ids:
+            detail = "Duplicate plaid_transaction_id in request"
+        elif plaid_id and validated.existing_owners.get(plaid_id, user_id) != user_id:
+            detail = "plaid_transaction_id is already in use"
+
+        if detail:
+            validated.results[index] = TransactionBulkResult(
+                index=index, status=TransactionBulkStatus.FAILED, detail=detail
+            )
+            continue
+
+        if plaid_id:
+            seen_plaid_ids.add(plaid_id)
+        validated.rows.append(transaction.dict())
+        validated.indexes.append(index)
+    return validated
+
+
+async def _categorize_rows(
+    db: AsyncSession,
+    user_id: int,
+    validated: _ValidatedRows,
+    override_category: bool,
+) -> None:
+    # A stored category, perhaps set by the user, is only replaced by one
+    # from the payload, or by a rule when overriding
+    uncategorized = [
+        row
+        for row in validated.rows
+        if override_category
+        or (row["category"] is None and validated.existing_category(row) is None)
+    ]
+    if not uncategorized:
+        return
+    matcher = await matcher_cache.get(db, user_id)
+    if not len(matcher):
+        return
+    for row in uncategorized:
+        row["category"] = (
+            matcher.categorize(
+                row["account_id"],
+                row["amount"],
+                row["description"],
+                row["merchant_name"],
+            )
+            or row["category"]
+        )
+
+
+async def _write_rows(
+    db: AsyncSession, user_id: int, rows: List[Dict]
+) -> List[Optional[int]]:
+    """Write rows and return their IDs in row order
+
+    Rows with a Plaid ID are upserted and matched back by that ID, since
+    asking for RETURNING in parameter order makes SQLAlchemy send an upsert
+    one row at a time. The upsert only replaces rows in the user's accounts;
+    a row it skips has no ID. Rows without one cannot conflict and use a
+    plain INSERT, which PostgreSQL batches in order through its autoincrement
+    key (SQLite, used by the tests, has no such guarantee and inserts row by
+    row).
+    """
+    keyed = [row for row in rows if row["plaid_transaction_id"]]
+    unkeyed = [row for row in rows if not row["plaid_transaction_id"]]
+    ids_by_plaid_id: Dict[str, int] = {}
+    if keyed:
+        statement = dialect_insert(db, Transaction)
+        updated_columns = {
+            column: statement.excluded[column]
+            for column in keyed[0]
+            if column not in PRESERVED_COLUMNS
+        }
+        updated_columns["category"] = func.coalesce(
+            statement.excluded.category, Transaction.category
+        )
+        updated_columns["updated_at"] = func.now()
+        owned_accounts = select(Account.id).where(Account.user_id == user_id)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Transaction.plaid_transaction_id],
+            set_=updated_columns,
+            where=and_(
+                Transaction.account_id.in_(owned_accounts),
+                statement.excluded.account_id.in_(owned_accounts),
+            ),
+        ).returning(Transaction.plaid_transaction_id, Transaction.id)
+        ids_by_plaid_id = dict((await db.execute(statement, keyed)).tuples().all())
+
+    unkeyed_ids: Iterator[int] = iter(())
+    if unkeyed:
+        statement = insert(Transaction).returning(
+            Transaction.id, sort_by_parameter_order=True
+        )
+        unkeyed_ids = iter((await db.execute(statement, unkeyed)).scalars().all())
+
+    return [
+        (
+            ids_by_plaid_id.get(row["plaid_transaction_id"])
+            if row["plaid_transaction_id"]
+            else next(unkeyed_ids)
+        )
+        for row in rows
+    ]
+
+
+async def upsert_transactions(
+    db: AsyncSession,
+    user_id: int,
+    transactions: Sequence[TransactionCreate],
+    override_category: bool = False,
+) -> List[TransactionBulkResult]:
+    """Insert or update many transactions for a user without committing
+
+    Ownership is checked once per distinct account and existing Plaid IDs
+    are looked up in one query. Valid rows are then written with multi-row
+    ``INSERT ... ON CONFLICT (plaid_transaction_id) DO UPDATE`` and the
+    monthly category totals are adjusted by the difference. Updates keep
+    ``is_recurring``, and keep the stored category unless the row brings
+    one. The user's categorization rules fill in missing categories, or
+    replace any category a rule matches when ``override_category`` is set.
+    Returns one result per input row, in input order.
+    """
+    validated = await _validate_transactions(db, user_id, transactions)
+    results = validated.results
+    if validated.rows:
+        await _categorize_rows(db, user_id, validated, override_category)
+        transaction_ids = await _write_rows(db, user_id, validated.rows)
+
+        rows = []
+        for index, row, transaction_id in zip(
+            validated.indexes, validated.rows, transaction_ids
+        ):
+            if transaction_id is None:
+                # Moved to another user's account since it was validated
+                results[index] = TransactionBulkResult(
+                    index=index,
+                    status=TransactionBulkStatus.FAILED,
+                    detail="plaid_transaction_id is already in use",
+                )
+                continue
+            rows.append(row)
+            results[index] = TransactionBulkResult(
+                index=index,
+                status=(
+                    TransactionBulkStatus.UPDATED
+                    if row["plaid_transaction_id"] in validated.existing_owners
+                    else TransactionBulkStatus.CREATED
+                ),
+                id=transaction_id,
+            )
+
+        await update_category_totals(
+            db,
+            added=[
+                (
+                    row["account_id"],
+                    row["date"],
+                    row["category"] or validated.existing_category(row),
+                    row["amount"],
+                )
+                for row in rows
+            ],
+            removed=[
+                validated.existing_values[row["plaid_transaction_id"]]
+                for row in rows
+                if row["plaid_transaction_id"] in validated.existing_values
+            ],
+        )
+
+    return [result for result in results if result is not None]
@@ -0,0 +1,320 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import Date, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import dialect_insert
+from ..models.investment import Investment
+from ..models.portfolio import Portfolio, PortfolioItem
+from ..models.portfolio_daily_value import PortfolioDailyValue
+
+# Columns loaded per holding, in array column order
+HOLDING_COLUMNS = (
+    PortfolioItem.id,
+    PortfolioItem.portfolio_id,
+    PortfolioItem.investment_id,
+    PortfolioItem.quantity,
+    PortfolioItem.average_cost,
+    PortfolioItem.current_value,
+    PortfolioItem.target_allocation,
+    Investment.current_price,
+)
+
+# Response fields of a holding, in group_valuations order
+HOLDING_FIELDS = (
+    "item_id",
+    "investment_id",
+    "market_value",
+    "cost_basis",
+    "unrealized_gain_loss",
+    "unrealized_gain_loss_percent",
+    "weight",
+    "target_allocation",
+    "drift",
+)
+
+
+@dataclass
+class HoldingValuations:
+    """Valuation of a set of holdings, one array element per holding
+
+    Percentages (gain/loss, weight, target and drift) are on a 0-100 scale
+    like ``PortfolioItem.target_allocation``. Drift is NaN for holdings
+    without a target.
+    """
+
+    item_ids: np.ndarray
+    portfolio_ids: np.ndarray
+    investment_ids: np.ndarray
+    market_value: np.ndarray
+    cost_basis: np.ndarray
+    gain_loss: np.ndarray
+    gain_loss_percent: np.ndarray
+    weight: np.ndarray
+    target_allocation: np.ndarray
+    drift: np.ndarray
+    portfolio_totals: Dict[int, float]
+
+
+def value_holdings(
+    portfolio_ids: np.ndarray,
+    quantity: np.ndarray,
+    average_cost: np.ndarray,
+    price: np.ndarray,
+    current_value: np.ndarray,
+    target_allocation: np.ndarray,
+    all_portfolio_ids: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Value holdings in one vectorized pass
+
+    A holding whose investment has no price (NaN) keeps its current value.
+    Returns per-holding arrays plus ``totals`` and ``cost_totals``, the
+    market value and cost basis of each portfolio in ``portfolios`` (every
+    portfolio that owns a holding, or ``all_portfolio_ids`` so empty
+    portfolios get zero totals).
+    """
+    portfolios = np.unique(
+        portfolio_ids if all_portfolio_ids is None else all_portfolio_ids
+    )
+    groups = np.searchsorted(portfolios, portfolio_ids)
+
+    market_value = np.where(np.isnan(price), current_value, quantity * price)
+    cost_basis = quantity * average_cost
+    gain_loss = market_value - cost_basis
+    gain_loss_percent = np.divide(
+        gain_loss * 100,
+        cost_basis,
+        out=np.zeros_like(gain_loss),
+        where=cost_basis != 0,
+    )
+
+    totals = np.bincount(groups, weights=market_value, minlength=len(portfolios))
+    cost_totals = np.bincount(groups, weights=cost_basis, minlength=len(portfolios))
+    holding_totals = totals[groups]
+    weight = np.divide(
+        market_value * 100,
+        holding_totals,
+        out=np.zeros_like(market_value),
+        where=holding_totals != 0,
+    )
+
+    return {
+        "portfolios": portfolios,
+        "totals": totals,
+        "cost_totals": cost_totals,
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "gain_loss": gain_loss,
+        "gain_loss_percent": gain_loss_percent,
+        "weight": weight,
+        "drift": weight - target_allocation,
+    }
+
+
+async def revalue_portfolios(
+    db: AsyncSession,
+    user_id: Optional[int] = None,
+    portfolio_ids: Optional[Iterable[int]] = None,
+) -> HoldingValuations:
+    """Revalue active portfolios from investment prices without committing
+
+    Restrict by owner, by portfolio IDs, or both. Holdings and totals are
+    written back with one bulk UPDATE per table, and today's value and cost
+    basis of each portfolio are upserted into its daily value history. Price
+    changes are not cash flows, so the day's recorded flow is kept.
+    """
+    portfolio_query = select(Portfolio.id).where(Portfolio.is_active.is_(True))
+    if user_id is not None:
+        portfolio_query = portfolio_query.where(Portfolio.user_id == user_id)
+    if portfolio_ids is not None:
+        portfolio_query = portfolio_query.where(Portfolio.id.in_(list(portfolio_ids)))
+    owned = np.fromiter((await db.scalars(portfolio_query)), dtype=np.int64)
+
+    rows: Sequence[Any] = []
+    if len(owned):
+        result = await db.execute(
+            select(*HOLDING_COLUMNS)
+            .join(Investment, Investment.id == PortfolioItem.investment_id)
+            .where(PortfolioItem.portfolio_id.in_(owned.tolist()))
+            .order_by(PortfolioItem.id)
+        )
+        rows = result.all()
+
+    # NULL prices and targets become NaN
+    holdings = np.array(rows, dtype=np.float64).reshape(-1, len(HOLDING_COLUMNS))
+    item_ids, item_portfolios, investment_ids = holdings[:, :3].astype(np.int64).T
+    quantity, average_cost, current_value, target, price = holdings[:, 3:].T
+
+    values = value_holdings(
+        item_portfolios,
+        quantity,
+        average_cost,
+        price,
+        current_value,
+        target,
+        all_portfolio_ids=owned,
+    )
+
+    if len(item_ids):
+        await db.execute(
+            update(PortfolioItem),
+            [
+                {
+                    "id": item_id,
+                    "current_value": market_value,
+                    "unrealized_gain_loss": gain_loss,
+                    "unrealized_gain_loss_percent": gain_loss_percent,
+                }
+                for item_id, market_value, gain_loss, gain_loss_percent in zip(
+                    item_ids.tolist(),
+                    values["market_value"].tolist(),
+                    values["gain_loss"].tolist(),
+                    values["gain_loss_percent"].tolist(),
+                )
+            ],
+        )
+
+    portfolio_totals = dict(
+        zip(values["portfolios"].tolist(), values["totals"].tolist())
+    )
+    if portfolio_totals:
+        await db.execute(
+            update(Portfolio),
+            [
+                {"id": portfolio_id, "total_value": total}
+                for portfolio_id, total in portfolio_totals.items()
+            ],
+        )
+
+        today = date.today()
+        statement = dialect_insert(db, PortfolioDailyValue)
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[
+                    PortfolioDailyValue.portfolio_id,
+                    PortfolioDailyValue.date,
+                ],
+                set_={
+                    "market_value": statement.excluded.market_value,
+                    "cost_basis": statement.excluded.cost_basis,
+                    "updated_at": func.now(),
+                },
+            ),
+            [
+                {
+                    "portfolio_id": portfolio_id,
+                    "date": today,
+                    "market_value": market_value,
+                    "cost_basis": cost_basis,
+                }
+                for portfolio_id, market_value, cost_basis in zip(
+                    values["portfolios"].tolist(),
+                    values["totals"].tolist(),
+                    values["cost_totals"].tolist(),
+                )
+            ],
+        )
+
+    return HoldingValuations(
+        item_ids=item_ids,
+        portfolio_ids=item_portfolios,
+        investment_ids=investment_ids,
+        market_value=values["market_value"],
+        cost_basis=values["cost_basis"],
+        gain_loss=values["gain_loss"],
+        gain_loss_percent=values["gain_loss_percent"],
+        weight=values["weight"],
+        target_allocation=target,
+        drift=values["drift"],
+        portfolio_totals=portfolio_totals,
+    )
+
+
+async def record_holding_change(
+    db: AsyncSession,
+    portfolio_id: int,
+    investment_id: int,
+    quantity_change: float,
+    value_per_unit: float,
+) -> None:
+    """Record units of a holding bought or sold as today's cash flow without committing
+
+    The units are valued at the investment's current price, or at
+    ``value_per_unit`` when it has none, and added to the flow in the
+    portfolio's daily value history. Today's value and cost basis are
+    recomputed from the holdings in the same statement, the way
+    ``value_holdings`` does, so the flow and the value it moved stay
+    together. Inactive portfolios have no history and are skipped.
+    """
+    price = (
+        select(Investment.current_price)
+        .where(Investment.id == investment_id)
+        .correlate(None)
+        .scalar_subquery()
+    )
+    holding_value = func.coalesce(
+        PortfolioItem.quantity * Investment.current_price, PortfolioItem.current_value
+    )
+    source = (
+        select(
+            Portfolio.id,
+            literal(date.today(), Date),
+            func.coalesce(func.sum(holding_value), 0.0),
+            func.coalesce(
+                func.sum(PortfolioItem.quantity * PortfolioItem.average_cost), 0.0
+            ),
+            literal(quantity_change) * func.coalesce(price, literal(value_per_unit)),
+        )
+        .outerjoin(PortfolioItem, PortfolioItem.portfolio_id == Portfolio.id)
+        .outerjoin(Investment, Investment.id == PortfolioItem.investment_id)
+        .where(Portfolio.id == portfolio_id, Portfolio.is_active.is_(True))
+        .group_by(Portfolio.id)
+    )
+    statement = dialect_insert(db, PortfolioDailyValue).from_select(
+        ["portfolio_id", "date", "market_value", "cost_basis", "net_flow"], source
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[PortfolioDailyValue.portfolio_id, PortfolioDailyValue.date],
+            set_={
+                "market_value": statement.excluded.market_value,
+                "cost_basis": statement.excluded.cost_basis,
+                "net_flow": PortfolioDailyValue.net_flow + statement.excluded.net_flow,
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def _nan_to_none(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+def group_valuations(valuations: HoldingValuations) -> List[Dict[str, Any]]:
+    """Group holding valuations by portfolio, with NaN as None for JSON"""
+    holdings = zip(
+        valuations.portfolio_ids.tolist(),
+        valuations.item_ids.tolist(),
+        valuations.investment_ids.tolist(),
+        valuations.market_value.tolist(),
+        valuations.cost_basis.tolist(),
+        valuations.gain_loss.tolist(),
+        valuations.gain_loss_percent.tolist(),
+        valuations.weight.tolist(),
+        _nan_to_none(valuations.target_allocation),
+        _nan_to_none(valuations.drift),
+    )
+    portfolios: Dict[int, Dict[str, Any]] = {
+        portfolio_id: {
+            "portfolio_id": portfolio_id,
+            "total_value": total,
+            "holdings": [],
+        }
+        for portfolio_id, total in valuations.portfolio_totals.items()
+    }
+    for portfolio_id, *values in holdings:
+        portfolios[portfolio_id]["holdings"].append(dict(zip(HOLDING_FIELDS, values)))
+    return list(portfolios.values())
@@ -0,0 +1,130 @@
+import asyncio
+import os
+from typing import List, Optional
+
+from celery import Celery
+
+# Celery configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+PLAID_SYNC_INTERVAL_SECONDS = float(os.getenv("PLAID_SYNC_INTERVAL_SECONDS", "3600"))
+PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS = float(
+    os.getenv("PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS", "86400")
+)
+PRICE_REFRESH_INTERVAL_SECONDS = float(
+    os.getenv("PRICE_REFRESH_INTERVAL_SECONDS", "86400")
+)
+RECURRING_DETECTION_INTERVAL_SECONDS = float(
+    os.getenv("RECURRING_DETECTION_INTERVAL_SECONDS", "86400")
+)
+
+celery_app = Celery("finance_dashboard", broker=REDIS_URL, backend=REDIS_URL)
+celery_app.conf.beat_schedule = {
+    "sync-plaid-connections": {
+        "task": "app.worker.sync_plaid_connections",
+        "schedule": PLAID_SYNC_INTERVAL_SECONDS,
+    },
+    "refresh-investment-prices": {
+        "task": "app.worker.refresh_investment_prices",
+        "schedule": PRICE_REFRESH_INTERVAL_SECONDS,
+    },
+    "snapshot-portfolios": {
+        "task": "app.worker.snapshot_portfolios",
+        "schedule": PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS,
+    },
+    "detect-recurring-transactions": {
+        "task": "app.worker.detect_recurring_transactions",
+        "schedule": RECURRING_DETECTION_INTERVAL_SECONDS,
+    },
+}
+
+
+async def _sync_plaid_connections(connection_ids: Optional[List[int]]) -> List[dict]:
+    from .database import AsyncSessionLocal, close_db
+    from .services.plaid_client import get_plaid_client
+    from .services.plaid_sync import PlaidSyncWorker
+
+    try:
+        worker = PlaidSyncWorker(get_plaid_client(), AsyncSessionLocal)
+        results = await worker.sync_all(connection_ids)
+    finally:
+        # Pooled connections belong to this task's event loop
+        await close_db()
+    return [result.dict() for result in results]
+
+
+@celery_app.task(name="app.worker.sync_plaid_connections")
+def sync_plaid_connections(connection_ids: Optional[List[int]] = None) -> List[dict]:
+    """Sync Plaid connections; run with ``celery -A app.worker worker --beat``"""
+    return asyncio.run(_sync_plaid_connections(connection_ids))
+
+
+async def _refresh_investment_prices() -> dict:
+    from .database import AsyncSessionLocal, close_db
+    from .services.prices import get_price_source, refresh_prices
+
+    try:
+        result = await refresh_prices(AsyncSessionLocal, get_price_source())
+    finally:
+        await close_db()
+    return result.dict()
+
+
+@celery_app.task(name="app.worker.refresh_investment_prices")
+def refresh_investment_prices() -> dict:
+    """Load prices from the configured source and revalue affected portfolios"""
+    return asyncio.run(_refresh_investment_prices())
+
+
+async def _snapshot_portfolios() -> dict:
+    from .database import AsyncSessionLocal, close_db
+    from .services.holdings_history import snapshot_portfolios as snapshot
+
+    try:
+        result = await snapshot(AsyncSessionLocal)
+    finally:
+        await close_db()
+    return result.dict()
+
+
+@celery_app.task(name="app.worker.snapshot_portfolios")
+def snapshot_portfolios() -> dict:
+    """Revalue and snapshot every portfolio and apply snapshot retention"""
+    return asyncio.run(_snapshot_portfolios())
+
+
+async def _recategorize_transactions(user_ids: Optional[List[int]] = None) -> dict:
+    from .database import AsyncSessionLocal, close_db
+    from .services.categorization import recategorize_transactions as recategorize
+
+    try:
+        result = await recategorize(AsyncSessionLocal, user_ids)
+    finally:
+        await close_db()
+    return result.dict()
+
+
+@celery_app.task(name="app.worker.recategorize_transactions")
+def recategorize_transactions(user_ids: Optional[List[int]] = None) -> dict:
+    """Re-apply categorization rules to existing transactions"""
+    return asyncio.run(_recategorize_transactions(user_ids))
+
+
+async def _detect_recurring_transactions(
+    user_ids: Optional[List[int]] = None, full: bool = False
+) -> dict:
+    from .database import AsyncSessionLocal, close_db
+    from .services.recurring import detect_recurring_transactions as detect
+
+    try:
+        result = await detect(AsyncSessionLocal, user_ids, full)
+    finally:
+        await close_db()
+    return result.dict()
+
+
+@celery_app.task(name="app.worker.detect_recurring_transactions")
+def detect_recurring_transactions(
+    user_ids: Optional[List[int]] = None, full: bool = False
+) -> dict:
+    """Detect recurring transactions of merchants changed since the last run"""
+    return asyncio.run(_detect_recurring_transactions(user_ids, full))
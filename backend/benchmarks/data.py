@@ -0,0 +1,245 @@
+import random
+from datetime import date, timedelta
+from typing import Dict, List
+
+from pydantic import BaseModel
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.auth.password import get_password_hash
+from app.models import (
+    Account,
+    AccountType,
+    BalanceSnapshot,
+    Investment,
+    InvestmentType,
+    Portfolio,
+    PortfolioItem,
+    Transaction,
+    TransactionCategory,
+    User,
+)
+from app.services.category_totals import apply_category_deltas
+
+# Rows per INSERT; large enough to amortize round trips, small enough to stay
+# under SQLite's bound parameter limit
+INSERT_BATCH_SIZE = 2000
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+MERCHANTS = (
+    ("Whole Foods", TransactionCategory.FOOD_AND_DRINK),
+    ("Starbucks", TransactionCategory.FOOD_AND_DRINK),
+    ("Amazon", TransactionCategory.SHOPPING),
+    ("Target", TransactionCategory.SHOPPING),
+    ("Uber", TransactionCategory.TRANSPORTATION),
+    ("Shell", TransactionCategory.TRANSPORTATION),
+    ("Delta Air Lines", TransactionCategory.TRAVEL),
+    ("Netflix", TransactionCategory.ENTERTAINMENT),
+    ("Equinox", TransactionCategory.HEALTH_AND_FITNESS),
+    ("Home Depot", TransactionCategory.HOME_IMPROVEMENT),
+    (None, None),
+)
+
+
+class SeedConfig(BaseModel):
+    users: int = 10
+    accounts_per_user: int = 3
+    years: int = 2
+    transactions_per_month: int = 60
+    snapshot_days: int = 365
+    portfolios_per_user: int = 2
+    items_per_portfolio: int = 20
+    investments: int = 100
+    end_date: date = date(2024, 12, 31)
+    seed: int = 0
+
+
+class SeedResult(BaseModel):
+    users: int = 0
+    accounts: int = 0
+    transactions: int = 0
+    snapshots: int = 0
+    portfolios: int = 0
+    portfolio_items: int = 0
+
+
+def user_email(index: int) -> str:
+    return f"bench{index:05d}@example.com"
+
+
+async def _insert(conn: AsyncConnection, model, rows: List[Dict]) -> int:
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        await conn.execute(insert(model), rows[start : start + INSERT_BATCH_SIZE])
+    return len(rows)
+
+
+async def _insert_transactions(conn: AsyncConnection, rows: List[Dict]) -> int:
+    # Bulk inserts bypass the ORM hook that maintains the category rollup
+    added = [
+        (row["account_id"], row["date"], row["category"], row["amount"]) for row in rows
+    ]
+    await conn.run_sync(apply_category_deltas, added)
+    return await _insert(conn, Transaction, rows)
+
+
+async def seed_database(conn: AsyncConnection, config: SeedConfig) -> SeedResult:
+    """Fill an empty schema with synthetic users and their financial history
+
+    Rows are generated from ``config.seed``, so the same config always gives
+    the same data, and are written with multi-row Core INSERTs rather than
+    through the ORM. Generated keys are read back after each table.
+    """
+    rng = random.Random(config.seed)
+    result = SeedResult()
+    hashed_password = get_password_hash(BENCHMARK_PASSWORD)
+
+    result.users = await _insert(
+        conn,
+        User,
+        [
+            {
+                "email": user_email(index),
+                "username": f"bench{index:05d}",
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "is_verified": True,
+            }
+            for index in range(config.users)
+        ],
+    )
+    user_ids = (await conn.scalars(select(User.id).order_by(User.id))).all()
+
+    account_types = (AccountType.CHECKING, AccountType.SAVINGS, AccountType.CREDIT_CARD)
+    result.accounts = await _insert(
+        conn,
+        Account,
+        [
+            {
+                "user_id": user_id,
+                "name": f"Account {number + 1}",
+                "type": account_types[number % len(account_types)],
+                "institution_name": "Benchmark Bank",
+                "current_balance": round(rng.uniform(100, 20000), 2),
+                "available_balance": None,
+                "currency": "USD",
+                "is_active": True,
+                "is_archived": False,
+            }
+            for user_id in user_ids
+            for number in range(config.accounts_per_user)
+        ],
+    )
+    accounts = (
+        await conn.execute(
+            select(Account.id, Account.current_balance).order_by(Account.id)
+        )
+    ).all()
+
+    days = config.years * 365
+    first_day = config.end_date - timedelta(days=days - 1)
+    transactions_per_account = config.years * 12 * config.transactions_per_month
+    transactions: List[Dict] = []
+    for account_id, _ in accounts:
+        for _ in range(transactions_per_account):
+            merchant, category = rng.choice(MERCHANTS)
+            transactions.append(
+                {
+                    "account_id": account_id,
+                    "amount": round(rng.uniform(-250, 50), 2),
+                    "currency": "USD",
+                    "date": first_day + timedelta(days=rng.randrange(days)),
+                    "description": f"{merchant or 'Transfer'} {rng.randrange(10000)}",
+                    "merchant_name": merchant,
+                    "category": category,
+                    "is_pending": False,
+                    "is_recurring": False,
+                }
+            )
+        if len(transactions) >= INSERT_BATCH_SIZE:
+            result.transactions += await _insert_transactions(conn, transactions)
+            transactions = []
+    result.transactions += await _insert_transactions(conn, transactions)
+
+    snapshot_days = min(config.snapshot_days, days)
+    snapshots: List[Dict] = []
+    for account_id, balance in accounts:
+        for offset in range(snapshot_days):
+            snapshots.append(
+                {
+                    "account_id": account_id,
+                    "date": config.end_date - timedelta(days=offset),
+                    "balance": round(balance * rng.uniform(0.8, 1.2), 2),
+                    "currency": "USD",
+                }
+            )
+        if len(snapshots) >= INSERT_BATCH_SIZE:
+            result.snapshots += await _insert(conn, BalanceSnapshot, snapshots)
+            snapshots = []
+    result.snapshots += await _insert(conn, BalanceSnapshot, snapshots)
+
+    await _insert(
+        conn,
+        Investment,
+        [
+            {
+                "symbol": f"BM{index:04d}",
+                "name": f"Benchmark Investment {index}",
+                "type": InvestmentType.STOCK,
+                "currency": "USD",
+                "current_price": round(rng.uniform(5, 500), 2),
+                "price_date": config.end_date,
+                "is_active": True,
+            }
+            for index in range(config.investments)
+        ],
+    )
+    investment_ids = (
+        await conn.scalars(select(Investment.id).order_by(Investment.id))
+    ).all()
+
+    result.portfolios = await _insert(
+        conn,
+        Portfolio,
+        [
+            {
+                "user_id": user_id,
+                "name": f"Portfolio {number + 1}",
+                "total_value": 0.0,
+                "currency": "USD",
+                "is_active": True,
+                "is_default": number == 0,
+            }
+            for user_id in user_ids
+            for number in range(config.portfolios_per_user)
+        ],
+    )
+    portfolio_ids = (
+        await conn.scalars(select(Portfolio.id).order_by(Portfolio.id))
+    ).all()
+
+    items: List[Dict] = []
+    for portfolio_id in portfolio_ids:
+        held = rng.sample(
+            investment_ids, min(config.items_per_portfolio, len(investment_ids))
+        )
+        for investment_id in held:
+            quantity = round(rng.uniform(1, 100), 4)
+            average_cost = round(rng.uniform(5, 500), 2)
+            current_value = round(quantity * average_cost * rng.uniform(0.7, 1.5), 2)
+            cost_basis = quantity * average_cost
+            items.append(
+                {
+                    "portfolio_id": portfolio_id,
+                    "investment_id": investment_id,
+                    "quantity": quantity,
+                    "average_cost": average_cost,
+                    "current_value": current_value,
+                    "unrealized_gain_loss": round(current_value - cost_basis, 2),
+                    "unrealized_gain_loss_percent": round(
+                        (current_value - cost_basis) / cost_basis * 100, 2
+                    ),
+                }
+            )
+    result.portfolio_items = await _insert(conn, PortfolioItem, items)
+    return result
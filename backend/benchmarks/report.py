@@ -0,0 +1,92 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+# A metric regresses when it grows by more than this fraction of the baseline
+REGRESSION_TOLERANCE = 0.2
+
+# Latency growth below this many milliseconds is treated as noise, so very
+# fast endpoints do not flap on a relative threshold
+LATENCY_NOISE_MS = 0.5
+
+# Metrics that vary between runs, with the absolute slack each is allowed
+RELATIVE_METRICS = {
+    "p50_ms": LATENCY_NOISE_MS,
+    "p95_ms": LATENCY_NOISE_MS,
+    "peak_allocated_kib": 0.0,
+}
+
+
+class EndpointResult(BaseModel):
+    method: str
+    path: str
+    requests: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    queries_per_request: float
+    peak_allocated_kib: float
+
+
+class Regression(BaseModel):
+    endpoint: str
+    metric: str
+    baseline: float
+    current: float
+
+
+def summarize(
+    method: str,
+    path: str,
+    seconds: Sequence[float],
+    queries: Sequence[float],
+    allocated_bytes: Sequence[int],
+) -> EndpointResult:
+    """Latency percentiles, mean queries and median peak allocation of a run"""
+    p50, p95, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99])
+    return EndpointResult(
+        method=method,
+        path=path,
+        requests=len(seconds),
+        mean_ms=round(float(np.mean(seconds)) * 1000, 3),
+        p50_ms=round(float(p50), 3),
+        p95_ms=round(float(p95), 3),
+        p99_ms=round(float(p99), 3),
+        queries_per_request=round(float(np.mean(queries)), 2),
+        peak_allocated_kib=round(float(np.median(allocated_bytes)) / 1024, 1),
+    )
+
+
+def compare(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    tolerance: float = REGRESSION_TOLERANCE,
+) -> List[Regression]:
+    """Metrics of endpoints that grew past ``tolerance`` relative to the baseline
+
+    Query counts are deterministic, so any increase is reported. Endpoints
+    missing from either side are skipped.
+    """
+    regressions = []
+    for endpoint, current in results.items():
+        previous = baseline.get(endpoint)
+        if previous is None:
+            continue
+        allowed = {
+            metric: previous[metric] * (1 + tolerance) + slack
+            for metric, slack in RELATIVE_METRICS.items()
+        }
+        allowed["queries_per_request"] = previous["queries_per_request"]
+        for metric, limit in allowed.items():
+            if current[metric] > limit:
+                regressions.append(
+                    Regression(
+                        endpoint=endpoint,
+                        metric=metric,
+                        baseline=previous[metric],
+                        current=current[metric],
+                    )
+                )
+    return regressions
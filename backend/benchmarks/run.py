@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.cache import response_cache
+from app.database import get_db
+from app.main import app
+from app.metrics import REQUEST_DB_QUERIES
+from app.models import Base, Portfolio, User
+
+from .data import BENCHMARK_PASSWORD, SeedConfig, seed_database
+from .report import REGRESSION_TOLERANCE, compare, summarize
+
+logger = logging.getLogger(__name__)
+
+# Endpoints under test: name -> (method, path template)
+ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "transactions": ("GET", "/transactions/"),
+    "balances_overview": ("GET", "/balances/overview"),
+    "portfolio_items": ("GET", "/portfolios/{portfolio_id}/items"),
+    "auth_login": ("POST", "/auth/login"),
+}
+
+# tracemalloc slows every allocation down, so allocations are measured in a
+# separate pass over at most this many requests
+ALLOCATION_SAMPLES = 20
+
+
+class BenchmarkUser(BaseModel):
+    email: str
+    token: str = ""
+    portfolio_id: int
+
+
+def _total_queries() -> float:
+    """Queries recorded by the metrics middleware so far, across all routes"""
+    return sum(
+        sample.value
+        for metric in REQUEST_DB_QUERIES.collect()
+        for sample in metric.samples
+        if sample.name.endswith("_sum")
+    )
+
+
+async def _request(
+    client: httpx.AsyncClient, endpoint: str, user: BenchmarkUser
+) -> httpx.Response:
+    method, path = ENDPOINTS[endpoint]
+    if endpoint == "auth_login":
+        return await client.post(
+            path, data={"username": user.email, "password": BENCHMARK_PASSWORD}
+        )
+    return await client.request(
+        method,
+        path.format(portfolio_id=user.portfolio_id),
+        headers={"Authorization": f"Bearer {user.token}"},
+    )
+
+
+async def _checked_request(
+    client: httpx.AsyncClient, endpoint: str, user: BenchmarkUser
+) -> httpx.Response:
+    response = await _request(client, endpoint, user)
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"{endpoint} returned {response.status_code}: {response.text[:200]}"
+        )
+    return response
+
+
+async def benchmark_endpoint(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    users: List[BenchmarkUser],
+    requests: int,
+    warmup: int = 5,
+    warm_cache: bool = False,
+) -> Dict:
+    """Time ``requests`` calls to one endpoint, rotating through the users
+
+    Requests run one at a time, so the queries the metrics middleware
+    records in between belong to the request being timed. The response
+    cache is cleared before each request unless ``warm_cache`` is set.
+    """
+    for index in range(warmup):
+        await _checked_request(client, endpoint, users[index % len(users)])
+
+    seconds, queries = [], []
+    for index in range(requests):
+        user = users[index % len(users)]
+        if not warm_cache:
+            await response_cache.clear()
+        queries_before = _total_queries()
+        started = time.perf_counter()
+        await _checked_request(client, endpoint, user)
+        seconds.append(time.perf_counter() - started)
+        queries.append(_total_queries() - queries_before)
+
+    allocated = []
+    tracemalloc.start()
+    try:
+        for index in range(min(requests, ALLOCATION_SAMPLES)):
+            user = users[index % len(users)]
+            if not warm_cache:
+                await response_cache.clear()
+            tracemalloc.reset_peak()
+            current_before = tracemalloc.get_traced_memory()[0]
+            await _checked_request(client, endpoint, user)
+            allocated.append(tracemalloc.get_traced_memory()[1] - current_before)
+    finally:
+        tracemalloc.stop()
+
+    method, path = ENDPOINTS[endpoint]
+    return summarize(method, path, seconds, queries, allocated).dict()
+
+
+async def run_benchmarks(
+    database_url: str,
+    config: SeedConfig,
+    requests: int = 200,
+    login_requests: int = 20,
+    warmup: int = 5,
+    warm_cache: bool = False,
+    endpoints: Optional[List[str]] = None,
+) -> Dict:
+    """Seed a fresh schema at ``database_url`` and benchmark the endpoints
+
+    The app runs in-process behind an ASGI transport with ``get_db`` pointed
+    at the benchmark database, so no server is started. Every table at
+    ``database_url`` is dropped first.
+    """
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        seeded = await seed_database(conn, config)
+    logger.info("Seeded %s in %.1fs", seeded, time.perf_counter() - started)
+
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            select(User.email, func.min(Portfolio.id))
+            .join(Portfolio, Portfolio.user_id == User.id)
+            .group_by(User.email)
+            .order_by(User.email)
+        )
+        users = [
+            BenchmarkUser(email=email, portfolio_id=portfolio_id)
+            for email, portfolio_id in rows
+        ]
+    if not users:
+        raise ValueError("Benchmarks need at least one user with a portfolio")
+
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_db
+    results = {}
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark"
+        ) as client:
+            for user in users:
+                response = await _checked_request(client, "auth_login", user)
+                user.token = response.json()["access_token"]
+
+            for endpoint in endpoints or list(ENDPOINTS):
+                count = login_requests if endpoint == "auth_login" else requests
+                results[endpoint] = await benchmark_endpoint(
+                    client, endpoint, users, count, warmup, warm_cache
+                )
+                logger.info("%s: %s", endpoint, results[endpoint])
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous_overrides)
+        await response_cache.clear()
+        await engine.dispose()
+
+    return {
+        "database": engine.dialect.name,
+        "python": platform.python_version(),
+        "config": json.loads(config.json()),
+        "seeded": seeded.dict(),
+        "endpoints": results,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    config = SeedConfig(
+        users=args.users,
+        accounts_per_user=args.accounts_per_user,
+        years=args.years,
+        transactions_per_month=args.transactions_per_month,
+        snapshot_days=args.snapshot_days,
+        portfolios_per_user=args.portfolios_per_user,
+        items_per_portfolio=args.items_per_portfolio,
+        seed=args.seed,
+    )
+    options = dict(
+        config=config,
+        requests=args.requests,
+        login_requests=args.login_requests,
+        warmup=args.warmup,
+        warm_cache=args.warm_cache,
+        endpoints=args.endpoint,
+    )
+    if args.database_url:
+        results = await run_benchmarks(args.database_url, **options)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            results = await run_benchmarks(
+                f"sqlite+aiosqlite:///{directory}/benchmark.db", **options
+            )
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(
+            results["endpoints"], baseline["endpoints"], args.tolerance
+        )
+        results["regressions"] = [regression.dict() for regression in regressions]
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression.endpoint} {regression.metric}: "
+                f"{regression.baseline} -> {regression.current}",
+                file=sys.stderr,
+            )
+        exit_code = 1 if regressions else 0
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    defaults = SeedConfig()
+    parser = argparse.ArgumentParser(
+        description="Seed synthetic data and benchmark the hot API endpoints"
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Disposable database to use; its tables are dropped "
+        "(default: a temporary SQLite file)",
+    )
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument(
+        "--accounts-per-user", type=int, default=defaults.accounts_per_user
+    )
+    parser.add_argument("--years", type=int, default=defaults.years)
+    parser.add_argument(
+        "--transactions-per-month",
+        type=int,
+        default=defaults.transactions_per_month,
+        help="Transactions per account and month",
+    )
+    parser.add_argument("--snapshot-days", type=int, default=defaults.snapshot_days)
+    parser.add_argument(
+        "--portfolios-per-user", type=int, default=defaults.portfolios_per_user
+    )
+    parser.add_argument(
+        "--items-per-portfolio", type=int, default=defaults.items_per_portfolio
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Timed requests per endpoint"
+    )
+    parser.add_argument(
+        "--login-requests",
+        type=int,
+        default=20,
+        help="Timed logins; each one runs bcrypt at the production cost",
+    )
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--warm-cache",
+        action="store_true",
+        help="Keep the response cache between requests instead of clearing it",
+    )
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        choices=list(ENDPOINTS),
+        help="Only benchmark this endpoint (repeatable)",
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument(
+        "--baseline", help="Results JSON to compare against; exits 1 on regressions"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=REGRESSION_TOLERANCE,
+        help="Allowed relative growth of latency and allocations",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
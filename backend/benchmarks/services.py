@@ -0,0 +1,171 @@
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models import CategorizationRule
+from app.models.transaction import TransactionCategory
+from app.services.categorization import RuleMatcher
+from app.services.performance import portfolio_returns
+from app.services.valuation import value_holdings
+
+from .report import REGRESSION_TOLERANCE
+
+# A workload builds its input once and returns the call to time and the
+# number of items that call processes
+Workload = Callable[[float], Tuple[Callable[[], object], int]]
+
+
+def categorization_workload(scale: float) -> Tuple[Callable[[], object], int]:
+    """200 mixed rules over 100k card purchase descriptions"""
+    rng = np.random.default_rng(0)
+    words = [f"merchant{index:03d}" for index in range(200)]
+    rules = []
+    for index in range(200):
+        kind = index % 4
+        if kind == 0:
+            conditions = {"merchant_equals": words[index]}
+        elif kind == 1:
+            conditions = {"description_contains": words[index]}
+        elif kind == 2:
+            conditions = {"description_regex": rf"{words[index]} #\d+"}
+        else:
+            conditions = {"min_amount": 5000 + index, "account_id": index}
+        rules.append(
+            CategorizationRule(
+                id=index + 1,
+                user_id=1,
+                category=TransactionCategory.SHOPPING,
+                priority=100,
+                is_active=True,
+                **conditions,
+            )
+        )
+    matcher = RuleMatcher(rules)
+
+    picks = rng.integers(0, 400, max(1, int(100_000 * scale))).tolist()
+    transactions = [
+        (
+            pick % 50,
+            -float(pick),
+            f"POS PURCHASE {words[pick % 200].upper()} #{pick} CITY ST",
+            words[pick % 200] if pick % 3 == 0 else None,
+        )
+        for pick in picks
+    ]
+    return lambda: matcher.categorize_many(transactions), len(transactions)
+
+
+def valuation_workload(scale: float) -> Tuple[Callable[[], object], int]:
+    """10k holdings spread over 50 portfolios"""
+    rng = np.random.default_rng(0)
+    size = max(1, int(10_000 * scale))
+    holdings = dict(
+        portfolio_ids=rng.integers(1, 50, size),
+        quantity=rng.uniform(1, 100, size),
+        average_cost=rng.uniform(1, 500, size),
+        price=rng.uniform(1, 500, size),
+        current_value=rng.uniform(1, 50_000, size),
+        target_allocation=rng.uniform(0, 10, size),
+    )
+    return lambda: value_holdings(**holdings), size
+
+
+def returns_workload(scale: float) -> Tuple[Callable[[], object], int]:
+    """Time- and money-weighted returns over 10 years of daily values"""
+    rng = np.random.default_rng(0)
+    days = max(2, int(3650 * scale))
+    dates = np.datetime64("2015-01-01") + np.arange(days)
+    flows = rng.uniform(0, 5000, days)
+    market_value = np.cumsum(flows) * rng.uniform(0.9, 1.2, days)
+    return lambda: portfolio_returns(dates, market_value, flows), days
+
+
+WORKLOADS: Dict[str, Workload] = {
+    "categorization": categorization_workload,
+    "valuation": valuation_workload,
+    "returns": returns_workload,
+}
+
+
+def run_service_benchmarks(
+    scale: float = 1.0, repeats: int = 3, workloads: Optional[List[str]] = None
+) -> Dict[str, Dict]:
+    """Time each workload and report the best of ``repeats`` runs
+
+    These cover in-process work with no database, so the best run is the
+    least disturbed by the rest of the machine.
+    """
+    results = {}
+    for name in workloads or list(WORKLOADS):
+        work, items = WORKLOADS[name](scale)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            work()
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        results[name] = {
+            "items": items,
+            "best_ms": round(best * 1000, 3),
+            "items_per_second": round(items / best) if best else 0,
+        }
+    return results
+
+
+def compare_throughput(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    tolerance: float = REGRESSION_TOLERANCE,
+) -> List[str]:
+    """Workloads whose throughput fell by more than ``tolerance``"""
+    return [
+        name
+        for name, current in results.items()
+        if name in baseline
+        and current["items_per_second"]
+        < baseline[name]["items_per_second"] * (1 - tolerance)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the throughput of in-process service hot paths"
+    )
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiplier for the input sizes"
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--workload",
+        action="append",
+        choices=list(WORKLOADS),
+        help="Only run this workload (repeatable)",
+    )
+    parser.add_argument(
+        "--baseline", help="Results JSON to compare against; exits 1 on regressions"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=REGRESSION_TOLERANCE,
+        help="Allowed relative drop in throughput",
+    )
+    args = parser.parse_args()
+
+    results = run_service_benchmarks(args.scale, args.repeats, args.workload)
+    print(json.dumps(results, indent=2))
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare_throughput(
+                results, json.load(baseline_file), args.tolerance
+            )
+        for name in regressions:
+            print(f"REGRESSION {name} items_per_second", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+    sys.exit(exit_code)
@@ -1,35 +1,56 @@
 import asyncio
+import os
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Generator
 
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
-from app.auth import create_access_token
+from app import metrics
+from app.auth import create_access_token, user_cache
+from app.auth.password import pwd_context
+from app.cache import response_cache
 from app.database import get_db
 from app.main import app
 from app.models import Base
+from app.services.categorization import matcher_cache
 
-# Test database URL - use in-memory SQLite for testing
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# pytest-xdist runs the suite in worker processes named gw0, gw1, ...; each
+# worker gets its own database so tests can run in parallel
+TEST_WORKER = os.getenv("PYTEST_XDIST_WORKER", "master")
 
-# Create test engine
-test_engine = create_async_engine(
-    TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# Test database URL - a SQLite file per worker in pytest's temporary directory
+TEST_DATABASE_URL = "sqlite+aiosqlite:///{path}"
 
-# Create test session factory
-TestingSessionLocal = sessionmaker(
-    test_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+# Disposable PostgreSQL database for tests marked ``postgres``, e.g. the
+# docker-compose service; each worker creates and drops its own schema in it
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+TEST_POSTGRES_SCHEMA = f"test_{TEST_WORKER}"
+
+# bcrypt at the production cost dominates the suite's run time. This is
+# still above the cost test_login_rehashes_outdated_password starts from.
+TEST_BCRYPT_ROUNDS = 5
+pwd_context.update(bcrypt__rounds=TEST_BCRYPT_ROUNDS)
+
+# Routes that issue more queries than their declared budget fail the test
+metrics.QUERY_BUDGET_MODE = "raise"
+
+
+def pytest_collection_modifyitems(config, items):
+    skip_postgres = pytest.mark.skip(reason="TEST_POSTGRES_URL is not configured")
+    for item in items:
+        if "postgres" in item.keywords and not TEST_POSTGRES_URL:
+            item.add_marker(skip_postgres)
 
 
 @pytest.fixture(scope="session")
@@ -40,20 +61,136 @@ def event_loop() -> Generator:
     loop.close()
 
 
+@pytest_asyncio.fixture(scope="session")
+async def sqlite_engine(tmp_path_factory) -> AsyncGenerator[AsyncEngine, None]:
+    """Create this worker's SQLite schema once for the whole session."""
+    path = tmp_path_factory.mktemp(f"db-{TEST_WORKER}") / "test.db"
+    engine = create_async_engine(
+        TEST_DATABASE_URL.format(path=path),
+        connect_args={"check_same_thread": False},
+    )
+
+    # pysqlite's own transaction handling does not support SAVEPOINT, so
+    # transactions are begun explicitly instead. The file is thrown away
+    # after the run, so it is not synced to disk.
+    @event.listens_for(engine.sync_engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute("PRAGMA synchronous = OFF")
+        dbapi_connection.execute("PRAGMA journal_mode = MEMORY")
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def postgres_engine() -> AsyncGenerator[AsyncEngine, None]:
+    """Create this worker's PostgreSQL schema once for the tests that need it.
+
+    Tables are created in a schema of their own that is first on the
+    connections' ``search_path``; extensions stay shared in ``public``.
+    """
+    engine = create_async_engine(
+        TEST_POSTGRES_URL,
+        poolclass=NullPool,
+        connect_args={
+            "server_settings": {"search_path": f"{TEST_POSTGRES_SCHEMA},public"}
+        },
+    )
+    async with engine.begin() as conn:
+        # Workers starting together would otherwise race to create it
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('pg_trgm'))"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public"))
+        await conn.execute(
+            text(f"DROP SCHEMA IF EXISTS {TEST_POSTGRES_SCHEMA} CASCADE")
+        )
+        await conn.execute(text(f"CREATE SCHEMA {TEST_POSTGRES_SCHEMA}"))
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA {TEST_POSTGRES_SCHEMA} CASCADE"))
+    await engine.dispose()
+
+
+@pytest.fixture
+def test_engine(request) -> AsyncEngine:
+    """The engine for this test: PostgreSQL if it is marked ``postgres``."""
+    if request.node.get_closest_marker("postgres"):
+        return request.getfixturevalue("postgres_engine")
+    return request.getfixturevalue("sqlite_engine")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def worker_database(sqlite_engine: AsyncEngine) -> Generator:
+    """Point the app's ``get_db`` at this worker's database for the session.
+
+    Requests made without ``async_client`` still never reach the configured
+    ``DATABASE_URL``; ``async_client`` overrides it again per test.
+    """
+    worker_sessions = sessionmaker(
+        sqlite_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async def override_get_db():
+        async with worker_sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.clear()
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def setup_database():
-    """Set up test database and create tables."""
-    async with test_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Reset in-process caches between tests."""
+    user_cache.clear()
+    matcher_cache.clear()
+    await response_cache.clear()
     yield
-    async with test_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
 
 
 @pytest_asyncio.fixture
-async def db_session() -> AsyncGenerator[AsyncSession, None]:
+async def db_connection(
+    test_engine: AsyncEngine,
+) -> AsyncGenerator[AsyncConnection, None]:
+    """Open a connection whose outer transaction is rolled back after the test.
+
+    The schema is created once per session; rolling back is much cheaper
+    than dropping and recreating every table around each test.
+    """
+    async with test_engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            yield connection
+        finally:
+            await transaction.rollback()
+
+
+@pytest.fixture
+def session_factory(db_connection: AsyncConnection) -> sessionmaker:
+    """Session factory for code under test that opens its own sessions.
+
+    Each session's commit releases a SAVEPOINT, so it is visible to the rest
+    of the test but still undone with the outer transaction.
+    """
+    return sessionmaker(
+        db_connection,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+
+
+@pytest_asyncio.fixture
+async def db_session(session_factory) -> AsyncGenerator[AsyncSession, None]:
     """Create a test database session."""
-    async with TestingSessionLocal() as session:
+    async with session_factory() as session:
         yield session
 
 
@@ -84,7 +221,8 @@ async def async_client(db_session: AsyncSession) -> AsyncGenerator:
     async def override_get_db():
         yield db_session
 
-    # Override the get_db dependency
+    # Override the get_db dependency, restoring the worker's override after
+    worker_overrides = dict(app.dependency_overrides)
     app.dependency_overrides[get_db] = override_get_db
 
     # Override the database initialization during startup
@@ -102,6 +240,7 @@ async def async_client(db_session: AsyncSession) -> AsyncGenerator:
             yield test_client
     finally:
         app.dependency_overrides.clear()
+        app.dependency_overrides.update(worker_overrides)
         app.router.lifespan_context = original_lifespan
 
 
@@ -174,3 +174,126 @@ class TestAuthEndpoints:
         client.headers.update({"Authorization": f"Bearer {expired_token}"})
         response = client.get("/auth/me")
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_get_current_user_is_cached(self, authenticated_client):
+        """Test that repeated requests with one token reuse the cached user."""
+        from app.auth import user_cache
+
+        client, user = authenticated_client
+
+        for _ in range(3):
+            response = client.get("/auth/me")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json()["email"] == user.email
+
+        stats = user_cache.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+
+        cached = user_cache.get(user.email)
+        assert cached["email"] == user.email
+        assert "hashed_password" not in cached
+
+    def test_profile_update_invalidates_cached_user(self, authenticated_client):
+        """Test that updating the profile drops the cached user."""
+        from app.auth import user_cache
+
+        client, user = authenticated_client
+
+        assert client.get("/users/me").status_code == status.HTTP_200_OK
+        response = client.put("/users/me", json={"first_name": "Updated"})
+        assert response.status_code == status.HTTP_200_OK
+        assert user_cache.stats()["invalidations"] == 1
+
+        response = client.get("/users/me")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["first_name"] == "Updated"
+
+    def test_deactivation_invalidates_cached_user(self, authenticated_client):
+        """Test that a deactivated user is rejected on the next request."""
+        client, user = authenticated_client
+
+        assert client.get("/users/me").status_code == status.HTTP_200_OK
+        response = client.put("/users/me", json={"is_active": False})
+        assert response.status_code == status.HTTP_200_OK
+
+        response = client.get("/users/me")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Inactive user" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_login_rehashes_outdated_password(
+        self, async_client, test_user, db_session
+    ):
+        """Test that login upgrades a hash made with a different bcrypt cost."""
+        from passlib.context import CryptContext
+
+        from app.auth.password import pwd_context
+
+        old_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+        old_hash = old_context.hash(test_user["password"])
+        db_user = User(
+            email=test_user["email"],
+            username=test_user["username"],
+            hashed_password=old_hash,
+            is_active=True,
+            is_verified=True,
+        )
+        db_session.add(db_user)
+        await db_session.commit()
+
+        login_data = {"username": test_user["email"], "password": test_user["password"]}
+        response = async_client.post("/auth/login", data=login_data)
+        assert response.status_code == status.HTTP_200_OK
+
+        await db_session.refresh(db_user)
+        assert db_user.hashed_password != old_hash
+        assert not pwd_context.needs_update(db_user.hashed_password)
+        assert pwd_context.verify(test_user["password"], db_user.hashed_password)
+
+    @pytest.mark.asyncio
+    async def test_password_hasher_runs_off_event_loop(self):
+        """Test that hashing runs on worker threads while the loop stays free."""
+        import asyncio
+        import threading
+
+        from app.auth import password_hasher
+        from app.auth.password import PasswordHasher
+        from app.metrics import PasswordHasherCollector
+
+        release = threading.Event()
+        threads = []
+
+        class BlockingContext:
+            def hash(self, password):
+                threads.append(threading.get_ident())
+                release.wait(timeout=5)
+                return f"hashed-{password}"
+
+        hasher = PasswordHasher(BlockingContext(), max_workers=1)
+        try:
+            pending = asyncio.gather(*(hasher.hash(f"pw-{i}") for i in range(3)))
+            # The loop keeps running while the first hash blocks its worker
+            while not threads:
+                await asyncio.sleep(0.01)
+            assert hasher.stats() == {"max_workers": 1, "pending": 3, "queue_depth": 2}
+            gauges = {
+                metric.name: metric.samples[0].value
+                for metric in PasswordHasherCollector(hasher.stats).collect()
+            }
+            assert gauges["password_hash_queue_depth"] == 2
+
+            release.set()
+            assert await pending == ["hashed-pw-0", "hashed-pw-1", "hashed-pw-2"]
+        finally:
+            release.set()
+            hasher.shutdown()
+        assert threading.get_ident() not in threads
+        assert hasher.stats()["pending"] == 0
+
+        hashes = await asyncio.gather(
+            *(password_hasher.hash(f"password-{i}") for i in range(3))
+        )
+        assert await password_hasher.verify("password-0", hashes[0])
+        assert not await password_hasher.verify("password-1", hashes[0])
+        assert password_hasher.queue_depth == 0
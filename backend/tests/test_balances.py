@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+import pytest
 from fastapi import status
 
 
@@ -117,6 +118,57 @@ class TestBalancesEndpoints:
         assert data["total_available_balance"] == 0.0
         assert len(data["accounts"]) == 0
 
+    @pytest.mark.asyncio
+    async def test_get_balance_overview_totals_and_trend(
+        self, authenticated_client, sample_account_data, db_session
+    ):
+        """Test aggregated totals and the net worth trend from snapshots."""
+        from app.models.balance_snapshot import BalanceSnapshot
+
+        client, user = authenticated_client
+
+        checking = sample_account_data.copy()
+        checking["current_balance"] = 1000.00
+        checking["available_balance"] = 900.00
+        checking_id = client.post("/accounts", json=checking).json()["id"]
+
+        # Without an available balance the current balance counts instead
+        savings = sample_account_data.copy()
+        savings["name"] = "Savings Account"
+        savings["type"] = "savings"
+        savings["current_balance"] = 2500.00
+        savings["available_balance"] = None
+        savings_id = client.post("/accounts", json=savings).json()["id"]
+
+        yesterday = date.today() - timedelta(days=1)
+        today = date.today()
+        db_session.add_all(
+            [
+                BalanceSnapshot(account_id=checking_id, date=yesterday, balance=950.0),
+                BalanceSnapshot(account_id=savings_id, date=yesterday, balance=2400.0),
+                BalanceSnapshot(account_id=checking_id, date=today, balance=1000.0),
+                # Outside the 30 day window
+                BalanceSnapshot(
+                    account_id=savings_id,
+                    date=today - timedelta(days=45),
+                    balance=100.0,
+                ),
+            ]
+        )
+        await db_session.commit()
+
+        response = client.get("/balances/overview")
+        assert response.status_code == status.HTTP_200_OK
+
+        data = response.json()
+        assert data["total_balance"] == 3500.00
+        assert data["total_available_balance"] == 3400.00
+        assert len(data["accounts"]) == 2
+        assert data["net_worth_trend"] == [
+            {"date": str(yesterday), "balance": 3350.0},
+            {"date": str(today), "balance": 1000.0},
+        ]
+
     def test_get_balance_overview_unauthorized(self, client):
         """Test getting balance overview without authentication."""
         response = client.get("/balances/overview")
@@ -263,3 +315,103 @@ class TestBalancesEndpoints:
 
         assert usd_account_data["current_balance"] == 1000.00
         assert eur_account_data["current_balance"] == 800.00
+
+    @pytest.mark.asyncio
+    async def test_net_worth_rollup_follows_snapshot_writes(
+        self, authenticated_client, sample_account_data, db_session
+    ):
+        """Test that the daily rollup tracks snapshot inserts, updates and deletes."""
+        from app.models.balance_snapshot import BalanceSnapshot
+        from app.services.net_worth import backfill_daily_net_worth
+
+        client, user = authenticated_client
+
+        checking_id = client.post("/accounts", json=sample_account_data).json()["id"]
+        savings = sample_account_data.copy()
+        savings["name"] = "Savings Account"
+        savings["type"] = "savings"
+        savings_id = client.post("/accounts", json=savings).json()["id"]
+
+        recent = date.today() - timedelta(days=10)
+        old = date.today() - timedelta(days=3 * 365)
+        recent_checking = BalanceSnapshot(
+            account_id=checking_id, date=recent, balance=100.0
+        )
+        old_savings = BalanceSnapshot(account_id=savings_id, date=old, balance=50.0)
+        db_session.add_all(
+            [
+                recent_checking,
+                old_savings,
+                BalanceSnapshot(account_id=savings_id, date=recent, balance=200.0),
+            ]
+        )
+        await db_session.commit()
+
+        response = client.get("/balances/net-worth?period=1Y")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == [
+            {
+                "date": str(recent),
+                "balance": 300.0,
+                "by_account_type": {"checking": 100.0, "savings": 200.0},
+            }
+        ]
+
+        # Older history is only included in longer ranges
+        response = client.get("/balances/net-worth?period=5Y")
+        assert [point["date"] for point in response.json()] == [str(old), str(recent)]
+
+        recent_checking.balance = 150.0
+        await db_session.delete(old_savings)
+        await db_session.commit()
+
+        response = client.get("/balances/net-worth?period=all")
+        assert [(p["date"], p["balance"]) for p in response.json()] == [
+            (str(recent), 350.0)
+        ]
+
+        # A full rebuild agrees with the incrementally maintained rows
+        assert await backfill_daily_net_worth(db_session) == 1
+        await db_session.commit()
+        rebuilt = client.get("/balances/net-worth?period=all").json()
+        assert rebuilt == response.json()
+
+    @pytest.mark.asyncio
+    async def test_net_worth_rollup_follows_account_changes(
+        self, authenticated_client, sample_account_data, db_session
+    ):
+        """Test that retyping or archiving an account refreshes its history."""
+        from app.models.balance_snapshot import BalanceSnapshot
+
+        client, user = authenticated_client
+
+        checking_id = client.post("/accounts", json=sample_account_data).json()["id"]
+        savings_id = client.post("/accounts", json=sample_account_data).json()["id"]
+        recent = date.today() - timedelta(days=10)
+        db_session.add_all(
+            [
+                BalanceSnapshot(account_id=checking_id, date=recent, balance=100.0),
+                BalanceSnapshot(account_id=savings_id, date=recent, balance=200.0),
+            ]
+        )
+        await db_session.commit()
+
+        response = client.put(f"/accounts/{savings_id}", json={"type": "savings"})
+        assert response.status_code == status.HTTP_200_OK
+        point = client.get("/balances/net-worth").json()[0]
+        assert point["by_account_type"] == {"checking": 100.0, "savings": 200.0}
+
+        response = client.delete(f"/accounts/{savings_id}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        point = client.get("/balances/net-worth").json()[0]
+        assert (point["balance"], point["by_account_type"]) == (
+            100.0,
+            {"checking": 100.0},
+        )
+
+    def test_get_net_worth_invalid_period(self, authenticated_client):
+        """Test that unknown ranges are rejected."""
+        client, user = authenticated_client
+
+        response = client.get("/balances/net-worth?period=2W")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
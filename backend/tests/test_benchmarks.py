@@ -0,0 +1,94 @@
+import pytest
+
+from app.database import get_db
+from app.main import app
+from app.services.category_totals import rebuild_rollup
+from benchmarks.data import SeedConfig, seed_database
+from benchmarks.report import compare, summarize
+from benchmarks.run import ENDPOINTS, run_benchmarks
+from benchmarks.services import WORKLOADS, compare_throughput, run_service_benchmarks
+
+TINY_CONFIG = SeedConfig(
+    users=2,
+    accounts_per_user=2,
+    years=1,
+    transactions_per_month=5,
+    snapshot_days=10,
+    portfolios_per_user=1,
+    items_per_portfolio=3,
+    investments=5,
+)
+
+
+class TestBenchmarks:
+    """Test the benchmark data generator, runner and baseline comparison."""
+
+    def test_summarize_and_compare(self):
+        """Test percentiles and which metrics count as regressions."""
+        result = summarize(
+            "GET", "/x", [0.001 * i for i in range(1, 101)], [2] * 100, [2048] * 5
+        )
+        assert (result.p50_ms, result.p95_ms, result.p99_ms) == (50.5, 95.05, 99.01)
+        assert (result.queries_per_request, result.peak_allocated_kib) == (2.0, 2.0)
+
+        baseline = {"a": result.dict(), "b": result.dict()}
+        slower = result.dict() | {"p95_ms": 200.0, "queries_per_request": 3.0}
+        noisy = result.dict() | {"p50_ms": 55.0}
+        regressions = compare({"a": slower, "b": noisy, "c": slower}, baseline)
+        assert [(r.endpoint, r.metric) for r in regressions] == [
+            ("a", "p95_ms"),
+            ("a", "queries_per_request"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_seed_database(self, db_connection):
+        """Test seeded row counts and that the category rollup matches."""
+        seeded = await seed_database(db_connection, TINY_CONFIG)
+        assert seeded.dict() == {
+            "users": 2,
+            "accounts": 4,
+            "transactions": 240,
+            "snapshots": 40,
+            "portfolios": 2,
+            "portfolio_items": 6,
+        }
+        check = await db_connection.run_sync(
+            lambda connection: rebuild_rollup(connection, verify_only=True)
+        )
+        assert (check.users, check.mismatched) == (2, 0)
+
+    @pytest.mark.asyncio
+    async def test_run_benchmarks(self, tmp_path):
+        """Test a small run against its own database."""
+        overrides = dict(app.dependency_overrides)
+        results = await run_benchmarks(
+            f"sqlite+aiosqlite:///{tmp_path}/benchmark.db",
+            TINY_CONFIG,
+            requests=3,
+            login_requests=1,
+            warmup=1,
+        )
+
+        assert app.dependency_overrides == overrides
+        assert app.dependency_overrides[get_db] is overrides[get_db]
+        assert set(results["endpoints"]) == set(ENDPOINTS)
+        for endpoint in results["endpoints"].values():
+            assert endpoint["p50_ms"] <= endpoint["p95_ms"] <= endpoint["p99_ms"]
+            assert endpoint["queries_per_request"] >= 1
+            assert endpoint["peak_allocated_kib"] > 0
+        assert results["endpoints"]["transactions"]["requests"] == 3
+        assert results["endpoints"]["auth_login"]["requests"] == 1
+
+    def test_service_benchmarks(self):
+        """Test that every service workload runs and throughput is compared."""
+        results = run_service_benchmarks(scale=0.01, repeats=1)
+
+        assert set(results) == set(WORKLOADS)
+        for result in results.values():
+            assert result["items"] > 0
+            assert result["items_per_second"] > 0
+
+        slower = {"categorization": {"items_per_second": 70}}
+        baseline = {"categorization": {"items_per_second": 100}}
+        assert compare_throughput(slower, baseline) == ["categorization"]
+        assert compare_throughput(baseline, baseline) == []
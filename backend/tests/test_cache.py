@@ -0,0 +1,145 @@
+import os
+
+import pytest
+from fastapi import status
+from prometheus_client import REGISTRY
+
+from app.cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+def cache_requests(namespace, result):
+    labels = {"namespace": namespace, "result": result}
+    return REGISTRY.get_sample_value("response_cache_requests_total", labels) or 0
+
+
+def cache_invalidations(namespace):
+    labels = {"namespace": namespace}
+    return REGISTRY.get_sample_value("response_cache_invalidations_total", labels) or 0
+
+
+class TestResponseCacheEndpoints:
+    """Test caching of the read-heavy GET endpoints."""
+
+    def test_accounts_cached_until_write(
+        self, authenticated_client, sample_account_data
+    ):
+        """Test that account writes invalidate the cached list and overview."""
+        client, user = authenticated_client
+        client.post("/accounts", json=sample_account_data)
+
+        hits = cache_requests("accounts", "hit")
+        first = client.get("/accounts")
+        second = client.get("/accounts")
+        assert second.json() == first.json()
+        assert cache_requests("accounts", "hit") == hits + 1
+
+        overview = client.get("/balances/overview").json()
+        assert overview["total_balance"] == 5000.0
+
+        invalidations = cache_invalidations("balances")
+        account_id = first.json()[0]["id"]
+        response = client.put(
+            f"/accounts/{account_id}", json={"current_balance": 250.0}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert cache_invalidations("balances") == invalidations + 1
+
+        assert client.get("/accounts").json()[0]["current_balance"] == 250.0
+        assert client.get("/balances/overview").json()["total_balance"] == 250.0
+
+    def test_portfolios_cached_until_write(self, authenticated_client):
+        """Test that portfolio writes invalidate portfolio and item lists."""
+        client, user = authenticated_client
+        portfolio = client.post("/portfolios", json={"name": "Main"}).json()
+
+        hits = cache_requests("portfolios", "hit")
+        assert client.get(f"/portfolios/{portfolio['id']}/items").json() == []
+        assert client.get(f"/portfolios/{portfolio['id']}/items").json() == []
+        assert len(client.get("/portfolios").json()) == 1
+        assert cache_requests("portfolios", "hit") == hits + 1
+
+        client.delete(f"/portfolios/{portfolio['id']}")
+        assert client.get("/portfolios").json() == []
+
+    def test_errors_are_not_cached(self, authenticated_client):
+        """Test that a 404 from a cached endpoint is not stored."""
+        client, user = authenticated_client
+
+        for _ in range(2):
+            response = client.get("/portfolios/999/items")
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestCacheBackends:
+    """Test the cache backends directly."""
+
+    @pytest.mark.asyncio
+    async def test_memory_backend_lru_and_invalidation(self):
+        """Test eviction order and per-user namespace invalidation."""
+        backend = MemoryCacheBackend(max_size=2)
+        await backend.set(1, "accounts", "/accounts", b"a", ttl=60)
+        await backend.set(2, "accounts", "/accounts", b"b", ttl=60)
+        assert await backend.get(1, "accounts", "/accounts") == b"a"
+
+        # User 2's entry is now least recently used
+        await backend.set(1, "balances", "/balances/overview", b"c", ttl=60)
+        assert await backend.get(2, "accounts", "/accounts") is None
+
+        await backend.invalidate(1, "accounts")
+        assert await backend.get(1, "accounts", "/accounts") is None
+        assert await backend.get(1, "balances", "/balances/overview") == b"c"
+
+    @pytest.mark.asyncio
+    async def test_fill_after_invalidation_is_not_served(self):
+        """Test that a response loaded before a write is not cached after it."""
+        cache = ResponseCache(MemoryCacheBackend(max_size=10), ttl_seconds=60)
+        loads = []
+
+        async def load_then_write():
+            loads.append("stale")
+            # A write commits and invalidates while this response is loading
+            await cache.invalidate(1, "accounts")
+            return ["stale"]
+
+        async def load():
+            loads.append("fresh")
+            return ["fresh"]
+
+        response = await cache.get_or_set(
+            None, 1, "accounts", list, load_then_write, key="/a"
+        )
+        assert response.body == b'["stale"]'
+        for _ in range(2):
+            response = await cache.get_or_set(None, 1, "accounts", list, load, key="/a")
+            assert response.body == b'["fresh"]'
+        assert loads == ["stale", "fresh"]
+
+    @pytest.mark.asyncio
+    async def test_memory_backend_expiry(self):
+        """Test that expired entries are treated as misses."""
+        backend = MemoryCacheBackend(max_size=10)
+        await backend.set(1, "accounts", "/accounts", b"a", ttl=-1)
+        assert await backend.get(1, "accounts", "/accounts") is None
+
+    @pytest.mark.integration
+    @pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not configured")
+    @pytest.mark.asyncio
+    async def test_redis_backend(self):
+        """Test the Redis backend against a real server."""
+        backend = RedisCacheBackend(TEST_REDIS_URL)
+        try:
+            await backend.clear()
+            await backend.set(1, "accounts", "/accounts", b"a", ttl=60)
+            await backend.set(2, "accounts", "/accounts", b"b", ttl=60)
+            assert await backend.get(1, "accounts", "/accounts") == b"a"
+
+            version = await backend.version(1, "accounts")
+            await backend.invalidate(1, "accounts")
+            assert await backend.get(1, "accounts", "/accounts") is None
+            assert await backend.get(2, "accounts", "/accounts") == b"b"
+            assert await backend.version(1, "accounts") == version + 1
+        finally:
+            await backend.clear()
+            await backend.redis.aclose()
@@ -0,0 +1,231 @@
+import asyncio
+import re._parser as sre_parse
+from types import SimpleNamespace
+
+from fastapi import status
+
+from app.models import CategorizationRule
+from app.models.transaction import TransactionCategory
+from app.schemas.categorization_rule import _backtracking_risk
+from app.services.categorization import RuleMatcher, _literal_prefix
+
+
+def _rule(rule_id, category, priority=100, **conditions):
+    return CategorizationRule(
+        id=rule_id,
+        user_id=1,
+        category=TransactionCategory(category),
+        priority=priority,
+        is_active=True,
+        **conditions,
+    )
+
+
+class TestRuleMatcher:
+    """Test the compiled matcher used for categorization rules."""
+
+    def test_priority_and_conditions(self):
+        """Test that the first matching rule by priority wins."""
+        matcher = RuleMatcher(
+            [
+                _rule(1, "shopping", description_contains="market"),
+                _rule(2, "food_and_drink", priority=10, merchant_equals="Whole Foods"),
+                _rule(3, "income", min_amount=1000, account_id=7),
+                _rule(4, "travel", description_regex=r"^delta air \d+"),
+                _rule(5, "transportation", description_contains="uber"),
+                _rule(
+                    6, "food_and_drink", priority=50, description_contains="uber eats"
+                ),
+            ]
+        )
+
+        assert matcher.categorize(1, -20, "WHOLE FOODS MARKET", "whole foods") == (
+            TransactionCategory.FOOD_AND_DRINK
+        )
+        assert matcher.categorize(1, -20, "Farmers Market", None) == (
+            TransactionCategory.SHOPPING
+        )
+        assert (
+            matcher.categorize(7, 2500, "Payroll", None) == TransactionCategory.INCOME
+        )
+        assert matcher.categorize(8, 2500, "Payroll", None) is None
+        assert matcher.categorize(1, -300, "Delta Air 0062", None) == (
+            TransactionCategory.TRAVEL
+        )
+        assert matcher.categorize(1, -300, "Delta Airlines", None) is None
+        # Overlapping texts: the shorter one is found inside the longer one
+        assert matcher.categorize(1, -15, "UBER EATS 1234", None) == (
+            TransactionCategory.FOOD_AND_DRINK
+        )
+        assert matcher.categorize(1, -15, "UBER TRIP", None) == (
+            TransactionCategory.TRANSPORTATION
+        )
+        assert matcher.categorize_many([(1, -5, "Coffee", None)]) == [None]
+
+    def test_backtracking_risk(self):
+        """Test which regex shapes are rejected as too slow to match."""
+        risky = (r"(a+)+b", r"(x+x+)+y", r"(.*a){10}", r"(a|a)*", r"(?=(a+)+)")
+        safe = (r"^delta air \d+", r"(uber|lyft)", r"(foo|bar)+", r"(a+)++")
+        for pattern in risky:
+            assert _backtracking_risk(list(sre_parse.parse(pattern))), pattern
+        for pattern in safe:
+            assert _backtracking_risk(list(sre_parse.parse(pattern))) is None, pattern
+
+    def test_literal_prefix(self):
+        """Test the literal text used to screen regex rules."""
+        assert _literal_prefix(r"^Delta Air \d+") == "delta air "
+        assert _literal_prefix(r"amazon\.com") == "amazon.com"
+        assert _literal_prefix(r"shell?") == "shel"
+        assert _literal_prefix(r"(uber|lyft)") == ""
+        assert _literal_prefix(r"uber|lyft") == ""
+
+
+class TestCategorizationRulesEndpoints:
+    """Test categorization rule endpoints."""
+
+    def _create_account(self, client, sample_account_data):
+        response = client.post("/accounts", json=sample_account_data)
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()["id"]
+
+    def test_rule_crud(self, authenticated_client, sample_account_data):
+        """Test creating, listing, updating and deleting rules."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+
+        response = client.post(
+            "/categorization-rules",
+            json={"category": "travel", "description_regex": "^delta"},
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        rule = response.json()
+        assert rule["priority"] == 100
+        assert rule["user_id"] == user.id
+
+        response = client.post(
+            "/categorization-rules",
+            json={"category": "income", "min_amount": 1000, "account_id": account_id},
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = client.put(
+            f"/categorization-rules/{rule['id']}", json={"priority": 5}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = client.get("/categorization-rules")
+        assert [r["category"] for r in response.json()] == ["travel", "income"]
+
+        # Updates are validated against the whole rule
+        for update in ({"description_regex": None}, {"description_regex": "(a+)+$"}):
+            response = client.put(f"/categorization-rules/{rule['id']}", json=update)
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = client.delete(f"/categorization-rules/{rule['id']}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        response = client.get("/categorization-rules")
+        assert len(response.json()) == 1
+
+    def test_create_rule_validation(self, authenticated_client):
+        """Test that invalid rules are rejected."""
+        client, user = authenticated_client
+
+        for rule in (
+            {"category": "travel"},
+            {"category": "travel", "description_regex": "(unclosed"},
+            # Patterns that can backtrack exponentially
+            {"category": "travel", "description_regex": r"^(\w+\s?)*$"},
+            {"category": "travel", "description_regex": "(a|ab)*c"},
+            {"category": "travel", "min_amount": 10, "max_amount": 5},
+        ):
+            response = client.post("/categorization-rules", json=rule)
+            assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = client.post(
+            "/categorization-rules", json={"category": "travel", "account_id": 999}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_rules_categorize_new_and_existing_transactions(
+        self,
+        authenticated_client,
+        db_session,
+        monkeypatch,
+        sample_account_data,
+        sample_transaction_data,
+    ):
+        """Test rules on create, bulk ingest and re-categorization."""
+        from app.api import categorization_rules
+        from app.services.categorization import recategorize_user
+        from app.services.category_totals import rebuild_category_totals
+
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        uncategorized = dict(
+            sample_transaction_data, account_id=account_id, category=None
+        )
+
+        existing = client.post(
+            "/transactions", json=dict(uncategorized, description="UBER TRIP")
+        ).json()
+        assert existing["category"] is None
+
+        client.post(
+            "/categorization-rules",
+            json={"category": "transportation", "description_contains": "uber"},
+        )
+
+        response = client.post(
+            "/transactions", json=dict(uncategorized, description="Uber trip 2")
+        )
+        assert response.json()["category"] == "transportation"
+        # An explicit category is kept
+        response = client.post(
+            "/transactions",
+            json=dict(
+                uncategorized, description="Uber Eats", category="food_and_drink"
+            ),
+        )
+        assert response.json()["category"] == "food_and_drink"
+
+        response = client.post(
+            "/transactions/bulk",
+            json={
+                "transactions": [
+                    dict(uncategorized, description="UBER *TRIP"),
+                    dict(uncategorized, description="Bookstore"),
+                ]
+            },
+        )
+        ids = [r["id"] for r in response.json()["results"]]
+        categories = {
+            t["id"]: t["category"] for t in client.get("/transactions").json()
+        }
+        assert [categories[i] for i in ids] == ["transportation", None]
+
+        # Applying the rules queues the worker task for this user only
+        queued = []
+
+        class FakeTask:
+            def delay(self, user_ids):
+                queued.append(user_ids)
+                return SimpleNamespace(id="task-1")
+
+        monkeypatch.setattr(
+            categorization_rules, "recategorize_transactions", FakeTask()
+        )
+        response = client.post("/categorization-rules/apply")
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json() == {"task_id": "task-1"}
+        assert queued == [[user.id]]
+
+        # The task overwrites every category a rule matches
+        result = asyncio.run(recategorize_user(db_session, user.id))
+        asyncio.run(db_session.commit())
+        assert (result.scanned, result.updated) == (5, 2)
+        response = client.get(f"/transactions/{existing['id']}")
+        assert response.json()["category"] == "transportation"
+
+        check = asyncio.run(
+            rebuild_category_totals(db_session, user.id, verify_only=True)
+        )
+        assert check.mismatched == 0
@@ -0,0 +1,148 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from app.api import investments
+from app.models import Investment, InvestmentType, Portfolio, PortfolioItem, User
+from app.services.prices import CsvPriceSource, refresh_prices
+
+
+async def create_holdings(db_session):
+    """Another user's stock and bond portfolios, with unpriced investments."""
+    vti = Investment(symbol="VTI", name="Total Market", type=InvestmentType.ETF)
+    bnd = Investment(symbol="BND", name="Total Bond", type=InvestmentType.ETF)
+    other = User(email="other@example.com", username="other", hashed_password="x")
+    db_session.add_all([vti, bnd, other])
+    await db_session.flush()
+
+    portfolios = [
+        Portfolio(user_id=other.id, name="Stocks"),
+        Portfolio(user_id=other.id, name="Bonds"),
+    ]
+    db_session.add_all(portfolios)
+    await db_session.flush()
+    db_session.add_all(
+        [
+            PortfolioItem(
+                portfolio_id=portfolios[0].id,
+                investment_id=vti.id,
+                quantity=10,
+                average_cost=200.0,
+                current_value=2000.0,
+            ),
+            PortfolioItem(
+                portfolio_id=portfolios[1].id,
+                investment_id=bnd.id,
+                quantity=10,
+                average_cost=70.0,
+                current_value=700.0,
+            ),
+        ]
+    )
+    await db_session.commit()
+    return [portfolio.id for portfolio in portfolios]
+
+
+class TestInvestmentPrices:
+    """Test bulk price updates and the price refresh job."""
+
+    def test_bulk_update_prices_requires_internal_token(
+        self, authenticated_client, monkeypatch
+    ):
+        """Test that logged-in users cannot overwrite the shared prices."""
+        client, user = authenticated_client
+        prices = {"prices": [{"symbol": "VTI", "price": 1.0}]}
+
+        response = client.post("/investments/prices/bulk", json=prices)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        monkeypatch.setattr(investments, "PRICE_UPDATE_TOKEN", "secret")
+        for token in ("", "wrong"):
+            response = client.post(
+                "/investments/prices/bulk",
+                json=prices,
+                headers={"X-Price-Update-Token": token},
+            )
+            assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_bulk_update_prices(self, authenticated_client, db_session, monkeypatch):
+        """Test that prices are stored and only affected portfolios revalued."""
+        client, user = authenticated_client
+        stocks_id, bonds_id = asyncio.run(create_holdings(db_session))
+        monkeypatch.setattr(investments, "PRICE_UPDATE_TOKEN", "secret")
+        client.headers["X-Price-Update-Token"] = "secret"
+
+        response = client.post(
+            "/investments/prices/bulk",
+            json={
+                "prices": [
+                    {"symbol": "vti", "price": 250.0, "price_date": "2024-01-02"},
+                    {"symbol": "NOPE", "price": 1.0},
+                ]
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "updated": 1,
+            "unchanged": 0,
+            "unknown_symbols": ["NOPE"],
+            "revalued_portfolios": 1,
+        }
+
+        async def load():
+            prices = dict(
+                (await db_session.execute(select(Investment.symbol, Investment)))
+                .tuples()
+                .all()
+            )
+            totals = dict(
+                (await db_session.execute(select(Portfolio.id, Portfolio.total_value)))
+                .tuples()
+                .all()
+            )
+            return prices, totals
+
+        prices, totals = asyncio.run(load())
+        assert prices["VTI"].current_price == 250.0
+        assert prices["VTI"].price_date == date(2024, 1, 2)
+        assert prices["BND"].current_price is None
+        assert totals == {stocks_id: 2500.0, bonds_id: 0.0}
+
+        response = client.post(
+            "/investments/prices/bulk",
+            json={
+                "prices": [
+                    {"symbol": "VTI", "price": 250.0, "price_date": "2024-01-02"}
+                ]
+            },
+        )
+        assert response.json()["unchanged"] == 1
+        assert response.json()["revalued_portfolios"] == 0
+
+    @pytest.mark.asyncio
+    async def test_refresh_prices_from_csv(self, db_session, session_factory, tmp_path):
+        """Test the refresh job applying a CSV file in batches."""
+        stocks_id, bonds_id = await create_holdings(db_session)
+        path = tmp_path / "prices.csv"
+        path.write_text(
+            "symbol,price,price_date\n"
+            "VTI,240.5,2024-01-03\n"
+            "BND,72,2024-01-03\n"
+            "SPY,470,2024-01-03\n"
+        )
+        result = await refresh_prices(
+            session_factory, CsvPriceSource(str(path)), batch_size=1
+        )
+
+        assert result.updated == 2
+        assert result.unknown_symbols == []
+        assert result.portfolio_ids == [stocks_id, bonds_id]
+        totals = dict(
+            (await db_session.execute(select(Portfolio.id, Portfolio.total_value)))
+            .tuples()
+            .all()
+        )
+        assert totals == {stocks_id: 2405.0, bonds_id: 720.0}
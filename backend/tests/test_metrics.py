@@ -0,0 +1,167 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi import status
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import metrics
+from app.api.accounts import get_account
+from app.metrics import (
+    PoolCollector,
+    QueryBudgetExceeded,
+    TimedQueuePool,
+    monitor_event_loop_lag,
+    refresh_business_metrics,
+)
+from app.models import Account, AccountType, Portfolio, User
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetricsEndpoints:
+    """Test the Prometheus metrics endpoint."""
+
+    def test_metrics_records_requests_per_route(
+        self, authenticated_client, sample_account_data
+    ):
+        """Test that latency and query counts are labelled by route template."""
+        client, user = authenticated_client
+        account_id = client.post("/accounts", json=sample_account_data).json()["id"]
+        labels = {"method": "GET", "route": "/accounts/{account_id}"}
+        before = sample("http_request_db_queries_count", **labels)
+
+        response = client.get(f"/accounts/{account_id}")
+        assert response.status_code == status.HTTP_200_OK
+
+        response = client.get("/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/accounts/{account_id}",status="200"}' in response.text
+        )
+        assert sample("http_request_db_queries_count", **labels) == before + 1
+        assert sample("http_request_db_queries_sum", **labels) >= 1
+
+    def test_server_timing_header(self, authenticated_client, sample_account_data):
+        """Test that responses report their database time and query count."""
+        client, user = authenticated_client
+        account_id = client.post("/accounts", json=sample_account_data).json()["id"]
+        labels = {"method": "GET", "route": "/accounts/{account_id}"}
+        before = sample("http_request_db_queries_sum", **labels)
+
+        response = client.get(f"/accounts/{account_id}")
+        db, total = response.headers["server-timing"].split(", ")
+        name, duration, count = db.split(";")
+        assert (name, count) == ("db", "count=1")
+        assert float(duration.removeprefix("dur=")) > 0
+        assert total.startswith("total;dur=")
+        assert sample("http_request_db_queries_sum", **labels) == before + 1
+
+    def test_query_budget(
+        self, authenticated_client, sample_account_data, monkeypatch, caplog
+    ):
+        """Test that routes over their query budget raise or are logged."""
+        client, user = authenticated_client
+        account_id = client.post("/accounts", json=sample_account_data).json()["id"]
+        monkeypatch.setattr(get_account, "query_budget", 0)
+
+        with pytest.raises(QueryBudgetExceeded, match="its budget is 0"):
+            client.get(f"/accounts/{account_id}")
+
+        monkeypatch.setattr(metrics, "QUERY_BUDGET_MODE", "log")
+        monkeypatch.setattr(metrics, "SLOW_REQUEST_QUERY_THRESHOLD", 0)
+        with caplog.at_level(logging.WARNING, logger="app.metrics"):
+            response = client.get(f"/accounts/{account_id}")
+        assert response.status_code == status.HTTP_200_OK
+        messages = [
+            record.getMessage()[:24]
+            for record in caplog.records
+            if record.name == "app.metrics"
+        ]
+        assert messages == [
+            "Slow request GET /accoun",
+            "GET /accounts/{account_i",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_refresh_business_metrics(self, db_session):
+        """Test that the business gauges are computed from the database."""
+        user = User(
+            email="metrics@example.com", username="metrics", hashed_password="x"
+        )
+        db_session.add(user)
+        await db_session.flush()
+        db_session.add_all(
+            [
+                Account(user_id=user.id, name="Checking", type=AccountType.CHECKING),
+                Account(
+                    user_id=user.id,
+                    name="Old",
+                    type=AccountType.SAVINGS,
+                    is_archived=True,
+                ),
+                Portfolio(user_id=user.id, name="Main", total_value=1500.0),
+                Portfolio(
+                    user_id=user.id, name="Closed", total_value=99.0, is_active=False
+                ),
+            ]
+        )
+        await db_session.commit()
+
+        await refresh_business_metrics(db_session)
+
+        assert sample("finance_accounts") == 1
+        assert sample("finance_portfolio_value") == 1500.0
+        assert sample("finance_last_sync_timestamp_seconds") == 0
+
+    @pytest.mark.asyncio
+    async def test_pool_metrics(self, tmp_path):
+        """Test the pool gauges and checkout wait histogram."""
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=TimedQueuePool,
+            pool_size=2,
+            max_overflow=1,
+        )
+        waits_before = sample("db_pool_checkout_wait_seconds_count")
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                gauges = {
+                    metric.name: metric.samples[0].value
+                    for metric in PoolCollector(engine).collect()
+                }
+        finally:
+            await engine.dispose()
+
+        assert gauges["db_pool_size"] == 2
+        assert gauges["db_pool_checked_out"] == 1
+        assert sample("db_pool_checkout_wait_seconds_count") == waits_before + 1
+
+    def test_user_cache_metrics(self, authenticated_client):
+        """Test that the user cache counters are exported."""
+        client, user = authenticated_client
+        hits_before = sample("user_cache_hits_total")
+
+        for _ in range(2):
+            assert client.get("/auth/me").status_code == status.HTTP_200_OK
+
+        assert sample("user_cache_hits_total") == hits_before + 1
+        assert sample("user_cache_size") == 1
+
+    @pytest.mark.asyncio
+    async def test_event_loop_lag(self):
+        """Test that the lag monitor samples while it runs."""
+        before = sample("event_loop_lag_seconds_count")
+
+        task = asyncio.create_task(monitor_event_loop_lag(interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+        assert sample("event_loop_lag_seconds_count") > before
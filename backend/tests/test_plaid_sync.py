@@ -0,0 +1,225 @@
+import time
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import (
+    Account,
+    AccountType,
+    BalanceSnapshot,
+    Base,
+    PlaidConnection,
+    User,
+)
+from app.models.daily_net_worth import DailyNetWorth
+from app.models.transaction import Transaction, TransactionCategory
+from app.services.category_totals import rebuild_category_totals
+from app.services.plaid_client import (
+    FakePlaidClient,
+    PlaidAccountData,
+    PlaidTransactionData,
+)
+from app.services.plaid_sync import PlaidSyncWorker, RateLimiter
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """Session factory on a file database so concurrent syncs get own connections."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sync.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+async def create_connection(session_factory, name, access_token):
+    async with session_factory() as db:
+        user = User(email=f"{name}@example.com", username=name, hashed_password="x")
+        db.add(user)
+        await db.flush()
+        connection = PlaidConnection(
+            user_id=user.id,
+            plaid_item_id=f"item-{name}",
+            access_token=access_token,
+            institution_id="ins_1",
+            institution_name="Test Bank",
+        )
+        db.add(connection)
+        await db.commit()
+        return connection.id
+
+
+def plaid_account(account_id, current, **overrides):
+    data = {
+        "account_id": account_id,
+        "name": "Plaid Checking",
+        "mask": "0000",
+        "type": "depository",
+        "subtype": "checking",
+        "current_balance": current,
+        "available_balance": current,
+        "currency": "USD",
+    }
+    data.update(overrides)
+    return PlaidAccountData(**data)
+
+
+def plaid_transaction(transaction_id, account_id, amount, **overrides):
+    data = {
+        "transaction_id": transaction_id,
+        "account_id": account_id,
+        "amount": amount,
+        "currency": "USD",
+        "date": date(2024, 1, 15),
+        "name": "Coffee Shop",
+        "merchant_name": "Coffee Shop",
+        "category": "FOOD_AND_DRINK",
+        "subcategory": "FOOD_AND_DRINK_COFFEE",
+    }
+    data.update(overrides)
+    return PlaidTransactionData(**data)
+
+
+class TestPlaidSync:
+    """Test the Plaid sync worker against the fake client."""
+
+    @pytest.mark.asyncio
+    async def test_incremental_sync(self, session_factory):
+        """Test an initial sync followed by an incremental one."""
+        connection_id = await create_connection(session_factory, "alice", "token-a")
+        client = FakePlaidClient(page_size=2)
+        client.set_accounts(
+            "token-a",
+            [
+                plaid_account("acc-1", 1000.0),
+                plaid_account("acc-2", -250.0, type="credit", subtype="credit card"),
+            ],
+        )
+        client.add_transactions(
+            "token-a",
+            [
+                plaid_transaction("txn-1", "acc-1", 4.5),
+                plaid_transaction("txn-2", "acc-1", -2000.0, category="INCOME"),
+                plaid_transaction("txn-3", "acc-2", 60.0, category="UNKNOWN"),
+            ],
+        )
+        worker = PlaidSyncWorker(client, session_factory, backoff_seconds=0)
+
+        [result] = await worker.sync_all()
+        assert result.status == "success"
+        assert (result.accounts, result.added, result.removed) == (2, 3, 0)
+
+        async with session_factory() as db:
+            accounts = {
+                a.plaid_account_id: a for a in (await db.scalars(select(Account)))
+            }
+            assert accounts["acc-1"].type == AccountType.CHECKING
+            assert accounts["acc-2"].type == AccountType.CREDIT_CARD
+            assert accounts["acc-1"].institution_name == "Test Bank"
+
+            transactions = {
+                t.plaid_transaction_id: t
+                for t in (await db.scalars(select(Transaction)))
+            }
+            assert transactions["txn-1"].amount == -4.5
+            assert transactions["txn-1"].category == TransactionCategory.FOOD_AND_DRINK
+            assert transactions["txn-2"].category == TransactionCategory.INCOME
+            assert transactions["txn-3"].category == TransactionCategory.OTHER
+            assert transactions["txn-3"].account_id == accounts["acc-2"].id
+
+            connection = await db.get(PlaidConnection, connection_id)
+            assert connection.sync_cursor == "3"
+            assert connection.sync_status == "success"
+            assert connection.last_sync_at is not None
+
+            net_worth = await db.scalar(select(DailyNetWorth.total))
+            assert net_worth == 750.0
+
+        # Balances move and Plaid reports a modification and a removal
+        client.set_accounts(
+            "token-a",
+            [
+                plaid_account("acc-1", 900.0),
+                plaid_account("acc-2", -300.0, type="credit", subtype="credit card"),
+            ],
+        )
+        client.modify_transactions(
+            "token-a", [plaid_transaction("txn-1", "acc-1", 5.0)]
+        )
+        client.remove_transactions("token-a", ["txn-2"])
+
+        [result] = await worker.sync_all()
+        assert (result.added, result.modified, result.removed) == (0, 1, 1)
+
+        async with session_factory() as db:
+            amounts = dict(
+                (
+                    await db.execute(
+                        select(Transaction.plaid_transaction_id, Transaction.amount)
+                    )
+                ).all()
+            )
+            assert amounts == {"txn-1": -5.0, "txn-3": -60.0}
+
+            # The day's snapshots are replaced, not duplicated
+            snapshots = (await db.scalars(select(BalanceSnapshot.balance))).all()
+            assert sorted(snapshots) == [-300.0, 900.0]
+            assert await db.scalar(select(DailyNetWorth.total)) == 600.0
+            assert await db.scalar(select(func.count()).select_from(Account)) == 2
+
+            # Category totals followed the upserts and the removal
+            check = await rebuild_category_totals(db, verify_only=True)
+            assert check.rows > 0
+            assert check.mismatched == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_sync_with_rate_limits_and_errors(self, session_factory):
+        """Test that rate-limited calls are retried and failures stay isolated."""
+        client = FakePlaidClient()
+        connection_ids = []
+        for index in range(4):
+            token = f"token-{index}"
+            connection_ids.append(
+                await create_connection(session_factory, f"user{index}", token)
+            )
+            client.set_accounts(token, [plaid_account(f"acc-{index}", 100.0)])
+            client.add_transactions(
+                token, [plaid_transaction(f"txn-{index}", f"acc-{index}", 1.0)]
+            )
+        broken_id = await create_connection(session_factory, "broken", "token-x")
+
+        client.rate_limited_calls = 3
+        worker = PlaidSyncWorker(
+            client, session_factory, concurrency=3, backoff_seconds=0.001
+        )
+        results = {result.connection_id: result for result in await worker.sync_all()}
+
+        assert all(results[i].status == "success" for i in connection_ids)
+        assert results[broken_id].status == "error"
+        assert "ITEM_NOT_FOUND" in results[broken_id].error
+
+        async with session_factory() as db:
+            assert await db.scalar(select(func.count()).select_from(Transaction)) == 4
+            broken = await db.get(PlaidConnection, broken_id)
+            assert broken.sync_status == "error"
+            assert broken.sync_cursor is None
+
+        # A connection deleted after the listing is reported, not raised
+        missing = await worker._sync_in_session(broken_id + 1)
+        assert (missing.status, missing.error) == ("error", "Connection not found")
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_spaces_calls(self):
+        """Test that the token bucket holds calls to the configured rate."""
+        limiter = RateLimiter(rate=50, burst=1)
+
+        started = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        assert time.monotonic() - started >= 0.09
@@ -0,0 +1,545 @@
+import warnings
+
+import numpy as np
+import pytest
+from fastapi import status
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import SAWarning
+
+from app.models import Investment, InvestmentType
+from app.services.performance import xirr
+from app.services.valuation import value_holdings
+
+ITEMS_ROUTE = "/portfolios/{portfolio_id}/items"
+ITEM_ROUTE = "/portfolios/{portfolio_id}/items/{item_id}"
+
+
+def request_queries(method, route):
+    labels = {"method": method, "route": route}
+    return REGISTRY.get_sample_value("http_request_db_queries_sum", labels) or 0
+
+
+@pytest.fixture
+def investment_id(db_session):
+    import asyncio
+
+    async def create_investment():
+        investment = Investment(
+            symbol="VTI",
+            name="Vanguard Total Stock Market ETF",
+            type=InvestmentType.ETF,
+            current_price=250.0,
+        )
+        db_session.add(investment)
+        await db_session.commit()
+        return investment.id
+
+    return asyncio.run(create_investment())
+
+
+def portfolio_cache_hits():
+    labels = {"namespace": "portfolios", "result": "hit"}
+    return REGISTRY.get_sample_value("response_cache_requests_total", labels) or 0
+
+
+class TestPortfoliosEndpoints:
+    """Test portfolio and portfolio item endpoints."""
+
+    def _item_data(self, portfolio_id, investment_id, **overrides):
+        data = {
+            "portfolio_id": portfolio_id,
+            "investment_id": investment_id,
+            "quantity": 10,
+            "average_cost": 200.0,
+            "current_value": 2500.0,
+            "target_allocation": 60,
+        }
+        data.update(overrides)
+        return data
+
+    def test_portfolio_item_lifecycle(self, authenticated_client, investment_id):
+        """Test creating, listing, updating and deleting portfolio items."""
+        client, user = authenticated_client
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        items_url = f"/portfolios/{portfolio_id}/items"
+
+        # The INSERT ... SELECT must not join portfolios and investments as a
+        # cartesian product
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SAWarning)
+            response = client.post(
+                items_url, json=self._item_data(portfolio_id, investment_id)
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        item = response.json()
+        assert item["portfolio_id"] == portfolio_id
+        assert item["quantity"] == 10
+        assert item["unrealized_gain_loss"] == 0.0
+        assert item["created_at"]
+
+        assert [i["id"] for i in client.get(items_url).json()] == [item["id"]]
+
+        response = client.put(f"{items_url}/{item['id']}", json={"quantity": 12})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["quantity"] == 12
+        assert response.json()["average_cost"] == 200.0
+
+        response = client.delete(f"{items_url}/{item['id']}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert client.get(items_url).json() == []
+
+    def test_portfolio_item_not_found(self, authenticated_client, investment_id):
+        """Test the 404 details for missing portfolios, items and investments."""
+        client, user = authenticated_client
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        items_url = f"/portfolios/{portfolio_id}/items"
+
+        response = client.post(items_url, json=self._item_data(portfolio_id, 999))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "Investment not found"
+
+        response = client.post(
+            "/portfolios/999/items", json=self._item_data(999, investment_id)
+        )
+        assert response.json()["detail"] == "Portfolio not found"
+
+        response = client.put(f"{items_url}/999", json={"quantity": 1})
+        assert response.json()["detail"] == "Portfolio item not found"
+
+        response = client.delete("/portfolios/999/items/1")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert response.json()["detail"] == "Portfolio not found"
+
+    def test_portfolio_item_query_counts(self, authenticated_client, investment_id):
+        """Test that each item endpoint issues at most two statements, or three
+        when a quantity change is valued as a cash flow."""
+        client, user = authenticated_client
+        # Also warms the authenticated user cache
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        items_url = f"/portfolios/{portfolio_id}/items"
+
+        def queries_for(method, route, call):
+            before = request_queries(method, route)
+            response = call()
+            assert response.status_code < 400
+            return request_queries(method, route) - before, response
+
+        count, response = queries_for(
+            "POST",
+            ITEMS_ROUTE,
+            lambda: client.post(
+                items_url, json=self._item_data(portfolio_id, investment_id)
+            ),
+        )
+        assert count <= 2
+        item_id = response.json()["id"]
+
+        count, _ = queries_for("GET", ITEMS_ROUTE, lambda: client.get(items_url))
+        assert count <= 2
+
+        count, _ = queries_for(
+            "PUT",
+            ITEM_ROUTE,
+            lambda: client.put(f"{items_url}/{item_id}", json={"quantity": 3}),
+        )
+        assert count <= 3
+
+        count, _ = queries_for(
+            "PUT",
+            ITEM_ROUTE,
+            lambda: client.put(f"{items_url}/{item_id}", json={"average_cost": 150}),
+        )
+        assert count <= 2
+
+        count, _ = queries_for(
+            "DELETE", ITEM_ROUTE, lambda: client.delete(f"{items_url}/{item_id}")
+        )
+        assert count <= 2
+
+    def test_portfolio_items_of_other_user(self, authenticated_client, db_session):
+        """Test that another user's portfolio cannot be read."""
+        import asyncio
+
+        from app.models import Portfolio, User
+
+        async def create_other_portfolio():
+            other = User(
+                email="other@example.com", username="other", hashed_password="x"
+            )
+            db_session.add(other)
+            await db_session.flush()
+            portfolio = Portfolio(user_id=other.id, name="Theirs")
+            db_session.add(portfolio)
+            await db_session.commit()
+            return portfolio.id
+
+        client, user = authenticated_client
+        portfolio_id = asyncio.run(create_other_portfolio())
+
+        response = client.get(f"/portfolios/{portfolio_id}/items")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_portfolio_valuation(self, authenticated_client, db_session):
+        """Test revaluing holdings from investment prices."""
+        import asyncio
+
+        async def create_investments():
+            priced = Investment(
+                symbol="VTI", name="Total Market", type=InvestmentType.ETF
+            )
+            unpriced = Investment(
+                symbol="PRIV", name="Private Fund", type=InvestmentType.OTHER
+            )
+            priced.current_price = 300.0
+            db_session.add_all([priced, unpriced])
+            await db_session.commit()
+            return priced.id, unpriced.id
+
+        client, user = authenticated_client
+        priced_id, unpriced_id = asyncio.run(create_investments())
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        items_url = f"/portfolios/{portfolio_id}/items"
+        client.post(items_url, json=self._item_data(portfolio_id, priced_id))
+        client.post(
+            items_url,
+            json=self._item_data(
+                portfolio_id,
+                unpriced_id,
+                quantity=5,
+                average_cost=250.0,
+                current_value=1000.0,
+                target_allocation=None,
+            ),
+        )
+        # Warm the cache so the revaluation must invalidate it
+        client.get(items_url)
+
+        response = client.post(f"/portfolios/{portfolio_id}/valuation")
+        assert response.status_code == status.HTTP_200_OK
+        valuation = response.json()
+        assert valuation["total_value"] == 4000.0
+
+        priced, unpriced = valuation["holdings"]
+        assert priced["market_value"] == 3000.0
+        assert priced["unrealized_gain_loss"] == 1000.0
+        assert priced["unrealized_gain_loss_percent"] == 50.0
+        assert priced["weight"] == 75.0
+        assert priced["drift"] == 15.0
+        # Without a price the stored value is kept
+        assert unpriced["market_value"] == 1000.0
+        assert unpriced["unrealized_gain_loss"] == -250.0
+        assert unpriced["target_allocation"] is None
+        assert unpriced["drift"] is None
+
+        items = {item["id"]: item for item in client.get(items_url).json()}
+        assert items[priced["item_id"]]["current_value"] == 3000.0
+        assert items[unpriced["item_id"]]["unrealized_gain_loss_percent"] == -20.0
+        assert client.get("/portfolios").json()[0]["total_value"] == 4000.0
+
+        response = client.post("/portfolios/valuation")
+        assert [p["portfolio_id"] for p in response.json()] == [portfolio_id]
+
+        response = client.post("/portfolios/999/valuation")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestValueHoldings:
+    """Test the vectorized valuation directly."""
+
+    def test_value_holdings_groups_by_portfolio(self):
+        """Test totals and weights per portfolio, including empty ones."""
+        values = value_holdings(
+            portfolio_ids=np.array([2, 1, 2]),
+            quantity=np.array([1.0, 2.0, 3.0]),
+            average_cost=np.array([10.0, 10.0, 0.0]),
+            price=np.array([20.0, np.nan, 10.0]),
+            current_value=np.array([0.0, 50.0, 0.0]),
+            target_allocation=np.array([50.0, 100.0, np.nan]),
+            all_portfolio_ids=np.array([3, 1, 2]),
+        )
+
+        assert values["portfolios"].tolist() == [1, 2, 3]
+        assert values["totals"].tolist() == [50.0, 50.0, 0.0]
+        assert values["weight"].tolist() == [40.0, 100.0, 60.0]
+        assert values["drift"][:2].tolist() == [-10.0, 0.0]
+        # A zero cost basis has no gain percentage
+        assert values["gain_loss_percent"].tolist() == [100.0, 150.0, 0.0]
+
+
+class TestPortfolioPerformance:
+    """Test portfolio returns from the daily value history."""
+
+    def test_performance_endpoint(self, authenticated_client, db_session):
+        """Test returns over a period with a contribution part way through."""
+        import asyncio
+        from datetime import date, timedelta
+
+        from app.models import PortfolioDailyValue
+
+        client, user = authenticated_client
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        as_of = date(2024, 12, 31)
+
+        async def create_history():
+            # Grows 10% in the first half, 1000 is added, then flat
+            db_session.add_all(
+                [
+                    PortfolioDailyValue(
+                        portfolio_id=portfolio_id,
+                        date=as_of - timedelta(days=days),
+                        market_value=market_value,
+                        cost_basis=cost_basis,
+                        net_flow=net_flow,
+                    )
+                    for days, market_value, cost_basis, net_flow in [
+                        (800, 50.0, 50.0, 50.0),
+                        (364, 1000.0, 1000.0, 950.0),
+                        (182, 1100.0, 1000.0, 0.0),
+                        (181, 2100.0, 2000.0, 1000.0),
+                        (0, 2100.0, 2000.0, 0.0),
+                    ]
+                ]
+            )
+            await db_session.commit()
+
+        asyncio.run(create_history())
+        url = f"/portfolios/{portfolio_id}/performance"
+
+        response = client.get(url, params={"period": "1Y", "as_of": "2024-12-31"})
+        assert response.status_code == status.HTTP_200_OK
+        performance = response.json()
+        assert performance["start_date"] == "2024-01-02"
+        assert performance["start_value"] == 1000.0
+        assert performance["net_cash_flow"] == 1000.0
+        assert performance["time_weighted_return"] == pytest.approx(0.1)
+        # Money-weighted: 100 gained on 1000 for a year and 2000 for half
+        assert 0.04 < performance["money_weighted_return"] < 0.1
+
+        hits = portfolio_cache_hits()
+        client.get(url, params={"period": "1Y", "as_of": "2024-12-31"})
+        assert portfolio_cache_hits() == hits + 1
+
+        response = client.get(url, params={"period": "all", "as_of": "2024-12-31"})
+        assert response.json()["start_value"] == 50.0
+
+        response = client.get("/portfolios/999/performance")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_valuation_records_history(self, authenticated_client, investment_id):
+        """Test that revaluing stores today's value for performance."""
+        client, user = authenticated_client
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        client.post(
+            f"/portfolios/{portfolio_id}/items",
+            json={
+                "portfolio_id": portfolio_id,
+                "investment_id": investment_id,
+                "quantity": 10,
+                "average_cost": 200.0,
+                "current_value": 2000.0,
+            },
+        )
+        client.post(f"/portfolios/{portfolio_id}/valuation")
+
+        performance = client.get(f"/portfolios/{portfolio_id}/performance").json()
+        assert performance["end_value"] == 2500.0
+        assert performance["time_weighted_return"] is None
+
+    def test_sales_and_cost_edits_are_not_losses(
+        self, authenticated_client, db_session
+    ):
+        """Test that selling at a gain and editing the cost basis leave returns flat."""
+        import asyncio
+        from datetime import date, timedelta
+
+        from sqlalchemy import select, update
+
+        from app.models import PortfolioDailyValue
+
+        client, user = authenticated_client
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        items_url = f"/portfolios/{portfolio_id}/items"
+
+        async def create_investments():
+            investments = [
+                Investment(symbol=symbol, name=symbol, type=InvestmentType.STOCK)
+                for symbol in ("AAA", "BBB")
+            ]
+            for investment in investments:
+                investment.current_price = 10.0
+            db_session.add_all(investments)
+            await db_session.commit()
+            return [investment.id for investment in investments]
+
+        # Two holdings each worth 100 at a cost of 50
+        item_ids = [
+            client.post(
+                items_url,
+                json={
+                    "portfolio_id": portfolio_id,
+                    "investment_id": investment_id,
+                    "quantity": 10,
+                    "average_cost": 5.0,
+                    "current_value": 100.0,
+                },
+            ).json()["id"]
+            for investment_id in asyncio.run(create_investments())
+        ]
+
+        async def history():
+            result = await db_session.execute(
+                select(PortfolioDailyValue.market_value, PortfolioDailyValue.net_flow)
+                .where(PortfolioDailyValue.portfolio_id == portfolio_id)
+                .order_by(PortfolioDailyValue.date)
+            )
+            return [tuple(row) for row in result.all()]
+
+        async def move_to_yesterday():
+            await db_session.execute(
+                update(PortfolioDailyValue)
+                .where(PortfolioDailyValue.portfolio_id == portfolio_id)
+                .values(date=date.today() - timedelta(days=1))
+            )
+            await db_session.commit()
+
+        # The purchases are paid in, then the sales happen the next day
+        assert asyncio.run(history()) == [(200.0, 200.0)]
+        asyncio.run(move_to_yesterday())
+
+        # Sell one holding outright and half of the other, at 2x their cost
+        client.delete(f"{items_url}/{item_ids[0]}")
+        client.put(f"{items_url}/{item_ids[1]}", json={"quantity": 5})
+        # Correcting the cost basis moves no money
+        client.put(f"{items_url}/{item_ids[1]}", json={"average_cost": 7.5})
+
+        assert asyncio.run(history()) == [(200.0, 200.0), (50.0, -150.0)]
+
+        performance = client.get(f"/portfolios/{portfolio_id}/performance").json()
+        assert performance["end_value"] == 50.0
+        assert performance["net_cash_flow"] == -150.0
+        assert performance["time_weighted_return"] == pytest.approx(0.0)
+        assert performance["money_weighted_return"] == pytest.approx(0.0, abs=1e-9)
+
+    def test_xirr_falls_back_to_bracketing(self):
+        """Test a rate Newton's method cannot reach from the default guess."""
+        assert xirr(np.array([-100.0, 10000.0]), np.array([0.0, 1.0])) == (
+            pytest.approx(99.0)
+        )
+        assert xirr(np.array([100.0, 50.0]), np.array([0.0, 1.0])) is None
+
+
+class TestHoldingsHistory:
+    """Test daily holdings snapshots and their retention."""
+
+    def test_snapshot_and_history(
+        self, authenticated_client, session_factory, investment_id
+    ):
+        """Test the snapshot job and reading the history back."""
+        import asyncio
+        from datetime import date
+
+        from app.services.holdings_history import snapshot_portfolios
+
+        client, user = authenticated_client
+        portfolio_id = client.post("/portfolios", json={"name": "Main"}).json()["id"]
+        for quantity in (10, 2):
+            client.post(
+                f"/portfolios/{portfolio_id}/items",
+                json={
+                    "portfolio_id": portfolio_id,
+                    "investment_id": investment_id,
+                    "quantity": quantity,
+                    "average_cost": 200.0,
+                    "current_value": 1.0,
+                },
+            )
+        url = f"/portfolios/{portfolio_id}/holdings/history"
+        assert client.get(url).json() == []
+
+        for day in (date(2024, 3, 1), date(2024, 3, 1), date(2024, 3, 2)):
+            result = asyncio.run(snapshot_portfolios(session_factory, day))
+        assert result.portfolios == 1
+
+        history = client.get(url, params={"start_date": "2024-03-01"}).json()
+        assert [snapshot["date"] for snapshot in history] == [
+            "2024-03-01",
+            "2024-03-02",
+        ]
+        assert history[0] == {
+            "date": "2024-03-01",
+            "investment_id": investment_id,
+            "quantity": 12.0,
+            "cost_basis": 2400.0,
+            "market_value": 3000.0,
+        }
+        response = client.get(url, params={"end_date": "2024-02-29"})
+        assert response.json() == []
+
+        response = client.get("/portfolios/999/holdings/history")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_retention_downsamples_to_weekly(self, db_session, investment_id):
+        """Test that old snapshots are thinned to weekly and then expired."""
+        from datetime import date, timedelta
+
+        from sqlalchemy import select
+
+        from app.models import Portfolio, PortfolioItemSnapshot, User
+        from app.services.holdings_history import apply_snapshot_retention
+
+        user = User(
+            email="history@example.com", username="history", hashed_password="x"
+        )
+        db_session.add(user)
+        await db_session.flush()
+        portfolio = Portfolio(user_id=user.id, name="Main")
+        db_session.add(portfolio)
+        await db_session.flush()
+        # Daily from Monday 2023-12-04 to 2024-06-30
+        start = date(2023, 12, 4)
+        db_session.add_all(
+            [
+                PortfolioItemSnapshot(
+                    date=start + timedelta(days=days),
+                    portfolio_id=portfolio.id,
+                    investment_id=investment_id,
+                    quantity=1,
+                    cost_basis=1,
+                    market_value=1,
+                )
+                for days in range((date(2024, 6, 30) - start).days + 1)
+            ]
+        )
+        await db_session.flush()
+
+        result = await apply_snapshot_retention(
+            db_session, date(2024, 6, 30), daily_months=3, retention_months=6
+        )
+
+        dates = (
+            await db_session.scalars(
+                select(PortfolioItemSnapshot.date).order_by(PortfolioItemSnapshot.date)
+            )
+        ).all()
+        # Expired before 2023-12-30; one per ISO week (its last day) until the
+        # daily cutoff of 2024-03-30
+        weekly = [day for day in dates if day < date(2024, 3, 30)]
+        assert weekly[0] == date(2023, 12, 31)
+        assert weekly[-1] == date(2024, 3, 29)
+        assert all(day.weekday() == 6 for day in weekly[:-1])
+        assert len(weekly) == 14
+        assert dates[len(weekly) :] == [
+            date(2024, 3, 30) + timedelta(days=days) for days in range(93)
+        ]
+        assert result.expired == 26
+        assert result.downsampled == 91 - 14
+
+    def test_months_before(self):
+        """Test month arithmetic clamps to the end of shorter months."""
+        from datetime import date
+
+        from app.services.holdings_history import months_before
+
+        assert months_before(date(2024, 5, 31), 3) == date(2024, 2, 29)
+        assert months_before(date(2024, 1, 15), 13) == date(2022, 12, 15)
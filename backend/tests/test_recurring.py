@@ -0,0 +1,170 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from fastapi import status
+
+from app.models.recurring_series import RecurringCadence
+from app.services.recurring import (
+    CADENCES,
+    detect_series,
+    find_cadences,
+    merchant_key,
+    next_expected_date,
+)
+
+
+def _monthly(start: date, count: int):
+    return [start.replace(month=start.month + i) for i in range(count)]
+
+
+class TestRecurringDetection:
+    """Test the vectorized recurring series detection."""
+
+    def test_merchant_key(self):
+        """Test that merchants are normalized by name or description prefix."""
+        assert merchant_key(" Netflix ", "anything") == "netflix"
+        assert merchant_key(None, "NETFLIX.COM 866-579-7172 CA") == "netflix.com"
+        assert merchant_key("", "UBER *TRIP HELP.UBER.COM") == "uber"
+        assert merchant_key(None, "12345") == "12345"
+
+    def test_find_cadences(self):
+        """Test cadence detection over several groups in one pass."""
+        groups, days = [], []
+        series = {
+            0: [0, 7, 14, 21, 29],  # weekly, one day late once
+            1: [0, 14, 28, 42],  # biweekly
+            2: [0, 31, 59, 90, 120],  # monthly
+            3: [0, 365, 731],  # annual
+            4: [0, 3, 40, 41, 90],  # irregular
+            5: [0, 30],  # too few
+            6: [0, 0, 0, 30, 30, 61],  # monthly with same-day repeats
+        }
+        for group, group_days in series.items():
+            groups += [group] * len(group_days)
+            days += group_days
+
+        cadence = find_cadences(np.array(groups), np.array(days), len(series))
+        names = [CADENCES[index][0] if index >= 0 else None for index in cadence]
+        assert names == [
+            RecurringCadence.WEEKLY,
+            RecurringCadence.BIWEEKLY,
+            RecurringCadence.MONTHLY,
+            RecurringCadence.ANNUAL,
+            None,
+            None,
+            RecurringCadence.MONTHLY,
+        ]
+
+    def test_detect_series_splits_amount_bands(self):
+        """Test that one merchant's different amounts form separate series."""
+        dates = _monthly(date(2024, 1, 5), 6) + _monthly(date(2024, 1, 20), 3)
+        amounts = [-15.49] * 6 + [-200.0, -9.99, -215.0]
+        recurring, series = detect_series(
+            ["netflix"] * 9, dates, np.array(amounts), today=date(2024, 6, 20)
+        )
+
+        assert recurring.tolist() == [True] * 6 + [False] * 3
+        assert series == [
+            {
+                "merchant": "netflix",
+                "cadence": RecurringCadence.MONTHLY,
+                "average_amount": -15.49,
+                "transaction_count": 6,
+                "first_date": date(2024, 1, 5),
+                "last_date": date(2024, 6, 5),
+                "next_expected_date": date(2024, 7, 5),
+                "is_active": True,
+            }
+        ]
+        recurring, series = detect_series([], [], np.array([]), date(2024, 1, 1))
+        assert (len(recurring), series) == (0, [])
+
+    def test_next_expected_date(self):
+        """Test that months are stepped by calendar month."""
+        assert next_expected_date(RecurringCadence.MONTHLY, date(2024, 1, 31)) == (
+            date(2024, 2, 29)
+        )
+        assert next_expected_date(RecurringCadence.ANNUAL, date(2024, 2, 29)) == (
+            date(2025, 2, 28)
+        )
+        assert next_expected_date(RecurringCadence.BIWEEKLY, date(2024, 1, 1)) == (
+            date(2024, 1, 15)
+        )
+
+    def test_detect_recurring_transactions(
+        self, authenticated_client, db_session, session_factory, sample_account_data
+    ):
+        """Test flags, series and incremental runs through the API."""
+        from sqlalchemy import update
+
+        from app.models import Transaction
+        from app.services.recurring import detect_recurring_transactions
+
+        client, user = authenticated_client
+        account_id = client.post("/accounts", json=sample_account_data).json()["id"]
+
+        def row(day, amount, description, merchant=None):
+            return {
+                "account_id": account_id,
+                "date": day.isoformat(),
+                "amount": amount,
+                "description": description,
+                "merchant_name": merchant,
+            }
+
+        payday = date(2024, 1, 5)
+        rows = [
+            row(day, -15.49, "NETFLIX.COM", "Netflix") for day in _monthly(payday, 6)
+        ]
+        rows += [
+            row(payday + timedelta(days=14 * i), 2000.0 + i, f"ACME PAYROLL {i:04d}")
+            for i in range(8)
+        ]
+        rows += [
+            row(date(2024, 1, day), -50.0, "Grocery", "Whole Foods")
+            for day in (6, 20, 27)
+        ]
+        response = client.post("/transactions/bulk", json={"transactions": rows})
+        assert response.json()["created"] == len(rows)
+
+        result = asyncio.run(detect_recurring_transactions(session_factory))
+        assert (result.users, result.merchants, result.series) == (1, 3, 2)
+        assert result.flagged == 14
+
+        transactions = client.get("/transactions", params={"limit": 100}).json()
+        flagged = {t["description"][:12] for t in transactions if t["is_recurring"]}
+        assert flagged == {"NETFLIX.COM", "ACME PAYROLL"}
+
+        response = client.get("/transactions/recurring")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []  # Both series ended long ago
+        response = client.get("/transactions/recurring?include_inactive=true")
+        series = {s["merchant"]: s for s in response.json()}
+        assert series["acme payroll"]["cadence"] == "biweekly"
+        assert series["acme payroll"]["next_expected_date"] == "2024-04-26"
+        assert series["netflix"]["cadence"] == "monthly"
+
+        # Only merchants changed since the last run are examined again
+        async def age_transactions():
+            await db_session.execute(
+                update(Transaction).values(updated_at=datetime(2024, 1, 1))
+            )
+            await db_session.commit()
+
+        asyncio.run(age_transactions())
+        client.post(
+            "/transactions",
+            json=row(date(2024, 1, 13), -50.0, "Grocery", "Whole Foods"),
+        )
+        result = asyncio.run(detect_recurring_transactions(session_factory))
+        assert (result.merchants, result.series, result.flagged) == (1, 1, 4)
+        response = client.get("/transactions/recurring?include_inactive=true")
+        assert {s["merchant"] for s in response.json()} == {
+            "acme payroll",
+            "netflix",
+            "whole foods",
+        }
+
+        result = asyncio.run(detect_recurring_transactions(session_factory, full=True))
+        assert (result.merchants, result.series, result.flagged) == (3, 3, 0)
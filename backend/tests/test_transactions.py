@@ -0,0 +1,613 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
+
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+
+@contextmanager
+def captured_inserts(db_session):
+    """Collect the INSERT statements sent through ``db_session``."""
+    statements = []
+    engine = db_session.bind.sync_engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO transactions"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+async def create_bulk_rows(db_session, email, plaid_ids):
+    """A user's account and one transaction per Plaid ID (None for no ID)."""
+    from datetime import date
+
+    from app.models import Account, AccountType, User
+    from app.schemas.transaction import TransactionCreate
+
+    user = User(email=email, username=email.split("@")[0], hashed_password="x")
+    db_session.add(user)
+    await db_session.flush()
+    account = Account(user_id=user.id, name="Checking", type=AccountType.CHECKING)
+    db_session.add(account)
+    await db_session.flush()
+    rows = [
+        TransactionCreate(
+            account_id=account.id,
+            amount=-1.0 - index,
+            date=date(2024, 1, 1),
+            description=f"Purchase {index}",
+            plaid_transaction_id=plaid_id,
+        )
+        for index, plaid_id in enumerate(plaid_ids)
+    ]
+    return user, rows
+
+
+class TestTransactionsEndpoints:
+    """Test transactions endpoints."""
+
+    def _create_account(self, client, sample_account_data):
+        response = client.post("/accounts", json=sample_account_data)
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.json()["id"]
+
+    def _create_transactions(self, client, sample_transaction_data, account_id, dates):
+        created = []
+        for index, transaction_date in enumerate(dates):
+            transaction_data = sample_transaction_data.copy()
+            transaction_data["account_id"] = account_id
+            transaction_data["date"] = transaction_date
+            transaction_data["description"] = f"Purchase {index}"
+            response = client.post("/transactions", json=transaction_data)
+            assert response.status_code == status.HTTP_201_CREATED
+            created.append(response.json())
+        return created
+
+    def test_get_transactions_empty(self, authenticated_client):
+        """Test getting transactions when user has none."""
+        client, user = authenticated_client
+
+        response = client.get("/transactions")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+        assert "x-next-cursor" not in response.headers
+
+    def test_get_transactions_cursor_pagination(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test walking every page with the keyset cursor."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+
+        # Several rows share a date so the id tiebreaker is exercised
+        created = self._create_transactions(
+            client,
+            sample_transaction_data,
+            account_id,
+            ["2024-01-15", "2024-01-15", "2024-01-14", "2024-01-15", "2024-01-10"],
+        )
+        expected = [
+            t["id"]
+            for t in sorted(created, key=lambda t: (t["date"], t["id"]), reverse=True)
+        ]
+
+        seen = []
+        response = client.get("/transactions?limit=2")
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(t["id"] for t in response.json())
+            next_cursor = response.headers.get("x-next-cursor")
+            if not next_cursor:
+                break
+            response = client.get(f"/transactions?limit=2&cursor={next_cursor}")
+
+        assert seen == expected
+
+    def test_get_transactions_cursor_matches_offset(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test that cursor and offset pagination return the same pages."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        self._create_transactions(
+            client,
+            sample_transaction_data,
+            account_id,
+            ["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-03"],
+        )
+
+        first_page = client.get("/transactions?limit=2")
+        cursor = first_page.headers["x-next-cursor"]
+
+        by_cursor = client.get(f"/transactions?limit=2&cursor={cursor}")
+        by_offset = client.get("/transactions?limit=2&offset=2")
+        assert [t["id"] for t in by_cursor.json()] == [
+            t["id"] for t in by_offset.json()
+        ]
+
+    def test_get_transactions_invalid_cursor(self, authenticated_client):
+        """Test that a malformed cursor is rejected."""
+        client, user = authenticated_client
+
+        response = client.get("/transactions?cursor=not-a-cursor")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid cursor"
+
+    def test_get_transactions_category_filter(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test filtering transactions by category."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        created = self._create_transactions(
+            client, sample_transaction_data, account_id, ["2024-01-01", "2024-01-02"]
+        )
+        response = client.put(
+            f"/transactions/{created[0]['id']}", json={"category": "income"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = client.get("/transactions?category=income")
+        assert [t["id"] for t in response.json()] == [created[0]["id"]]
+
+        response = client.get("/transactions?category=not_a_category")
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_search_transactions(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test q= matching description or merchant name within the user's rows."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        for description, merchant_name in [
+            ("Coffee at 50% off", None),
+            ("Weekly groceries", "Whole Foods"),
+            ("Rent", "Landlord LLC"),
+        ]:
+            client.post(
+                "/transactions",
+                json=dict(
+                    sample_transaction_data,
+                    account_id=account_id,
+                    description=description,
+                    merchant_name=merchant_name,
+                ),
+            )
+
+        def search(q, **params):
+            response = client.get("/transactions", params={"q": q, **params})
+            assert response.status_code == status.HTTP_200_OK
+            assert "x-next-cursor" not in response.headers
+            return sorted(t["description"] for t in response.json())
+
+        assert search("whole") == ["Weekly groceries"]
+        assert search("EE") == ["Coffee at 50% off", "Weekly groceries"]
+        assert search("50%") == ["Coffee at 50% off"]
+        assert search("_") == []
+        assert search("rent", category="income") == []
+
+        response = client.get("/transactions", params={"q": "rent", "cursor": "abc"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_export_transactions_csv(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test exporting transactions as CSV with the list filters."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        self._create_transactions(
+            client,
+            sample_transaction_data,
+            account_id,
+            ["2024-01-01", "2024-02-01", "2024-03-01"],
+        )
+
+        response = client.get("/transactions/export?start_date=2024-02-01")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "transactions.csv" in response.headers["content-disposition"]
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["date"] for row in rows] == ["2024-03-01", "2024-02-01"]
+        assert rows[0]["category"] == "food_and_drink"
+        assert rows[0]["amount"] == "-50.0"
+
+    def test_export_transactions_ndjson(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test exporting transactions as newline-delimited JSON."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        created = self._create_transactions(
+            client, sample_transaction_data, account_id, ["2024-01-01", "2024-01-02"]
+        )
+
+        response = client.get("/transactions/export?format=ndjson")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [created[1]["id"], created[0]["id"]]
+        assert rows[0]["description"] == created[1]["description"]
+
+    def test_export_transactions_empty(self, authenticated_client):
+        """Test that an empty CSV export still has a header row."""
+        client, user = authenticated_client
+
+        response = client.get("/transactions/export")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text.startswith("id,account_id,date,amount")
+        assert len(response.text.splitlines()) == 1
+
+    def test_bulk_create_transactions(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test bulk ingest with inserts, upserts and per-row failures."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+
+        def row(**overrides):
+            data = sample_transaction_data.copy()
+            data["account_id"] = account_id
+            data.update(overrides)
+            return data
+
+        response = client.post(
+            "/transactions/bulk",
+            json={
+                "transactions": [
+                    row(plaid_transaction_id="plaid-1"),
+                    row(plaid_transaction_id="plaid-2", amount=-20.0),
+                    row(description="Manual entry"),
+                ]
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["created"], data["updated"], data["failed"]) == (3, 0, 0)
+        first_id = data["results"][0]["id"]
+
+        # Re-importing updates by plaid_transaction_id instead of duplicating
+        response = client.post(
+            "/transactions/bulk",
+            json={
+                "transactions": [
+                    row(plaid_transaction_id="plaid-1", amount=-75.0),
+                    row(plaid_transaction_id="plaid-1", amount=-80.0),
+                    row(account_id=999, plaid_transaction_id="plaid-3"),
+                    row(plaid_transaction_id="plaid-4", date="2024-02-01"),
+                ]
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["created"], data["updated"], data["failed"]) == (1, 1, 2)
+        assert [r["status"] for r in data["results"]] == [
+            "updated",
+            "failed",
+            "failed",
+            "created",
+        ]
+        assert data["results"][0]["id"] == first_id
+        assert (
+            data["results"][1]["detail"] == "Duplicate plaid_transaction_id in request"
+        )
+        assert data["results"][2]["detail"] == "Account not found"
+
+        transaction = client.get(f"/transactions/{first_id}").json()
+        assert transaction["amount"] == -75.0
+        assert len(client.get("/transactions").json()) == 4
+
+    def test_bulk_create_transactions_rejects_empty(self, authenticated_client):
+        """Test that an empty bulk request is rejected."""
+        client, user = authenticated_client
+
+        response = client.post("/transactions/bulk", json={"transactions": []})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_transaction_summary(
+        self, authenticated_client, sample_account_data, sample_transaction_data
+    ):
+        """Test grouped totals and their invalidation by transaction writes."""
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        self._create_transactions(
+            client,
+            sample_transaction_data,
+            account_id,
+            ["2024-01-15", "2024-01-20", "2024-02-03"],
+        )
+        paycheck = dict(
+            sample_transaction_data,
+            account_id=account_id,
+            amount=1000.0,
+            date="2024-02-01",
+            merchant_name=None,
+            category="income",
+        )
+        client.post("/transactions", json=paycheck)
+
+        response = client.get("/transactions/summary", params={"group_by": "month"})
+        assert response.status_code == status.HTTP_200_OK
+        summary = response.json()
+        assert summary["group_by"] == "month"
+        assert summary["groups"] == [
+            {
+                "key": "2024-01",
+                "transaction_count": 2,
+                "total_amount": -100.0,
+                "income": 0.0,
+                "spending": 100.0,
+            },
+            {
+                "key": "2024-02",
+                "transaction_count": 2,
+                "total_amount": 950.0,
+                "income": 1000.0,
+                "spending": 50.0,
+            },
+        ]
+
+        response = client.get(
+            "/transactions/summary",
+            params={"group_by": "merchant", "start_date": "2024-01-16"},
+        )
+        groups = response.json()["groups"]
+        assert [(g["key"], g["transaction_count"]) for g in groups] == [
+            ("Whole Foods", 2),
+            (None, 1),
+        ]
+
+        response = client.get("/transactions/summary")
+        by_category = {g["key"]: g["total_amount"] for g in response.json()["groups"]}
+        assert by_category == {"food_and_drink": -150.0, "income": 1000.0}
+
+        client.post("/transactions", json=dict(paycheck, date="2024-03-01"))
+        response = client.get("/transactions/summary")
+        by_category = {g["key"]: g["total_amount"] for g in response.json()["groups"]}
+        assert by_category["income"] == 2000.0
+
+        response = client.get("/transactions/summary", params={"group_by": "account"})
+        assert response.json()["groups"][0]["key"] == str(account_id)
+
+    def test_category_totals_follow_writes(
+        self,
+        authenticated_client,
+        db_session,
+        sample_account_data,
+        sample_transaction_data,
+    ):
+        """Test the monthly category rollup through every kind of write."""
+        import asyncio
+
+        from sqlalchemy import select, update
+
+        from app.models import MonthlyCategoryTotal
+        from app.services.category_totals import rebuild_category_totals
+
+        client, user = authenticated_client
+        account_id = self._create_account(client, sample_account_data)
+        first, second = self._create_transactions(
+            client, sample_transaction_data, account_id, ["2024-01-15", "2024-01-20"]
+        )
+        client.put(
+            f"/transactions/{second['id']}",
+            json={"date": "2024-02-01", "amount": 25.0, "category": None},
+        )
+        client.delete(f"/transactions/{first['id']}")
+        bulk_row = dict(
+            sample_transaction_data,
+            account_id=account_id,
+            date="2024-02-10",
+            plaid_transaction_id="txn-1",
+        )
+        client.post("/transactions/bulk", json={"transactions": [bulk_row]})
+        client.post(
+            "/transactions/bulk",
+            json={"transactions": [dict(bulk_row, amount=-80.0)]},
+        )
+
+        async def load_totals():
+            result = await db_session.execute(
+                select(
+                    MonthlyCategoryTotal.month,
+                    MonthlyCategoryTotal.category,
+                    MonthlyCategoryTotal.total,
+                    MonthlyCategoryTotal.count,
+                    MonthlyCategoryTotal.income,
+                    MonthlyCategoryTotal.spending,
+                ).order_by(MonthlyCategoryTotal.category)
+            )
+            return [(str(month), *rest) for month, *rest in result.all()]
+
+        assert asyncio.run(load_totals()) == [
+            ("2024-02-01", "food_and_drink", -80.0, 1, 0.0, 80.0),
+            ("2024-02-01", "uncategorized", 25.0, 1, 25.0, 0.0),
+        ]
+
+        response = client.get(
+            "/transactions/summary",
+            params={"group_by": "category", "start_date": "2024-02-01"},
+        )
+        assert [g["key"] for g in response.json()["groups"]] == ["food_and_drink", None]
+
+        async def corrupt_and_rebuild():
+            check = await rebuild_category_totals(db_session, user.id, verify_only=True)
+            assert (check.rows, check.mismatched) == (2, 0)
+
+            await db_session.execute(
+                update(MonthlyCategoryTotal).values(
+                    total=MonthlyCategoryTotal.total + 1
+                )
+            )
+            check = await rebuild_category_totals(db_session, verify_only=True)
+            assert check.mismatched == 2
+            assert check.written == 0
+
+            check = await rebuild_category_totals(db_session)
+            assert check.written == 2
+            await db_session.commit()
+
+        asyncio.run(corrupt_and_rebuild())
+        assert asyncio.run(load_totals())[0][2] == -80.0
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_is_batched(self, db_session):
+        """Test that Plaid rows are upserted in one statement and IDs match."""
+        from sqlalchemy import select
+
+        from app.models import Transaction
+        from app.services.transaction_ingest import upsert_transactions
+
+        plaid_ids = [f"batch-{index}" for index in range(200)]
+        user, rows = await create_bulk_rows(
+            db_session, "batch@example.com", plaid_ids[:100] + [None] + plaid_ids[100:]
+        )
+        with captured_inserts(db_session) as statements:
+            results = await upsert_transactions(db_session, user.id, rows)
+        assert len([s for s in statements if "ON CONFLICT" in s]) == 1
+
+        stored = dict(
+            (await db_session.execute(select(Transaction.id, Transaction.description)))
+            .tuples()
+            .all()
+        )
+        assert [stored[result.id] for result in results] == [
+            row.description for row in rows
+        ]
+
+        with captured_inserts(db_session) as statements:
+            results = await upsert_transactions(db_session, user.id, rows[:50])
+        assert len(statements) == 1
+        assert {result.status.value for result in results} == {"updated"}
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_keeps_detector_and_user_columns(self, db_session):
+        """Test that re-imports keep is_recurring, hand-set categories and owners."""
+        from sqlalchemy import select, update
+
+        from app.models import Transaction, TransactionCategory
+        from app.services.transaction_ingest import _write_rows, upsert_transactions
+
+        user, rows = await create_bulk_rows(
+            db_session, "keep@example.com", ["keep-1", "keep-2"]
+        )
+        await upsert_transactions(db_session, user.id, rows)
+        # The detector flags both and the user recategorizes the first
+        await db_session.execute(update(Transaction).values(is_recurring=True))
+        await db_session.execute(
+            update(Transaction)
+            .where(Transaction.plaid_transaction_id == "keep-1")
+            .values(category=TransactionCategory.TRAVEL)
+        )
+
+        modified = [
+            rows[0].model_copy(update={"amount": -50.0}),
+            rows[1].model_copy(
+                update={"amount": -50.0, "category": TransactionCategory.SHOPPING}
+            ),
+        ]
+        await upsert_transactions(db_session, user.id, modified)
+        stored = await db_session.execute(
+            select(
+                Transaction.plaid_transaction_id,
+                Transaction.category,
+                Transaction.is_recurring,
+                Transaction.amount,
+            ).order_by(Transaction.plaid_transaction_id)
+        )
+        assert stored.tuples().all() == [
+            ("keep-1", TransactionCategory.TRAVEL, True, -50.0),
+            ("keep-2", TransactionCategory.SHOPPING, True, -50.0),
+        ]
+
+        # Another user's row is not replaced, even past validation
+        other, other_rows = await create_bulk_rows(
+            db_session, "other@example.com", ["keep-3"]
+        )
+        await upsert_transactions(db_session, other.id, other_rows)
+        row = dict(modified[0].model_dump(), plaid_transaction_id="keep-3")
+        assert await _write_rows(db_session, user.id, [row]) == [None]
+        assert await db_session.scalar(
+            select(Transaction.account_id).where(
+                Transaction.plaid_transaction_id == "keep-3"
+            )
+        ) == (other_rows[0].account_id)
+
+    def test_get_transactions_unauthorized(self, client):
+        """Test getting transactions without authentication."""
+        response = client.get("/transactions")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.postgres
+class TestTransactionsOnPostgres:
+    """Test SQL that SQLite only approximates against PostgreSQL."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_and_category_rollup(self, db_session):
+        """Test ON CONFLICT upserts and date_trunc months on PostgreSQL."""
+        from datetime import date
+
+        from app.models import Account, AccountType, User
+        from app.schemas.transaction import TransactionCreate
+        from app.services.category_totals import (
+            rebuild_category_totals,
+            summarize_category_totals,
+        )
+        from app.services.transaction_ingest import upsert_transactions
+
+        user = User(email="pg@example.com", username="pg", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        account = Account(user_id=user.id, name="Checking", type=AccountType.CHECKING)
+        db_session.add(account)
+        await db_session.flush()
+
+        rows = [
+            TransactionCreate(
+                account_id=account.id,
+                amount=amount,
+                date=day,
+                description="Purchase",
+                category="shopping",
+                plaid_transaction_id=plaid_id,
+            )
+            for amount, day, plaid_id in (
+                (-20.0, date(2024, 1, 31), "pg-1"),
+                (-5.0, date(2024, 2, 1), "pg-2"),
+            )
+        ]
+        await upsert_transactions(db_session, user.id, rows)
+        rows[0].amount = -30.0
+        await upsert_transactions(db_session, user.id, rows[:1])
+
+        assert await summarize_category_totals(db_session, user.id, by_month=True) == [
+            (date(2024, 1, 1), 1, -30.0, 0.0, 30.0),
+            (date(2024, 2, 1), 1, -5.0, 0.0, 5.0),
+        ]
+        check = await rebuild_category_totals(db_session, user.id, verify_only=True)
+        assert (check.rows, check.mismatched) == (2, 0)
+
+    @pytest.mark.asyncio
+    async def test_bulk_insert_without_plaid_ids_is_batched(self, db_session):
+        """Test that rows without Plaid IDs are inserted in order in one batch."""
+        from app.services.transaction_ingest import upsert_transactions
+
+        user, rows = await create_bulk_rows(
+            db_session, "pg-batch@example.com", [None] * 200
+        )
+        with captured_inserts(db_session) as statements:
+            results = await upsert_transactions(db_session, user.id, rows)
+
+        assert len(statements) == 1
+        ids = [result.id for result in results]
+        assert ids == sorted(ids)